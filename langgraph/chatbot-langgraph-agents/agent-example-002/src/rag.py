@@ -2,6 +2,7 @@ from langchain_community.document_loaders import TextLoader
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
+from embedding_cache import CachedEmbeddings, cache_from_env
 
 
 PERSIST_DIR = "./vector_store"
@@ -13,11 +14,13 @@ def get_retriever():
     splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
     chunks = splitter.split_documents(docs)
 
+    # Chunks embedded on an earlier start come from the shared embedding cache
+    embedding = CachedEmbeddings(OpenAIEmbeddings(), cache_from_env())
     db = Chroma.from_documents(
         documents=chunks,
-        embedding=OpenAIEmbeddings(),
+        embedding=embedding,
         persist_directory=PERSIST_DIR
     )
-    print("RAG initialized.. !")
+    print(f"RAG initialized.. ! embedding cache hit rate {embedding.stats().get('hit_rate', 0.0):.0%}")
 
     return db.as_retriever()
\ No newline at end of file
@@ -2,6 +2,7 @@ from langchain_community.document_loaders import DirectoryLoader, TextLoader, Py
 from langchain.text_splitter import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
 from langchain_chroma import Chroma
+from embedding_cache import CachedEmbeddings, cache_from_env
 
 RAG_DIR = "rag_docs/"
 PERSIST_DIR = "./vector_store"
@@ -18,10 +19,12 @@ def get_retriever():
 
         txt_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=200)
         chunks = txt_splitter.split_documents(documents=documents)
-        embedding = OpenAIEmbeddings()
+        # Chunks embedded on an earlier start come from the shared embedding cache
+        embedding = CachedEmbeddings(OpenAIEmbeddings(), cache_from_env())
         db = Chroma.from_documents(
         documents=chunks,
         embedding=embedding,
         persist_directory=PERSIST_DIR)
-        print(f"RAG initialized, chroma instance={db}")
+        print(f"RAG initialized, chroma instance={db}, "
+              f"embedding cache hit rate {embedding.stats().get('hit_rate', 0.0):.0%}")
         return db.as_retriever()
\ No newline at end of file
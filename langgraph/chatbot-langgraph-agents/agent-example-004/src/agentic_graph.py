@@ -1,6 +1,7 @@
 from langchain_tavily import TavilySearch
 from langchain_chroma import Chroma
 from langchain_openai import OpenAI, OpenAIEmbeddings
+from embedding_cache import CachedEmbeddings, cache_from_env
 from langgraph.graph import StateGraph
 from typing import TypedDict
 from langgraph.graph import StateGraph
@@ -19,7 +20,7 @@ class GraphState(TypedDict):
 # LLM setup (choose one)
 llm = OpenAI(temperature=0.3)  # Or use OllamaLLM(model="llama3")
 
-embedding_model = OpenAIEmbeddings(model="text-embedding-3-small")
+embedding_model = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small"), cache_from_env())
 vectorstore = Chroma(persist_directory="chroma_index", embedding_function=embedding_model)
 retriever = vectorstore.as_retriever()
 search_tool = TavilySearch()
@@ -1,6 +1,7 @@
 import os
 import chromadb
 from langchain_openai import OpenAIEmbeddings
+from embedding_cache import CachedEmbeddings, cache_from_env
 from openai import OpenAI
 from dotenv import load_dotenv
 from langsmith.run_helpers import traceable
@@ -20,7 +21,9 @@ if not TAVILY_API_KEY:
 # Initialize
 chroma_client = chromadb.PersistentClient(path="./chroma_db")
 collection = chroma_client.get_collection("bank_rates")
-emb = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY)
+# Same cache as vector_setup.py, so repeated queries skip the API
+emb = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY),
+                       cache_from_env())
 client = OpenAI(api_key=OPENAI_API_KEY)
 
 # Tavily MCP definition
@@ -2,6 +2,7 @@ import os
 import pandas as pd
 import chromadb
 from langchain_openai import OpenAIEmbeddings
+from embedding_cache import CachedEmbeddings, cache_from_env
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -13,8 +14,9 @@ if not OPENAI_API_KEY:
 # Chroma client
 client = chromadb.PersistentClient(path="./chroma_db")
 
-# Embeddings
-emb = OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY)
+# Embeddings, read from the shared embedding cache for rows embedded before
+emb = CachedEmbeddings(OpenAIEmbeddings(model="text-embedding-3-small", openai_api_key=OPENAI_API_KEY),
+                       cache_from_env())
 
 # Collection (no embedding_function here)
 collection = client.get_or_create_collection(name="bank_rates")
@@ -22,16 +24,19 @@ collection = client.get_or_create_collection(name="bank_rates")
 # Read CSV
 df = pd.read_csv("data/bank_rates.csv")
 
-# Build docs + embeddings
-docs, metadatas, ids, vectors = [], [], [], []
+# Build docs
+docs, metadatas, ids = [], [], []
 for i, row in df.iterrows():
     doc = (f"{row['bank']} in {row['country']} offers FD rate {row['fd_rate']}, "
            f"Home Loan rate {row['home_loan']}, and Personal Loan rate {row['personal_loan']}.")
     docs.append(doc)
     metadatas.append(row.to_dict())
     ids.append(f"rec-{i+1}")
-    vectors.append(emb.embed_query(doc))  # embed each doc explicitly
+
+# Embed all docs in one call; only rows not in the cache are sent to the API
+vectors = emb.embed_documents(docs)
 
 # Insert into Chroma
 collection.add(documents=docs, metadatas=metadatas, embeddings=vectors, ids=ids)
-print(f"Inserted {len(docs)} records into Chroma collection 'bank_rates'")
+print(f"Inserted {len(docs)} records into Chroma collection 'bank_rates', "
+      f"embedding cache hit rate {emb.stats().get('hit_rate', 0.0):.0%}")
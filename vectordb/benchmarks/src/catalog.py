@@ -0,0 +1,33 @@
+import json
+from typing import Dict, List
+
+import numpy as np
+from catalog_generator import ADJECTIVES, CATEGORIES, CATEGORY_BRANDS, COLORS, product_id, write_catalog
+
+__all__ = ["write_catalog", "write_workload"]
+
+
+def write_workload(json_path: str, n_products: int, n_queries: int, n_writes: int, seed: int = 7) -> None:
+    """
+    Write the queries, filters and product ids every backend replays for a
+    catalog of n_products, so their numbers are comparable
+    """
+    rng = np.random.default_rng(seed)
+    queries: List[Dict] = []
+    for _ in range(n_queries):
+        category = CATEGORIES[rng.integers(len(CATEGORIES))]
+        brand = CATEGORY_BRANDS[category][rng.integers(4)]
+        queries.append({
+            "text": f"{ADJECTIVES[rng.integers(len(ADJECTIVES))]} {COLORS[rng.integers(len(COLORS))].lower()} "
+                    f"{brand} {category.lower()}",
+            "filters": {"$and": [{"category": {"$eq": category}}, {"price": {"$lte": 500.0}}]},
+        })
+    n_writes = min(n_writes, n_products // 2)
+    rows = rng.choice(n_products, size=2 * n_writes, replace=False)
+    workload = {
+        "queries": queries,
+        "update_ids": [product_id(int(row), n_products) for row in rows[:n_writes]],
+        "delete_ids": [product_id(int(row), n_products) for row in rows[n_writes:]],
+    }
+    with open(json_path, "w") as f:
+        json.dump(workload, f)
@@ -0,0 +1,204 @@
+"""
+Scale benchmarks for the vectordb catalog managers.
+
+    python -m src.run_benchmarks run --backends faiss chroma --sizes 1e4 1e5 --output results.json
+    python -m src.run_benchmarks compare baseline.json results.json --threshold 0.1
+
+`run` generates (and caches) a seeded synthetic catalog per size, then
+benchmarks every backend on it in a fresh subprocess (src/worker.py) and
+writes all results, plus the machine they ran on, as one JSON document.
+`compare` diffs two such documents and exits non-zero on regressions.
+"""
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+from src.catalog import write_catalog, write_workload
+
+VECTORDB_DIR = Path(__file__).resolve().parents[2]
+EXAMPLE_DIRS = {
+    "faiss": VECTORDB_DIR / "faissdb" / "example-001",
+    "chroma": VECTORDB_DIR / "chromadb" / "example-001",
+}
+WORKER = Path(__file__).resolve().parent / "worker.py"
+
+# (path inside a result, True when bigger is better)
+METRICS: List[Tuple[str, bool]] = [
+    ("ingest_products_per_second", True),
+    ("search.p50_ms", False),
+    ("search.p99_ms", False),
+    ("filtered_search.p50_ms", False),
+    ("filtered_search.p99_ms", False),
+    ("update.p50_ms", False),
+    ("delete.p50_ms", False),
+    ("peak_rss_mb", False),
+]
+
+
+def parse_size(text: str) -> int:
+    """Accept 10000, 1e4 or 10_000"""
+    return int(float(text.replace("_", "")))
+
+
+def prepare_catalog(data_dir: Path, n_products: int, args) -> Tuple[Path, Path]:
+    """Catalog CSV and workload JSON for n_products, generated once per seed"""
+    data_dir.mkdir(parents=True, exist_ok=True)
+    csv_path = data_dir / f"catalog_{n_products}_seed{args.seed}_skew{args.skew}.csv"
+    workload_path = data_dir / f"workload_{n_products}_q{args.queries}_w{args.writes}.json"
+    if not csv_path.exists():
+        print(f"Generating {n_products} products into {csv_path}", file=sys.stderr)
+        write_catalog(str(csv_path) + ".tmp", n_products, seed=args.seed, skew=args.skew,
+                      workers=args.workers, file_format="csv")
+        os.replace(str(csv_path) + ".tmp", csv_path)
+    if not workload_path.exists():
+        write_workload(str(workload_path), n_products, args.queries, args.writes)
+    return csv_path, workload_path
+
+
+def run_worker(backend: str, csv_path: Path, workload_path: Path, n_products: int,
+               args, options: Dict) -> Dict:
+    command = [sys.executable, str(WORKER), "--backend", backend,
+               "--csv", str(csv_path), "--workload", str(workload_path),
+               "--n-products", str(n_products), "--k", str(args.k),
+               "--recall-queries", str(args.recall_queries), "--options", json.dumps(options)]
+    completed = subprocess.run(command, cwd=EXAMPLE_DIRS[backend], capture_output=True,
+                               text=True, timeout=args.timeout)
+    if completed.returncode != 0:
+        return {"backend": backend, "n_products": n_products, "options": options,
+                "error": completed.stderr.strip().splitlines()[-1] if completed.stderr.strip()
+                else f"exit code {completed.returncode}"}
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def machine_info() -> Dict:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=VECTORDB_DIR, capture_output=True,
+                                text=True).stdout.strip() or None
+    except OSError:
+        commit = None
+    return {
+        "timestamp": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "git_commit": commit,
+        "platform": platform.platform(),
+        "processor": platform.processor(),
+        "cpu_count": os.cpu_count(),
+        "python": platform.python_version(),
+    }
+
+
+def run(args) -> Dict:
+    options = json.loads(args.faiss_options)
+    results = []
+    for n_products in args.sizes:
+        csv_path, workload_path = prepare_catalog(Path(args.data_dir), n_products, args)
+        for backend in args.backends:
+            backend_options = options if backend == "faiss" else {}
+            print(f"Benchmarking {backend} with {n_products} products", file=sys.stderr)
+            try:
+                result = run_worker(backend, csv_path, workload_path, n_products, args, backend_options)
+            except subprocess.TimeoutExpired:
+                result = {"backend": backend, "n_products": n_products, "options": backend_options,
+                          "error": f"timed out after {args.timeout}s"}
+            results.append(result)
+            print(json.dumps(result), file=sys.stderr)
+    report = {"meta": machine_info(), "config": {"k": args.k, "queries": args.queries, "writes": args.writes,
+                                                 "seed": args.seed, "skew": args.skew}, "results": results}
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Wrote {len(results)} results to {args.output}", file=sys.stderr)
+    return report
+
+
+def _metric(result: Dict, path: str):
+    value = result
+    for part in path.split("."):
+        if not isinstance(value, dict):
+            return None
+        value = value.get(part)
+    return value
+
+
+def compare(baseline: Dict, current: Dict, threshold: float) -> List[str]:
+    """
+    Regressions of current against baseline: a metric more than threshold
+    (relative) worse for the same backend, size and options, or a lower recall
+    """
+    def key(result):
+        return result["backend"], result["n_products"], json.dumps(result.get("options", {}), sort_keys=True)
+
+    old_results = {key(r): r for r in baseline["results"] if "error" not in r}
+    regressions = []
+    for new in current["results"]:
+        old = old_results.get(key(new))
+        if old is None:
+            continue
+        label = f"{new['backend']} n={new['n_products']}"
+        if "error" in new:
+            regressions.append(f"{label}: failed ({new['error']})")
+            continue
+        metrics = METRICS + [(f"recall_at_{new['k']}", True)]
+        for path, higher_is_better in metrics:
+            before, after = _metric(old, path), _metric(new, path)
+            if not before or after is None:
+                continue
+            change = (after - before) / before
+            if path.startswith("recall_at_"):
+                worse = after < before - 1e-9
+            else:
+                worse = -change > threshold if higher_is_better else change > threshold
+            if worse:
+                regressions.append(f"{label} {path}: {before} -> {after} ({change:+.1%})")
+    return regressions
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="benchmark backends on synthetic catalogs")
+    run_parser.add_argument("--backends", nargs="+", choices=sorted(EXAMPLE_DIRS), default=["faiss", "chroma"])
+    run_parser.add_argument("--sizes", nargs="+", type=parse_size, default=[10000, 100000])
+    run_parser.add_argument("--queries", type=int, default=200, help="queries per search benchmark")
+    run_parser.add_argument("--writes", type=int, default=100, help="products updated, and deleted")
+    run_parser.add_argument("--recall-queries", type=int, default=50)
+    run_parser.add_argument("--k", type=int, default=10)
+    run_parser.add_argument("--seed", type=int, default=42)
+    run_parser.add_argument("--skew", type=float, default=1.0, help="catalog popularity skew, 0 for uniform")
+    run_parser.add_argument("--workers", type=int, default=os.cpu_count(), help="catalog generator processes")
+    run_parser.add_argument("--faiss-options", default="{}",
+                            help='JSON FaissCatalogManager arguments, e.g. \'{"index_type": "hnsw"}\'')
+    run_parser.add_argument("--data-dir", default="data")
+    run_parser.add_argument("--timeout", type=float, default=6 * 3600, help="seconds per run")
+    run_parser.add_argument("--output", default="results.json")
+
+    compare_parser = commands.add_parser("compare", help="flag regressions between two result files")
+    compare_parser.add_argument("baseline")
+    compare_parser.add_argument("current")
+    compare_parser.add_argument("--threshold", type=float, default=0.1,
+                                help="relative change counted as a regression")
+
+    args = parser.parse_args(argv)
+    if args.command == "run":
+        report = run(args)
+        return 1 if any("error" in r for r in report["results"]) else 0
+
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    with open(args.current) as f:
+        current = json.load(f)
+    regressions = compare(baseline, current, args.threshold)
+    for line in regressions:
+        print(f"REGRESSION {line}")
+    if not regressions:
+        print("No regressions")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
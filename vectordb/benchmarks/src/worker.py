@@ -0,0 +1,235 @@
+"""
+Benchmark one catalog manager on one catalog, in a process of its own.
+
+run_benchmarks.py starts this script once per (backend, size) with the
+backend's example project as working directory, so `src.crud_operations`
+resolves to that project's manager and ru_maxrss is the peak of this run
+alone. The result is printed to stdout as a single JSON line.
+"""
+import argparse
+import contextlib
+import json
+import os
+import re
+import resource
+import sys
+import time
+import zlib
+from typing import Callable, Dict, List
+
+import numpy as np
+
+EMBEDDING_DIM = 128
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def hash_embed(texts: List[str], dim: int = EMBEDDING_DIM) -> np.ndarray:
+    """
+    Local deterministic embedding: signed crc32 feature hashing of the
+    lowercased tokens, L2-normalized. Needs no model download or network.
+    """
+    vectors = np.zeros((len(texts), dim), dtype="float32")
+    for row, text in enumerate(texts):
+        for token in _TOKEN.findall(text.lower()):
+            h = zlib.crc32(token.encode())
+            vectors[row, h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return vectors / norms
+
+
+def percentiles_ms(seconds: List[float]) -> Dict[str, float]:
+    if not seconds:
+        return {"p50_ms": None, "p99_ms": None, "mean_ms": None}
+    ms = np.asarray(seconds) * 1000
+    return {"p50_ms": round(float(np.percentile(ms, 50)), 4),
+            "p99_ms": round(float(np.percentile(ms, 99)), 4),
+            "mean_ms": round(float(ms.mean()), 4)}
+
+
+def timed(calls: List[Callable[[], object]]) -> List[float]:
+    seconds = []
+    for call in calls:
+        start = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - start)
+    return seconds
+
+
+def recall(found_distances: List[np.ndarray], exact_kth: np.ndarray) -> float:
+    """
+    Fraction of the k exact neighbours an index returned, counted by distance
+    so that ties at the k-th distance are not scored as misses
+    """
+    hits = [np.count_nonzero(found <= kth * (1 + 1e-4) + 1e-5) for found, kth in zip(found_distances, exact_kth)]
+    k = len(found_distances[0]) if found_distances else 0
+    return round(float(np.mean(np.minimum(hits, k)) / k), 4) if k else None
+
+
+def exact_kth_distance(query_vecs: np.ndarray, vector_chunks, k: int) -> np.ndarray:
+    """Squared L2 distance of each query's k-th nearest vector, by chunked brute force"""
+    best = np.full((len(query_vecs), 0), np.inf, dtype="float32")
+    query_norms = (query_vecs ** 2).sum(axis=1)[:, None]
+    for chunk in vector_chunks:
+        distances = query_norms - 2 * query_vecs @ chunk.T + (chunk ** 2).sum(axis=1)[None, :]
+        best = np.sort(np.concatenate([best, distances], axis=1), axis=1)[:, :k]
+    return best[:, k - 1]
+
+
+class FaissBackend:
+    def __init__(self, options: Dict):
+        from src.crud_operations import FaissCatalogManager
+
+        self.streaming_chunk = options.pop("streaming_chunk_size", None)
+        self.manager = FaissCatalogManager(verbose=False, **options)
+
+    def ingest(self, csv_path: str) -> None:
+        if self.streaming_chunk:
+            self.manager.create_catalog_from_csv_streaming(csv_path, chunk_size=self.streaming_chunk)
+        else:
+            self.manager.create_catalog_from_csv(csv_path)
+
+    def search(self, text: str, k: int, filters: Dict = None) -> None:
+        self.manager.search_products(text, n_results=k, filters=filters)
+
+    def recall(self, texts: List[str], k: int, csv_path: str) -> float:
+        manager = self.manager
+        query_vecs = manager._encode_batch(texts)
+        distances, _ = manager._search_ids(query_vecs, k)
+        alive = np.flatnonzero(manager.columns.alive[:manager.columns.size])
+        chunks = (manager._vectors[alive[i:i + 100000]] for i in range(0, len(alive), 100000))
+        return recall(list(distances), exact_kth_distance(query_vecs, chunks, k))
+
+    def update(self, product_id: str, price: float) -> None:
+        self.manager.update_product(product_id, new_price=price)
+
+    def delete(self, product_id: str) -> None:
+        self.manager.delete_product(product_id)
+
+    def count(self) -> int:
+        return self.manager.get_product_count()
+
+
+class ChromaBackend:
+    def __init__(self, options: Dict):
+        from src.crud_operations import ChromaDBCatalogManager
+
+        self.manager = ChromaDBCatalogManager(embedding_function=_hashing_embedding_function(), **options)
+
+    def ingest(self, csv_path: str) -> None:
+        self.manager.create_catalog_from_csv(csv_path)
+
+    def search(self, text: str, k: int, filters: Dict = None) -> None:
+        self.manager.search_products(text, n_results=k, filters=filters)
+
+    def recall(self, texts: List[str], k: int, csv_path: str) -> float:
+        from catalog_reader import read_catalog_batches
+
+        query_vecs = hash_embed(texts)
+        found = self.manager.collection.query(query_embeddings=query_vecs.tolist(), n_results=k,
+                                              include=["distances"])["distances"]
+        document_chunks = (hash_embed(self.manager._document_texts(batch).to_pylist())
+                           for batch in read_catalog_batches(csv_path, 100000))
+        return recall([np.asarray(d, dtype="float32") for d in found],
+                      exact_kth_distance(query_vecs, document_chunks, k))
+
+    def update(self, product_id: str, price: float) -> None:
+        self.manager.update_product(product_id, new_price=price)
+
+    def delete(self, product_id: str) -> None:
+        self.manager.delete_product(product_id)
+
+    def count(self) -> int:
+        return self.manager.get_product_count()
+
+
+def _hashing_embedding_function():
+    """hash_embed as a Chroma embedding function; built lazily so Faiss runs need no chromadb"""
+    from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+    class HashingEmbeddingFunction(EmbeddingFunction[Documents]):
+        def __init__(self, dim: int = EMBEDDING_DIM):
+            self.dim = dim
+
+        def __call__(self, input: Documents) -> Embeddings:
+            return list(hash_embed(list(input), self.dim))
+
+        @staticmethod
+        def name() -> str:
+            return "benchmark-hashing"
+
+        def get_config(self) -> Dict:
+            return {"dim": self.dim}
+
+        @staticmethod
+        def build_from_config(config: Dict) -> "HashingEmbeddingFunction":
+            return HashingEmbeddingFunction(config["dim"])
+
+    return HashingEmbeddingFunction()
+
+
+BACKENDS = {"faiss": FaissBackend, "chroma": ChromaBackend}
+
+
+def run(backend_name: str, csv_path: str, workload_path: str, n_products: int,
+        k: int, recall_queries: int, options: Dict) -> Dict:
+    with open(workload_path) as f:
+        workload = json.load(f)
+    texts = [q["text"] for q in workload["queries"]]
+
+    # The managers report progress with print(); keep stdout for the result line
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        backend = BACKENDS[backend_name](dict(options))
+
+        start = time.perf_counter()
+        backend.ingest(csv_path)
+        ingest_seconds = time.perf_counter() - start
+
+        search = timed([lambda t=t: backend.search(t, k) for t in texts])
+        filtered = timed([lambda q=q: backend.search(q["text"], k, q["filters"]) for q in workload["queries"]])
+        recall_at_k = backend.recall(texts[:recall_queries], k, csv_path)
+
+        prices = np.random.default_rng(0).uniform(10.99, 999.99, len(workload["update_ids"]))
+        updates = timed([lambda p=p, price=price: backend.update(p, float(price))
+                         for p, price in zip(workload["update_ids"], prices)])
+        deletes = timed([lambda p=p: backend.delete(p) for p in workload["delete_ids"]])
+        count = backend.count()
+
+    return {
+        "backend": backend_name,
+        "n_products": n_products,
+        "options": options,
+        "k": k,
+        "ingest_seconds": round(ingest_seconds, 4),
+        "ingest_products_per_second": round(n_products / ingest_seconds, 1),
+        "search": percentiles_ms(search),
+        "filtered_search": percentiles_ms(filtered),
+        f"recall_at_{k}": recall_at_k,
+        "update": percentiles_ms(updates),
+        "delete": percentiles_ms(deletes),
+        "count_after_deletes": count,
+        # Linux reports ru_maxrss in KiB
+        "peak_rss_mb": round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1),
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--backend", choices=sorted(BACKENDS), required=True)
+    parser.add_argument("--csv", required=True)
+    parser.add_argument("--workload", required=True)
+    parser.add_argument("--n-products", type=int, required=True)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--recall-queries", type=int, default=50)
+    parser.add_argument("--options", default="{}", help="JSON keyword arguments for the manager")
+    args = parser.parse_args(argv)
+
+    # Imports of src.* resolve against the example project we were started in
+    sys.path.insert(0, os.getcwd())
+    result = run(args.backend, args.csv, args.workload, args.n_products,
+                 args.k, args.recall_queries, json.loads(args.options))
+    print(json.dumps(result))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import json
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from types import SimpleNamespace
+
+from src.catalog import write_workload
+from src.run_benchmarks import compare, parse_size, prepare_catalog, run_worker
+
+
+class TestBenchmarkHarness(unittest.TestCase):
+    """Tests for the workload, the worker and result comparison"""
+
+    def setUp(self):
+        self.data_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.data_dir)
+
+    def test_1_workload_ids_are_disjoint(self):
+        """Updated and deleted products are distinct products of the catalog"""
+        # Arrange
+        path = os.path.join(self.data_dir, "workload.json")
+
+        # Act
+        write_workload(path, 100, n_queries=5, n_writes=10)
+
+        # Assert
+        with open(path) as f:
+            workload = json.load(f)
+        self.assertEqual(len(workload["queries"]), 5)
+        self.assertEqual(len(set(workload["update_ids"]) | set(workload["delete_ids"])), 20)
+        self.assertIn("$and", workload["queries"][0]["filters"])
+
+    def test_2_faiss_worker_reports_every_metric(self):
+        """A tiny end-to-end Faiss run produces the full result record"""
+        # Arrange
+        args = SimpleNamespace(seed=1, skew=1.0, workers=1, queries=5, writes=3, k=5, recall_queries=5, timeout=600)
+        csv_path, workload_path = prepare_catalog(Path(self.data_dir), 300, args)
+
+        # Act
+        result = run_worker("faiss", csv_path, workload_path, 300, args, {})
+
+        # Assert
+        self.assertNotIn("error", result)
+        self.assertEqual(result["count_after_deletes"], 297)
+        self.assertEqual(result["recall_at_5"], 1.0)
+        for metric in ("search", "filtered_search", "update", "delete"):
+            self.assertGreater(result[metric]["p99_ms"], 0)
+        self.assertGreater(result["ingest_products_per_second"], 0)
+        self.assertGreater(result["peak_rss_mb"], 0)
+
+    def test_3_compare_flags_regressions(self):
+        """Slower latency or lower recall beyond the threshold is a regression"""
+        # Arrange
+        def report(p50, recall):
+            return {"results": [{"backend": "faiss", "n_products": 10000, "options": {}, "k": 10,
+                                 "search": {"p50_ms": p50}, "recall_at_10": recall}]}
+
+        # Act
+        unchanged = compare(report(1.0, 0.9), report(1.05, 0.9), threshold=0.1)
+        slower = compare(report(1.0, 0.9), report(1.5, 0.9), threshold=0.1)
+        less_recall = compare(report(1.0, 0.9), report(1.0, 0.8), threshold=0.1)
+
+        # Assert
+        self.assertEqual(unchanged, [])
+        self.assertEqual(len(slower), 1)
+        self.assertIn("search.p50_ms", slower[0])
+        self.assertIn("recall_at_10", less_recall[0])
+
+    def test_4_parse_size_accepts_scientific_notation(self):
+        """Sizes like 1e7 are accepted on the command line"""
+        self.assertEqual(parse_size("1e4"), 10000)
+        self.assertEqual(parse_size("10_000_000"), 10000000)
+
+
+if __name__ == "__main__":
+    unittest.main()
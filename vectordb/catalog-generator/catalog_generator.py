@@ -0,0 +1,190 @@
+"""
+Product catalog generator shared by the vectordb examples.
+
+    catalog-generator --rows 100 --output data/product_catalog.csv
+    catalog-generator --rows 10_000_000 --output data/product_catalog.parquet --workers 8
+
+Rows are generated in blocks of BLOCK_SIZE rows; block b draws from its own
+random stream seeded with (seed, b). The output therefore depends only on
+seed, rows and skew. It is identical for any number of worker processes,
+and blocks are written in order as they complete, so memory stays bounded
+by a few blocks however many rows are written.
+
+Categories, brands and colors follow a Zipf-like popularity curve with
+exponent skew (0 gives uniform choices), and prices are log-normal around a
+per-category median, so filters and facets see realistic selectivities.
+"""
+import argparse
+import csv
+import io
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List
+
+import numpy as np
+
+CATEGORY_BRANDS = {
+    "Laptop": ["Apple", "Dell", "HP", "Lenovo"],
+    "Smartphone": ["Samsung", "Apple", "Google", "Xiaomi"],
+    "Headphones": ["Sony", "Bose", "Sennheiser", "Audio-Technica"],
+    "T-Shirt": ["Nike", "Adidas", "Levi's", "Uniqlo"],
+    "Running Shoes": ["Nike", "Adidas", "New Balance", "Asics"],
+    "Coffee Mug": ["Starbucks", "Yeti", "Contigo", "Generic"],
+    "Book": ["Penguin", "HarperCollins", "Random House", "Self-Published"],
+    "Skateboard": ["Element", "Plan B", "Santa Cruz", "Generic"],
+    "Watch": ["Casio", "Seiko", "Fossil", "Timex"],
+    "Water Bottle": ["Nalgene", "Hydro Flask", "CamelBak", "Generic"],
+}
+CATEGORIES = list(CATEGORY_BRANDS)
+# Median price per category; prices spread log-normally around it
+MEDIAN_PRICES = {
+    "Laptop": 899.0, "Smartphone": 599.0, "Headphones": 149.0, "T-Shirt": 24.0, "Running Shoes": 109.0,
+    "Coffee Mug": 14.0, "Book": 17.0, "Skateboard": 79.0, "Watch": 189.0, "Water Bottle": 29.0,
+}
+COLORS = ["Black", "White", "Red", "Blue", "Green", "Silver", "Space Gray"]
+ADJECTIVES = ["high-quality", "lightweight", "durable", "premium", "budget", "compact", "wireless", "classic"]
+FIELDNAMES = ["product_id", "name", "description", "category", "price", "in_stock"]
+
+BLOCK_SIZE = 65536
+PRICE_SIGMA = 0.5
+MIN_PRICE, MAX_PRICE = 1.99, 4999.99
+IN_STOCK_RATE = 0.8
+
+# Every (category, brand, color) name and (adjective, color, category, brand)
+# description, so a block picks its strings by fancy indexing
+_NAMES = np.array([[[f"{brand} {category} {color}" for color in COLORS]
+                    for brand in CATEGORY_BRANDS[category]] for category in CATEGORIES], dtype=object)
+_DESCRIPTIONS = np.array([[[[f"A {adjective} {color.lower()} {category.lower()} by {brand}. Perfect for everyday use."
+                             for brand in CATEGORY_BRANDS[category]] for category in CATEGORIES]
+                           for color in COLORS] for adjective in ADJECTIVES], dtype=object)
+_CATEGORY_NAMES = np.array(CATEGORIES, dtype=object)
+_LOG_MEDIANS = np.log([MEDIAN_PRICES[category] for category in CATEGORIES])
+
+
+def zipf_weights(n: int, skew: float) -> np.ndarray:
+    """Probability of the i-th most popular of n items, proportional to 1 / i**skew"""
+    weights = 1.0 / np.arange(1, n + 1) ** skew
+    return weights / weights.sum()
+
+
+def _id_format(n_rows: int) -> str:
+    """Format of product ids in a catalog of n_rows: zero-padded to the catalog size, at least 3 digits"""
+    return f"prod_{{:0{max(3, len(str(n_rows)))}d}}"
+
+
+def product_id(row: int, n_rows: int) -> str:
+    """Id of the row-th product (0-based)"""
+    return _id_format(n_rows).format(row + 1)
+
+
+def generate_block(seed: int, block_no: int, n_rows: int, skew: float = 1.0,
+                   block_size: int = BLOCK_SIZE) -> Dict[str, np.ndarray]:
+    """The columns of block block_no of a catalog of n_rows products"""
+    start = block_no * block_size
+    size = min(block_size, n_rows - start)
+    rng = np.random.default_rng([seed, block_no])
+    categories = rng.choice(len(CATEGORIES), size=size, p=zipf_weights(len(CATEGORIES), skew))
+    brands = rng.choice(4, size=size, p=zipf_weights(4, skew))
+    name_colors = rng.choice(len(COLORS), size=size, p=zipf_weights(len(COLORS), skew))
+    colors = rng.choice(len(COLORS), size=size, p=zipf_weights(len(COLORS), skew))
+    adjectives = rng.integers(len(ADJECTIVES), size=size)
+    prices = np.exp(_LOG_MEDIANS[categories] + PRICE_SIGMA * rng.standard_normal(size))
+    format_id = _id_format(n_rows).format
+    return {
+        "product_id": np.array([format_id(i) for i in range(start + 1, start + size + 1)], dtype=object),
+        "name": _NAMES[categories, brands, name_colors],
+        "description": _DESCRIPTIONS[adjectives, colors, categories, brands],
+        "category": _CATEGORY_NAMES[categories],
+        "price": np.round(np.clip(prices, MIN_PRICE, MAX_PRICE), 2),
+        "in_stock": rng.random(size) < IN_STOCK_RATE,
+    }
+
+
+def _render_csv(seed: int, block_no: int, n_rows: int, skew: float, block_size: int) -> str:
+    columns = generate_block(seed, block_no, n_rows, skew, block_size)
+    buffer = io.StringIO()
+    csv.writer(buffer).writerows(zip(columns["product_id"], columns["name"], columns["description"],
+                                     columns["category"], columns["price"].tolist(), columns["in_stock"].tolist()))
+    return buffer.getvalue()
+
+
+def _render_arrow(seed: int, block_no: int, n_rows: int, skew: float, block_size: int):
+    import pyarrow as pa
+
+    columns = generate_block(seed, block_no, n_rows, skew, block_size)
+    return pa.table({name: pa.array(columns[name], type=pa.string() if columns[name].dtype == object else None)
+                     for name in FIELDNAMES})
+
+
+def iter_blocks(render, n_rows: int, seed: int, skew: float, workers: int, block_size: int) -> Iterator:
+    """render(...) of every block in order, at most 2 * workers blocks in flight"""
+    n_blocks = -(-n_rows // block_size)
+    if workers <= 1:
+        for block_no in range(n_blocks):
+            yield render(seed, block_no, n_rows, skew, block_size)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        pending = []
+        for block_no in range(n_blocks):
+            pending.append(pool.submit(render, seed, block_no, n_rows, skew, block_size))
+            if len(pending) >= 2 * workers:
+                yield pending.pop(0).result()
+        for future in pending:
+            yield future.result()
+
+
+def write_catalog(output_path: str, n_rows: int, seed: int = 42, skew: float = 1.0,
+                  workers: int = 1, file_format: str = None, block_size: int = BLOCK_SIZE) -> None:
+    """
+    Write n_rows products to output_path as CSV, or as Parquet (one row group
+    per block) when file_format is "parquet" or the path ends in .parquet.
+    block_size is part of the seeding scheme: changing it changes the catalog.
+    """
+    file_format = file_format or ("parquet" if output_path.endswith(".parquet") else "csv")
+    directory = os.path.dirname(output_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    if file_format == "parquet":
+        import pyarrow.parquet as pq
+
+        writer = None
+        try:
+            for table in iter_blocks(_render_arrow, n_rows, seed, skew, workers, block_size):
+                if writer is None:
+                    writer = pq.ParquetWriter(output_path, table.schema)
+                writer.write_table(table)
+            if writer is None:
+                # No blocks: an empty table still carries the schema
+                pq.write_table(_render_arrow(seed, 0, 0, skew, block_size), output_path)
+        finally:
+            if writer is not None:
+                writer.close()
+    elif file_format == "csv":
+        with open(output_path, "w", newline="") as f:
+            csv.writer(f).writerow(FIELDNAMES)
+            for text in iter_blocks(_render_csv, n_rows, seed, skew, workers, block_size):
+                f.write(text)
+    else:
+        raise ValueError(f"Unknown file format '{file_format}', expected 'csv' or 'parquet'")
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=lambda text: int(float(text.replace("_", ""))), default=100,
+                        help="number of products, e.g. 100, 1e6 or 10_000_000")
+    parser.add_argument("--output", default=os.path.join("data", "product_catalog.csv"),
+                        help="CSV, or Parquet when the name ends in .parquet")
+    parser.add_argument("--format", choices=["csv", "parquet"], default=None)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--skew", type=float, default=1.0, help="Zipf exponent of category/brand/color popularity")
+    parser.add_argument("--workers", type=int, default=1, help="generator processes")
+    args = parser.parse_args(argv)
+
+    write_catalog(args.output, args.rows, seed=args.seed, skew=args.skew,
+                  workers=args.workers, file_format=args.format)
+    print(f"{args.output} generated successfully with {args.rows} products!", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Columnar catalog reader shared by the vectordb examples' loaders.
+
+read_catalog_batches() yields the catalog as pyarrow RecordBatches in
+CATALOG_SCHEMA, whatever the source: CSV, Parquet, an Arrow IPC/Feather
+file, or an in-memory Arrow table. CSV is parsed by Arrow's multithreaded
+reader, so "True"/"False" and prices are converted per column in native
+code rather than per row in Python.
+"""
+from typing import Iterable, Iterator, Tuple, Union
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
+import pyarrow.ipc as pa_ipc
+import pyarrow.parquet as pq
+
+CATALOG_SCHEMA = pa.schema([
+    ("product_id", pa.string()),
+    ("name", pa.string()),
+    ("description", pa.string()),
+    ("category", pa.string()),
+    ("price", pa.float64()),
+    ("in_stock", pa.bool_()),
+])
+DEFAULT_BATCH_SIZE = 65536
+ARROW_SUFFIXES = (".arrow", ".feather", ".ipc")
+
+CatalogSource = Union[str, pa.Table, pa.RecordBatch]
+
+
+def read_catalog_batches(source: CatalogSource, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+    """
+    Stream a catalog as RecordBatches of at most batch_size rows in
+    CATALOG_SCHEMA. source is a .csv, .parquet or .arrow/.feather/.ipc path,
+    or a pyarrow Table or RecordBatch.
+    """
+    if isinstance(source, pa.RecordBatch):
+        source = pa.Table.from_batches([source])
+    if isinstance(source, pa.Table):
+        batches = source.to_batches(max_chunksize=batch_size)
+    elif source.endswith(".parquet"):
+        batches = pq.ParquetFile(source).iter_batches(batch_size=batch_size, columns=CATALOG_SCHEMA.names)
+    elif source.endswith(ARROW_SUFFIXES):
+        batches = _iter_ipc(source)
+    else:
+        batches = pa_csv.open_csv(source, convert_options=pa_csv.ConvertOptions(
+            column_types=CATALOG_SCHEMA, include_columns=CATALOG_SCHEMA.names,
+            true_values=["True", "true", "1"], false_values=["False", "false", "0"]))
+    return rebatch((conform(batch) for batch in batches), batch_size)
+
+
+def read_catalog(source: CatalogSource) -> pa.Table:
+    """The whole catalog as one Arrow table in CATALOG_SCHEMA"""
+    return pa.Table.from_batches(list(read_catalog_batches(source)), schema=CATALOG_SCHEMA)
+
+
+def conform(batch: pa.RecordBatch) -> pa.RecordBatch:
+    """Select and cast a batch's columns to CATALOG_SCHEMA, e.g. bools stored as "True"/"False" text"""
+    columns = []
+    for field in CATALOG_SCHEMA:
+        column = batch.column(field.name)
+        if column.type != field.type:
+            if field.type == pa.bool_() and pa.types.is_string(column.type):
+                column = pc.equal(pc.utf8_lower(column), "true")
+            else:
+                column = pc.cast(column, field.type)
+        columns.append(column)
+    return pa.RecordBatch.from_arrays(columns, schema=CATALOG_SCHEMA)
+
+
+def price_text(prices: pa.Array) -> pa.Array:
+    """Prices formatted like Python's str(float), e.g. 100.0 -> "100.0", as CSV rows spell them"""
+    if isinstance(prices, pa.ChunkedArray):
+        prices = prices.combine_chunks()
+    text = pc.cast(prices, pa.string())
+    # Arrow drops the ".0" of whole numbers; patch only those rows
+    values = prices.to_numpy(zero_copy_only=False)
+    whole = pa.array(values == np.floor(values))
+    if not pc.any(whole).as_py():
+        return text
+    return pc.replace_with_mask(text, whole, pc.binary_join_element_wise(pc.filter(text, whole), ".0", ""))
+
+
+def string_buffers(array) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    (UTF-8 bytes, int64 offsets) of an Arrow string array or chunked array,
+    value i being bytes[offsets[i]:offsets[i + 1]]; nulls read as ""
+    """
+    if isinstance(array, pa.ChunkedArray):
+        array = array.combine_chunks()
+    if array.null_count:
+        array = pc.fill_null(array, "")
+    offset_type = np.int64 if pa.types.is_large_string(array.type) else np.int32
+    _, offsets, data = array.buffers()
+    offsets = np.frombuffer(offsets, dtype=offset_type)[array.offset:array.offset + len(array) + 1]
+    data = np.frombuffer(data, dtype=np.uint8) if data is not None else np.empty(0, dtype=np.uint8)
+    return data, offsets.astype(np.int64)
+
+
+def _iter_ipc(path: str) -> Iterator[pa.RecordBatch]:
+    try:
+        reader = pa_ipc.open_file(path)
+    except pa.ArrowInvalid:
+        # Not the random-access file format, so the streaming one
+        with pa_ipc.open_stream(path) as stream:
+            yield from stream
+        return
+    for i in range(reader.num_record_batches):
+        yield reader.get_batch(i)
+
+
+def rebatch(batches: Iterable[pa.RecordBatch], batch_size: int) -> Iterator[pa.RecordBatch]:
+    """Re-chunk batches of any size into batches of exactly batch_size rows (the last may be shorter)"""
+    pending, n_pending = [], 0
+    for batch in batches:
+        pending.append(batch)
+        n_pending += batch.num_rows
+        if n_pending < batch_size:
+            continue
+        table = pa.Table.from_batches(pending, schema=CATALOG_SCHEMA).combine_chunks()
+        n_full = n_pending // batch_size * batch_size
+        yield from table.slice(0, n_full).to_batches(max_chunksize=batch_size)
+        pending = table.slice(n_full).to_batches()
+        n_pending -= n_full
+    if n_pending:
+        yield from pa.Table.from_batches(pending, schema=CATALOG_SCHEMA).combine_chunks().to_batches()
@@ -0,0 +1,117 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import numpy as np
+import pyarrow.parquet as pq
+
+from catalog_generator import FIELDNAMES, MEDIAN_PRICES, generate_block, product_id, write_catalog
+
+
+def read_csv(path):
+    with open(path, newline="") as f:
+        return list(csv.DictReader(f))
+
+
+class TestCatalogGenerator(unittest.TestCase):
+    """Tests for the shared product catalog generator"""
+
+    def setUp(self):
+        self.output_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.output_dir)
+
+    def path(self, name):
+        return os.path.join(self.output_dir, name)
+
+    def test_1_same_seed_same_catalog(self):
+        """Output depends on the seed only"""
+        # Act
+        write_catalog(self.path("a.csv"), 500, seed=3)
+        write_catalog(self.path("b.csv"), 500, seed=3)
+        write_catalog(self.path("c.csv"), 500, seed=4)
+
+        # Assert
+        a, b, c = (read_csv(self.path(name)) for name in ("a.csv", "b.csv", "c.csv"))
+        self.assertEqual(a, b)
+        self.assertNotEqual(a, c)
+
+    def test_2_csv_matches_the_example_loaders(self):
+        """Columns, ids and value formats are the ones the examples' loaders parse"""
+        # Act
+        write_catalog(self.path("catalog.csv"), 100)
+
+        # Assert
+        rows = read_csv(self.path("catalog.csv"))
+        self.assertEqual(list(rows[0].keys()), FIELDNAMES)
+        self.assertEqual([row["product_id"] for row in rows], [f"prod_{i:03d}" for i in range(1, 101)])
+        self.assertTrue({row["in_stock"] for row in rows} <= {"True", "False"})
+        for row in rows:
+            self.assertIn(row["category"], MEDIAN_PRICES)
+            self.assertGreater(float(row["price"]), 0)
+            self.assertTrue(row["name"].split()[0] in row["description"])
+
+    def test_3_blocks_and_workers_do_not_change_output(self):
+        """Multi-process, multi-block output equals single-process output"""
+        # Act: small blocks so 1000 rows span several of them
+        write_catalog(self.path("one.csv"), 1000, workers=1, block_size=128)
+        write_catalog(self.path("three.csv"), 1000, workers=3, block_size=128)
+
+        # Assert
+        with open(self.path("one.csv")) as one, open(self.path("three.csv")) as three:
+            self.assertEqual(one.read(), three.read())
+        self.assertEqual(len(read_csv(self.path("one.csv"))), 1000)
+
+    def test_4_skew_concentrates_popular_categories(self):
+        """skew=0 is uniform, larger skew favours the first categories"""
+        # Act
+        uniform = generate_block(42, 0, 20000, skew=0.0)
+        skewed = generate_block(42, 0, 20000, skew=1.5)
+
+        # Assert
+        _, uniform_counts = np.unique(uniform["category"], return_counts=True)
+        self.assertLess(uniform_counts.max() / uniform_counts.min(), 1.2)
+        self.assertGreater(np.mean(skewed["category"] == "Laptop"), 0.4)
+        laptop_prices = skewed["price"][skewed["category"] == "Laptop"]
+        mug_prices = skewed["price"][skewed["category"] == "Coffee Mug"]
+        self.assertGreater(np.median(laptop_prices), 10 * np.median(mug_prices))
+
+    def test_5_parquet_matches_csv(self):
+        """Parquet output holds the same rows, with typed price and in_stock columns"""
+        # Act
+        write_catalog(self.path("catalog.csv"), 300)
+        write_catalog(self.path("catalog.parquet"), 300)
+
+        # Assert
+        table = pq.read_table(self.path("catalog.parquet"))
+        rows = read_csv(self.path("catalog.csv"))
+        self.assertEqual(table.column_names, FIELDNAMES)
+        self.assertEqual(table.column("product_id").to_pylist(), [row["product_id"] for row in rows])
+        self.assertEqual(table.column("price").to_pylist(), [float(row["price"]) for row in rows])
+        self.assertEqual(table.column("in_stock").to_pylist(), [row["in_stock"] == "True" for row in rows])
+
+    def test_6_product_ids_are_padded_to_catalog_size(self):
+        """Ids sort in catalog order however many products there are"""
+        self.assertEqual(product_id(0, 100), "prod_001")
+        self.assertEqual(product_id(41, 1000000), "prod_0000042")
+        self.assertEqual(generate_block(seed=1, block_no=0, n_rows=1000)["product_id"][41], product_id(41, 1000))
+
+    def test_7_empty_catalog_keeps_the_schema(self):
+        """Zero rows still write a file with the header or schema"""
+        # Act
+        write_catalog(self.path("catalog.csv"), 0)
+        write_catalog(self.path("empty.parquet"), 0)
+        write_catalog(self.path("one.parquet"), 1)
+
+        # Assert
+        self.assertEqual(read_csv(self.path("catalog.csv")), [])
+        table = pq.read_table(self.path("empty.parquet"))
+        self.assertEqual(table.num_rows, 0)
+        self.assertEqual(table.schema, pq.read_schema(self.path("one.parquet")))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+import csv
+import os
+import shutil
+import tempfile
+import unittest
+
+import pyarrow as pa
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+
+from catalog_generator import write_catalog
+from catalog_reader import CATALOG_SCHEMA, price_text, read_catalog, read_catalog_batches, string_buffers
+
+
+class TestCatalogReader(unittest.TestCase):
+    """Tests for reading catalogs as typed Arrow batches"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data_dir = tempfile.mkdtemp()
+        cls.csv_path = os.path.join(cls.data_dir, "catalog.csv")
+        write_catalog(cls.csv_path, 1000, seed=5)
+        with open(cls.csv_path, newline="") as f:
+            cls.rows = list(csv.DictReader(f))
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.data_dir)
+
+    def test_1_csv_is_typed_per_column(self):
+        """CSV text becomes string, float64 and bool columns equal to parsing each row"""
+        # Act
+        table = read_catalog(self.csv_path)
+
+        # Assert
+        self.assertEqual(table.schema, CATALOG_SCHEMA)
+        self.assertEqual(table.column("product_id").to_pylist(), [row["product_id"] for row in self.rows])
+        self.assertEqual(table.column("price").to_pylist(), [float(row["price"]) for row in self.rows])
+        self.assertEqual(table.column("in_stock").to_pylist(), [row["in_stock"] == "True" for row in self.rows])
+
+    def test_2_every_source_reads_the_same(self):
+        """Parquet, Arrow IPC, tables and batches all read as the CSV does"""
+        # Arrange
+        expected = read_catalog(self.csv_path)
+        parquet_path = os.path.join(self.data_dir, "catalog.parquet")
+        pq.write_table(expected, parquet_path)
+        arrow_path = os.path.join(self.data_dir, "catalog.arrow")
+        feather.write_feather(expected, arrow_path)
+        # Stock stored as text and columns in another order are conformed to the schema
+        text_stock = expected.set_column(5, "in_stock", pa.array(
+            ["True" if v else "False" for v in expected.column("in_stock").to_pylist()]))
+        reordered = text_stock.select(["price", "in_stock", "name", "category", "description", "product_id"])
+
+        for source in (parquet_path, arrow_path, expected, expected.to_batches()[0], reordered):
+            with self.subTest(source=source if isinstance(source, str) else type(source).__name__):
+                # Act
+                table = read_catalog(source)
+
+                # Assert
+                self.assertTrue(table.equals(expected if not isinstance(source, pa.RecordBatch)
+                                             else expected.slice(0, source.num_rows)))
+
+    def test_3_batches_have_the_requested_size(self):
+        """Batches hold exactly batch_size rows whatever the source's chunking"""
+        # Act
+        sizes = [batch.num_rows for batch in read_catalog_batches(self.csv_path, batch_size=300)]
+
+        # Assert
+        self.assertEqual(sizes, [300, 300, 300, 100])
+
+    def test_4_price_text_matches_python_str(self):
+        """Whole prices keep their '.0', as str(float) writes them into CSV rows"""
+        prices = [100.0, 1299.9, 0.5, 3.0, 19.99]
+        self.assertEqual(price_text(pa.array(prices)).to_pylist(), [str(p) for p in prices])
+
+    def test_5_string_buffers_respect_slices_and_nulls(self):
+        """Buffers of a sliced array cover just its values, nulls reading as ''"""
+        # Arrange
+        array = pa.array(["skip", "héllo", None, "world"]).slice(1)
+
+        # Act
+        data, offsets = string_buffers(array)
+
+        # Assert
+        values = [data[offsets[i]:offsets[i + 1]].tobytes().decode("utf-8") for i in range(len(offsets) - 1)]
+        self.assertEqual(values, ["héllo", "", "world"])
+
+
+if __name__ == "__main__":
+    unittest.main()
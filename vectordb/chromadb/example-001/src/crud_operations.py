@@ -1,56 +1,68 @@
 import chromadb
-import csv
+import pyarrow as pa
+import pyarrow.compute as pc
+from catalog_filters import to_chroma_where
+from catalog_reader import CatalogSource, price_text, read_catalog_batches
+from catalog_updates import plan_update, product_changes
 from chromadb.config import Settings
 from typing import List, Dict, Any
 
+# The metadata fields of _create_metadata, selected straight from Arrow batches
+METADATA_FIELDS = ["product_id", "category", "price", "in_stock", "name"]
+
 
 class ChromaDBCatalogManager:
-    def __init__(self):
-        """Initialize Chroma client and collection"""
+    def __init__(self, embedding_function=None):
+        """
+        Initialize Chroma client and collection
+
+        embedding_function replaces Chroma's default (downloaded) model, e.g.
+        with a local deterministic one for tests and benchmarks.
+        """
         self.client = chromadb.Client(Settings(allow_reset=True))
         self.client.reset()  # Start fresh
-        self.collection = self.client.create_collection(name="products")
+        if embedding_function is None:
+            self.collection = self.client.create_collection(name="products")
+        else:
+            self.collection = self.client.create_collection(name="products",
+                                                            embedding_function=embedding_function)
         print("ChromaDB 'products' collection initialized")
 
-    def create_catalog_from_csv(self, csv_file_path: str) -> None:
+    def create_catalog_from_csv(self, csv_file_path: CatalogSource) -> None:
         """
         CREATE: Populate collection from CSV file
+
+        Also accepts a .parquet or .arrow/.feather file, or a pyarrow Table.
+        Rows are read as Arrow batches of the client's max batch size, and
+        documents and metadata are built from the batch columns.
         """
         print("\n--- POPULATING CATALOG (CREATE) ---")
         
-        documents, metadatas, ids = [], [], []
-        
-        with open(csv_file_path, newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                # Prepare the document text for embedding
-                doc_text = self._create_document_text(row)
-                documents.append(doc_text)
-                
-                # Prepare metadata for filtering
-                metadata = self._create_metadata(row)
-                metadatas.append(metadata)
-                ids.append(row['product_id'])
-        
-        # Add all products in a single batch operation
-        self.collection.add(
-            documents=documents,
-            metadatas=metadatas,
-            ids=ids
-        )
-        print(f"Added {len(ids)} products to catalog")
+        n_products = 0
+        for batch in read_catalog_batches(csv_file_path, self.client.get_max_batch_size()):
+            self.collection.add(
+                documents=self._document_texts(batch).to_pylist(),
+                metadatas=batch.select(METADATA_FIELDS).to_pylist(),
+                ids=batch.column('product_id').to_pylist()
+            )
+            n_products += batch.num_rows
+        print(f"Added {n_products} products to catalog")
 
 
     def search_products(self, query_text: str, n_results: int = 3, filters: Dict[str, Any] = None) -> List[Dict]:
         """
         READ: Search products with optional filters
+
+        filters use the shared filter language (catalog_filters), e.g.
+        {"category": "Laptop", "price": {"$lte": 1000.0}}, and are compiled
+        into a Chroma `where` clause evaluated by Chroma during the query.
         """
         print(f"\n--- SEARCHING PRODUCTS: '{query_text}' ---")
         
         results = self.collection.query(
             query_texts=[query_text],
             n_results=n_results,
-            where=filters,
+            where=to_chroma_where(filters) if filters else None,
             include=['documents', 'metadatas', 'distances']
         )
         
@@ -77,41 +89,36 @@ class ChromaDBCatalogManager:
                       in_stock: bool = None, new_description: str = None) -> bool:
         """
         UPDATE: Modify product information
+
+        Only a new description changes the embedded document; price and
+        stock changes are written as a metadata-only update, which Chroma
+        applies without embedding anything.
         """
         print(f"\n--- UPDATING PRODUCT {product_id} ---")
         
         # Get existing product data
-        existing_data = self.collection.get(ids=[product_id])
+        existing_data = self.collection.get(ids=[product_id], include=['documents', 'metadatas'])
         if not existing_data['ids']:
             print(f"Product {product_id} not found")
             return False
         
-        # Prepare updated data
+        # Keep only the fields that actually change
         current_meta = existing_data['metadatas'][0]
-        updated_metadata = current_meta.copy()
+        plan = plan_update({**current_meta, "description": existing_data['documents'][0]},
+                           product_changes(new_description, new_price, in_stock), embedded_fields=["description"])
+        if plan.noop:
+            print(f"Product {product_id} unchanged")
+            return True
+        updated_metadata = {**current_meta, **{field: value for field, value in plan.changes.items()
+                                               if field != "description"}}
         
-        # Update fields if provided
-        if new_price is not None:
-            updated_metadata["price"] = new_price
-        if in_stock is not None:
-            updated_metadata["in_stock"] = in_stock
-        
-        # Update document text if description changed
-        current_doc = existing_data['documents'][0]
-        if new_description:
-            updated_document = new_description
+        # Perform the update; the document (and its embedding) only when the description changed
+        if plan.reembed:
+            self.collection.update(ids=[product_id], documents=[new_description], metadatas=[updated_metadata])
         else:
-            # Keep the document structure but reflect price/stock changes
-            updated_document = current_doc  # In a real scenario, you might rebuild this
-        
-        # Perform the update
-        self.collection.update(
-            ids=[product_id],
-            documents=[updated_document],
-            metadatas=[updated_metadata]
-        )
+            self.collection.update(ids=[product_id], metadatas=[updated_metadata])
         
-        print(f"Updated product {product_id}")
+        print(f"Updated product {product_id}{'' if plan.reembed else ' (metadata only)'}")
         print(f"New Price: ${updated_metadata.get('price')}")
         print(f"In Stock: {updated_metadata.get('in_stock')}")
         return True
@@ -141,6 +148,13 @@ class ChromaDBCatalogManager:
         return f"{product_data['name']}. {product_data['description']} " \
                f"Category: {product_data['category']}. Price: ${product_data['price']}."
 
+    @staticmethod
+    def _document_texts(batch) -> pa.Array:
+        """_create_document_text for every row of an Arrow batch, computed column-wise"""
+        return pc.binary_join_element_wise(
+            batch.column('name'), ". ", batch.column('description'), " Category: ", batch.column('category'),
+            ". Price: $", price_text(batch.column('price')), ".", "")
+
     def _create_metadata(self, product_data: Dict) -> Dict:
         """Helper method to create metadata object"""
         return {
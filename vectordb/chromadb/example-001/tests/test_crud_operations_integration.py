@@ -205,6 +205,48 @@ class TestChromaDBCatalogIntegration(unittest.TestCase):
         results = self.catalog_mgr.search_products("gaming", n_results=1)
         self.assertEqual(len(results), 0, "Gaming laptop should be deleted")
 
+    def test_9_metadata_only_update_skips_embedding(self):
+        """Price and stock updates write metadata only; a new description is embedded"""
+        embedding_function = _counting_embedding_function()
+        catalog_mgr = ChromaDBCatalogManager(embedding_function=embedding_function)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+        embedded = len(embedding_function.texts)
+
+        self.assertTrue(catalog_mgr.update_product("prod_001", new_price=1199.99, in_stock=False))
+        self.assertTrue(catalog_mgr.update_product("prod_002", new_price=299.99))  # unchanged
+        self.assertEqual(len(embedding_function.texts), embedded)
+        stored = catalog_mgr.collection.get(ids=["prod_001"], include=["metadatas"])
+        self.assertEqual((stored['metadatas'][0]['price'], stored['metadatas'][0]['in_stock']), (1199.99, False))
+
+        catalog_mgr.update_product("prod_001", new_description="A refurbished laptop")
+        self.assertEqual(embedding_function.texts[embedded:], ["A refurbished laptop"])
+
+
+def _counting_embedding_function():
+    """A deterministic Chroma embedding function that records the texts it embeds"""
+    from chromadb.api.types import Documents, EmbeddingFunction, Embeddings
+
+    class CountingEmbeddingFunction(EmbeddingFunction[Documents]):
+        def __init__(self):
+            self.texts = []
+
+        def __call__(self, input: Documents) -> Embeddings:
+            self.texts.extend(input)
+            return [[float(len(text)), float(sum(map(ord, text)) % 97), 1.0] for text in input]
+
+        @staticmethod
+        def name() -> str:
+            return "test-counting"
+
+        def get_config(self):
+            return {}
+
+        @staticmethod
+        def build_from_config(config) -> "CountingEmbeddingFunction":
+            return CountingEmbeddingFunction()
+
+    return CountingEmbeddingFunction()
+
 if __name__ == '__main__':
     # Run tests with verbose output
     unittest.main(verbosity=2)
\ No newline at end of file
@@ -0,0 +1,677 @@
+"""
+Benchmarks for FaissCatalogManager on synthetic catalogs.
+
+Usage:
+    python -m src.benchmarks batch --products 20000 --queries 2000
+    python -m src.benchmarks ann --products 100000 --queries 500
+    python -m src.benchmarks compression --products 100000 --queries 500 --recall-tolerance 0.01
+    python -m src.benchmarks metadata --products 100000
+    python -m src.benchmarks encoding --products 20000 --queries 5000
+    python -m src.benchmarks shards --products 200000 --queries 500 --shards 1 2 4 8
+    python -m src.benchmarks hybrid --products 100000 --queries 500
+    python -m src.benchmarks persistence --products 100000
+    python -m src.benchmarks streaming --products 20000 50000 100000 --chunk-size 10000
+    python -m src.benchmarks parsing --products 1000000
+    python -m src.benchmarks deletes --products 100000 --fraction 0.3
+    python -m src.benchmarks concurrency --products 100000 --queries 2000 --threads 1 2 4 8
+"""
+import argparse
+import csv
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+import tracemalloc
+from typing import List
+
+import numpy as np
+import pyarrow.parquet as pq
+from catalog_generator import ADJECTIVES, CATEGORY_BRANDS, COLORS, write_catalog
+from catalog_reader import read_catalog
+
+from src.crud_operations import FaissCatalogManager
+from src.metadata_columns import MetadataColumns
+
+
+def synthetic_queries(n_queries: int, seed: int = 7) -> List[str]:
+    rng = random.Random(seed)
+    categories = list(CATEGORY_BRANDS)
+    queries = []
+    for _ in range(n_queries):
+        category = rng.choice(categories)
+        queries.append(f"{rng.choice(ADJECTIVES)} {rng.choice(COLORS).lower()} "
+                       f"{rng.choice(CATEGORY_BRANDS[category])} {category.lower()}")
+    return queries
+
+
+def build_catalog(n_products: int, **manager_kwargs) -> FaissCatalogManager:
+    """Create a quiet FaissCatalogManager loaded with a synthetic catalog"""
+    catalog_mgr = FaissCatalogManager(verbose=False, **manager_kwargs)
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    try:
+        write_catalog(csv_path, n_products, seed=42)
+        catalog_mgr.create_catalog_from_csv(csv_path)
+    finally:
+        os.unlink(csv_path)
+    return catalog_mgr
+
+
+def benchmark_batch_search(n_products: int, n_queries: int, n_results: int = 10) -> dict:
+    """Compare search_products in a loop against one search_products_batch call"""
+    catalog_mgr = build_catalog(n_products)
+    queries = synthetic_queries(n_queries)
+
+    start = time.perf_counter()
+    loop_results = [catalog_mgr.search_products(q, n_results=n_results) for q in queries]
+    loop_seconds = time.perf_counter() - start
+
+    start = time.perf_counter()
+    batch_results = catalog_mgr.search_products_batch(queries, n_results=n_results)
+    batch_seconds = time.perf_counter() - start
+
+    same = all([r['id'] for r in a] == [r['id'] for r in b] for a, b in zip(loop_results, batch_results))
+    report = {
+        "products": n_products,
+        "queries": n_queries,
+        "loop_qps": n_queries / loop_seconds,
+        "batch_qps": n_queries / batch_seconds,
+        "speedup": loop_seconds / batch_seconds,
+        "identical_results": same,
+    }
+    print(f"{n_products} products, {n_queries} queries, k={n_results}")
+    print(f"  single-query loop : {report['loop_qps']:10.1f} queries/s")
+    print(f"  batched           : {report['batch_qps']:10.1f} queries/s ({report['speedup']:.1f}x)")
+    print(f"  identical results : {same}")
+    return report
+
+
+def _search_latencies(catalog_mgr: FaissCatalogManager, query_vecs: np.ndarray, k: int, **knobs):
+    """Search one query at a time, returning (distances, per-query seconds)"""
+    distances = np.empty((len(query_vecs), k), dtype="float32")
+    latencies = np.empty(len(query_vecs))
+    for i in range(len(query_vecs)):
+        start = time.perf_counter()
+        distances[i], _ = catalog_mgr._search_ids(query_vecs[i:i + 1], k, **knobs)
+        latencies[i] = time.perf_counter() - start
+    return distances, latencies
+
+
+def _recall_at_k(exact: np.ndarray, approx: np.ndarray) -> float:
+    """
+    Fraction of returned neighbours that belong to the exact top-k.
+
+    Synthetic catalogs contain many identical vectors, so membership is
+    decided by distance (<= the exact k-th distance) rather than by id.
+    """
+    kth = exact[:, -1:] * (1 + 1e-5) + 1e-6
+    return float(((approx <= kth) & np.isfinite(approx) & (approx >= 0)).sum() / exact.size)
+
+
+def benchmark_ann(n_products: int, n_queries: int, k: int = 10,
+                  nprobes=(1, 2, 4, 8, 16, 32), ef_searches=(16, 32, 64, 128, 256)) -> List[dict]:
+    """Recall@k vs. latency of the IVF and HNSW families against the flat baseline"""
+    queries = synthetic_queries(n_queries)
+    rows = []
+
+    def run(index_type, knob_name=None, knob_values=(None,), **manager_kwargs):
+        start = time.perf_counter()
+        catalog_mgr = build_catalog(n_products, index_type=index_type, **manager_kwargs)
+        build_seconds = time.perf_counter() - start
+        query_vecs = catalog_mgr._encode_batch(queries)
+        for value in knob_values:
+            knobs = {knob_name: value} if knob_name else {}
+            distances, latencies = _search_latencies(catalog_mgr, query_vecs, k, **knobs)
+            rows.append({"index": index_type, "knob": f"{knob_name}={value}" if knob_name else "-",
+                         "build_s": build_seconds, "distances": distances,
+                         "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                         "p99_ms": float(np.percentile(latencies, 99) * 1000)})
+
+    run("flat")
+    run("ivf", "nprobe", nprobes)
+    run("hnsw", "ef_search", ef_searches)
+
+    exact = rows[0]["distances"]
+    print(f"{n_products} products, {n_queries} single queries, recall@{k} vs. flat baseline")
+    print(f"{'index':<6} {'knob':<14} {'recall':>7} {'p50 ms':>8} {'p99 ms':>8} {'build s':>8}")
+    for row in rows:
+        row["recall"] = _recall_at_k(exact, row.pop("distances"))
+        print(f"{row['index']:<6} {row['knob']:<14} {row['recall']:>7.3f} {row['p50_ms']:>8.3f} "
+              f"{row['p99_ms']:>8.3f} {row['build_s']:>8.2f}")
+    return rows
+
+
+def _traced_bytes(build) -> int:
+    """Python-heap bytes still held by the object build() returns"""
+    tracemalloc.start()
+    built = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del built
+    return size
+
+
+def _vector_dict_bytes(catalog_mgr: FaissCatalogManager) -> int:
+    """Bytes of the former per-product {product_id: ndarray} copy of every vector"""
+    return _traced_bytes(lambda: {pid: catalog_mgr.get_vector(pid).copy() for pid in catalog_mgr.product_to_id})
+
+
+def benchmark_compression(n_products: int, n_queries: int, k: int = 10, recall_tolerance: float = 0.01,
+                          rerank_factors=(1, 2, 4, 8)) -> List[dict]:
+    """Memory and recall@k of SQ8/PQ codes with exact re-ranking against the float32 flat index"""
+    queries = synthetic_queries(n_queries)
+    rows = []
+
+    baseline = build_catalog(n_products)
+    query_vecs = baseline._encode_batch(queries)
+    exact, latencies = _search_latencies(baseline, query_vecs, k)
+    usage = baseline.memory_usage()
+    # Before the contiguous array every vector was also held in a per-product dict
+    baseline_bytes = usage["index_bytes"] + _vector_dict_bytes(baseline)
+    rows.append({"config": "flat float32 + vector dict (before)", "index_mb": usage["index_bytes"] / 2**20,
+                 "total_mb": baseline_bytes / 2**20, "recall": 1.0,
+                 "p50_ms": float(np.percentile(latencies, 50) * 1000)})
+    del baseline
+
+    for compression in ("sq8", "pq"):
+        catalog_mgr = build_catalog(n_products, compression=compression)
+        usage = catalog_mgr.memory_usage()
+        for rerank_factor in rerank_factors:
+            catalog_mgr.rerank_factor = rerank_factor
+            distances, latencies = _search_latencies(catalog_mgr, query_vecs, k)
+            rows.append({"config": f"{compression} rerank x{rerank_factor}",
+                         "index_mb": usage["index_bytes"] / 2**20,
+                         "total_mb": (usage["index_bytes"] + usage["vector_bytes"]) / 2**20,
+                         "recall": _recall_at_k(exact, distances),
+                         "p50_ms": float(np.percentile(latencies, 50) * 1000)})
+
+    print(f"{n_products} products, {n_queries} single queries, recall@{k} tolerance {recall_tolerance}")
+    print("total = index + full-precision vectors held in RAM; memory-mapping the vectors "
+          "leaves only the index resident")
+    print(f"{'config':<36} {'index MB':>9} {'x smaller':>9} {'total MB':>9} {'recall':>7} {'p50 ms':>7}  ok")
+    baseline_index_mb = rows[0]["index_mb"]
+    for row in rows:
+        row["within_tolerance"] = row["recall"] >= 1.0 - recall_tolerance
+        print(f"{row['config']:<36} {row['index_mb']:>9.2f} {baseline_index_mb / row['index_mb']:>9.1f} "
+              f"{row['total_mb']:>9.2f} {row['recall']:>7.3f} {row['p50_ms']:>7.3f}  "
+              f"{'yes' if row['within_tolerance'] else 'no'}")
+    return rows
+
+
+def benchmark_metadata_memory(n_products: int) -> dict:
+    """
+    Per-product bytes of ids, metadata and document text: the former
+    documents/metadatas/id_to_product dicts vs. the column store plus the
+    product_to_id lookup it still needs
+    """
+    catalog_mgr = build_catalog(n_products)
+    columns = catalog_mgr.columns
+    rows = np.flatnonzero(columns.alive[:columns.size]).tolist()
+
+    def dict_layout():
+        product_ids = [columns.product_id.get(row) for row in rows]
+        return ({pid: columns.document.get(row) for pid, row in zip(product_ids, rows)},
+                {pid: columns.metadata(row) for pid, row in zip(product_ids, rows)},
+                {row: pid for pid, row in zip(product_ids, rows)},
+                {pid: row for pid, row in zip(product_ids, rows)})
+
+    def id_lookup():
+        return {columns.product_id.get(row): row for row in rows}
+
+    before = _traced_bytes(dict_layout)
+    lookup = _traced_bytes(id_lookup)
+    after = columns.nbytes() + lookup
+    report = {"products": n_products, "dicts_bytes_per_product": before / n_products,
+              "columns_bytes_per_product": columns.nbytes() / n_products,
+              "id_lookup_bytes_per_product": lookup / n_products,
+              "total_after_bytes_per_product": after / n_products}
+
+    print(f"{n_products} products, bytes per product for ids, metadata and document text")
+    print(f"  dicts (before)          : {report['dicts_bytes_per_product']:8.1f}")
+    print(f"  columns                 : {report['columns_bytes_per_product']:8.1f}")
+    print(f"  product_to_id lookup    : {report['id_lookup_bytes_per_product']:8.1f}")
+    print(f"  columns + lookup (after): {report['total_after_bytes_per_product']:8.1f}  "
+          f"({before / after:.1f}x smaller)")
+    return report
+
+
+def benchmark_query_encoding(n_products: int, n_queries: int, n_distinct: int = 200) -> dict:
+    """
+    Per-query encoding cost of sklearn's TfidfVectorizer + TruncatedSVD
+    transforms vs. the folded projection, and the LRU cache hit rate on a
+    Zipf-skewed query stream of n_distinct storefront queries
+    """
+    catalog_mgr = build_catalog(n_products)
+    distinct = synthetic_queries(n_distinct)
+    rng = np.random.default_rng(7)
+    weights = 1.0 / np.arange(1, n_distinct + 1)
+    stream = [distinct[i] for i in rng.choice(n_distinct, size=n_queries, p=weights / weights.sum())]
+
+    def per_query_us(encode) -> float:
+        start = time.perf_counter()
+        for query in stream:
+            encode(query)
+        return (time.perf_counter() - start) / n_queries * 1e6
+
+    vectorizer, svd = catalog_mgr.vectorizer, catalog_mgr.svd
+    encoder = catalog_mgr._encoder()
+    report = {
+        "products": n_products, "queries": n_queries, "distinct_queries": n_distinct,
+        "sklearn_us": per_query_us(lambda q: svd.transform(vectorizer.transform([q]))),
+        "folded_us": per_query_us(lambda q: encoder.transform([q])),
+    }
+    encoder.clear_cache()
+    report["cached_us"] = per_query_us(lambda q: encoder.encode_queries([q]))
+    info = encoder.cache_info()
+    report["hit_rate"] = info["hits"] / (info["hits"] + info["misses"])
+
+    print(f"{n_queries} single queries, {n_distinct} distinct (Zipf), cache size {info['max_size']}")
+    print(f"  TfidfVectorizer + TruncatedSVD : {report['sklearn_us']:8.1f} us/query")
+    print(f"  folded projection              : {report['folded_us']:8.1f} us/query "
+          f"({report['sklearn_us'] / report['folded_us']:.1f}x)")
+    print(f"  folded projection + LRU cache  : {report['cached_us']:8.1f} us/query "
+          f"({report['sklearn_us'] / report['cached_us']:.1f}x), hit rate {report['hit_rate']:.1%}")
+    return report
+
+
+def benchmark_sharded_search(n_products: int, n_queries: int, shard_counts=(1, 2, 4, 8),
+                             k: int = 10) -> List[dict]:
+    """Single-query p50 and batched throughput per shard count, checked against the unsharded distances"""
+    queries = synthetic_queries(n_queries)
+    rows = []
+    baseline = None
+    for n_shards in shard_counts:
+        catalog_mgr = build_catalog(n_products, n_shards=n_shards)
+        query_vecs = catalog_mgr._encode_batch(queries)
+        distances, latencies = _search_latencies(catalog_mgr, query_vecs, k)
+        start = time.perf_counter()
+        catalog_mgr._search_ids(query_vecs, k)
+        batch_seconds = time.perf_counter() - start
+        if baseline is None:
+            baseline = distances
+        rows.append({"shards": n_shards, "p50_ms": float(np.percentile(latencies, 50) * 1000),
+                     "p99_ms": float(np.percentile(latencies, 99) * 1000),
+                     "batch_qps": n_queries / batch_seconds,
+                     "identical": bool(np.array_equal(distances, baseline))})
+        catalog_mgr.close()
+
+    print(f"{n_products} products, {n_queries} queries, k={k}, {os.cpu_count()} CPUs")
+    print(f"{'shards':>6} {'p50 ms':>8} {'p99 ms':>8} {'batch q/s':>10}  identical")
+    for row in rows:
+        print(f"{row['shards']:>6} {row['p50_ms']:>8.3f} {row['p99_ms']:>8.3f} {row['batch_qps']:>10.0f}  "
+              f"{'yes' if row['identical'] else 'no'}")
+    return rows
+
+
+def benchmark_hybrid_search(n_products: int, n_queries: int, k: int = 10) -> dict:
+    """Per-stage p50/p99 latency of search_products_hybrid on "<brand> <category>" queries, per fusion method"""
+    catalog_mgr = build_catalog(n_products, hybrid=True)
+    rng = random.Random(11)
+    queries = []
+    for _ in range(n_queries):
+        category = rng.choice(list(CATEGORY_BRANDS))
+        queries.append(f"{rng.choice(CATEGORY_BRANDS[category])} {category}")
+
+    report = {"products": n_products, "queries": n_queries, "k": k}
+    for fusion in ("rrf", "weighted"):
+        timings = []
+        for query in queries:
+            catalog_mgr.search_products_hybrid(query, n_results=k, fusion=fusion)
+            timings.append(catalog_mgr.last_stage_timings)
+        report[fusion] = {stage: (float(np.percentile([t[stage] for t in timings], 50)),
+                                  float(np.percentile([t[stage] for t in timings], 99)))
+                          for stage in timings[0]}
+
+    print(f"{n_products} products, {n_queries} '<brand> <category>' queries, k={k}, p50 / p99 ms")
+    print(f"{'fusion':<9} {'encode':>15} {'dense':>15} {'lexical':>15} {'fusion':>15}")
+    for fusion in ("rrf", "weighted"):
+        print(f"{fusion:<9} " + " ".join(f"{p50:>7.3f}/{p99:<7.3f}" for p50, p99 in report[fusion].values()))
+    return report
+
+
+def benchmark_persistence(n_products: int) -> dict:
+    """Cold start from CSV (parse + TF-IDF/SVD fit) vs. load() of a saved catalog"""
+    fd, csv_path = tempfile.mkstemp(suffix=".csv")
+    os.close(fd)
+    catalog_dir = tempfile.mkdtemp()
+    try:
+        write_catalog(csv_path, n_products, seed=42)
+        start = time.perf_counter()
+        catalog_mgr = FaissCatalogManager(verbose=False)
+        catalog_mgr.create_catalog_from_csv(csv_path)
+        create_seconds = time.perf_counter() - start
+
+        start = time.perf_counter()
+        catalog_mgr.save(catalog_dir)
+        save_seconds = time.perf_counter() - start
+        expected = catalog_mgr.search_products("wireless headphones", n_results=5)
+        del catalog_mgr
+
+        report = {"products": n_products, "create_from_csv_s": create_seconds, "save_s": save_seconds}
+        for mmap in (True, False):
+            start = time.perf_counter()
+            loaded = FaissCatalogManager.load(catalog_dir, mmap=mmap, verbose=False)
+            report[f"load_mmap_{mmap}_s"] = time.perf_counter() - start
+            assert loaded.search_products("wireless headphones", n_results=5) == expected
+            del loaded
+        report["disk_mb"] = sum(os.path.getsize(os.path.join(root, name))
+                                for root, _, names in os.walk(catalog_dir) for name in names) / 2**20
+    finally:
+        os.unlink(csv_path)
+        shutil.rmtree(catalog_dir)
+
+    print(f"{n_products} products, {report['disk_mb']:.1f} MB on disk")
+    print(f"  create_catalog_from_csv : {report['create_from_csv_s'] * 1000:10.1f} ms")
+    print(f"  save                    : {report['save_s'] * 1000:10.1f} ms")
+    print(f"  load(mmap=True)         : {report['load_mmap_True_s'] * 1000:10.1f} ms")
+    print(f"  load(mmap=False)        : {report['load_mmap_False_s'] * 1000:10.1f} ms")
+    return report
+
+
+def benchmark_streaming(product_counts: List[int], chunk_size: int) -> List[dict]:
+    """
+    Peak Python-heap memory of create_catalog_from_csv vs. the chunked
+    create_catalog_from_csv_streaming. "transient" is peak minus what the
+    finished catalog retains, i.e. the ingestion overhead itself.
+    """
+    rows = []
+    for n_products in product_counts:
+        fd, csv_path = tempfile.mkstemp(suffix=".csv")
+        os.close(fd)
+        try:
+            write_catalog(csv_path, n_products, seed=42)
+            for mode in ("in-memory", "streaming"):
+                catalog_mgr = FaissCatalogManager(verbose=False)
+                tracemalloc.start()
+                start = time.perf_counter()
+                if mode == "streaming":
+                    catalog_mgr.create_catalog_from_csv_streaming(csv_path, chunk_size=chunk_size)
+                else:
+                    catalog_mgr.create_catalog_from_csv(csv_path)
+                seconds = time.perf_counter() - start
+                retained, peak = tracemalloc.get_traced_memory()
+                tracemalloc.stop()
+                rows.append({"products": n_products, "mode": mode, "seconds": seconds,
+                             "peak_mb": peak / 2**20, "retained_mb": retained / 2**20,
+                             "transient_mb": (peak - retained) / 2**20})
+                del catalog_mgr
+        finally:
+            os.unlink(csv_path)
+
+    print(f"chunk_size={chunk_size} (seconds include tracemalloc overhead)")
+    print(f"{'products':>9} {'mode':<10} {'seconds':>8} {'peak MB':>9} {'retained MB':>12} {'transient MB':>13}")
+    for row in rows:
+        print(f"{row['products']:>9} {row['mode']:<10} {row['seconds']:>8.2f} {row['peak_mb']:>9.1f} "
+              f"{row['retained_mb']:>12.1f} {row['transient_mb']:>13.1f}")
+    return rows
+
+
+def benchmark_parsing(n_products: int) -> List[dict]:
+    """
+    Time to turn a catalog file into documents plus metadata columns: the
+    former csv.DictReader loop with a dict per product, vs. Arrow columnar
+    batches read from the same CSV and from Parquet. "parse" is reading and
+    typing the fields, "total" adds document texts and the column store.
+    TF-IDF/SVD are not included.
+    """
+    data_dir = tempfile.mkdtemp()
+    csv_path = os.path.join(data_dir, "catalog.csv")
+    parquet_path = os.path.join(data_dir, "catalog.parquet")
+    catalog_mgr = FaissCatalogManager(verbose=False)
+
+    def row_wise(path):
+        with open(path, newline='') as csvfile:
+            rows = list(csv.DictReader(csvfile))
+        metadatas = [catalog_mgr._create_metadata(row) for row in rows]
+        parsed = time.perf_counter()
+        texts = [catalog_mgr._create_document_text(row) for row in rows]
+        MetadataColumns().set_rows(np.arange(len(texts)), metadatas, texts)
+        return parsed
+
+    def columnar(path):
+        table = read_catalog(path)
+        parsed = time.perf_counter()
+        documents = catalog_mgr._document_texts(table)
+        MetadataColumns().set_batch(np.arange(len(table)), table, documents)
+        documents.to_pylist()
+        return parsed
+
+    rows = []
+    try:
+        write_catalog(csv_path, n_products, seed=42)
+        pq.write_table(read_catalog(csv_path), parquet_path)
+        # Warm up Arrow's compute kernels so the first timed mode isn't charged for them
+        columnar(parquet_path)
+        for mode, parse, path in (("csv rows", row_wise, csv_path), ("csv columnar", columnar, csv_path),
+                                  ("parquet columnar", columnar, parquet_path)):
+            start = time.perf_counter()
+            parsed = parse(path)
+            rows.append({"mode": mode, "parse_seconds": parsed - start,
+                         "total_seconds": time.perf_counter() - start})
+    finally:
+        shutil.rmtree(data_dir)
+
+    base = rows[0]
+    print(f"{n_products} products")
+    print(f"{'mode':<17} {'parse s':>8} {'speed-up':>9} {'total s':>8} {'speed-up':>9}")
+    for row in rows:
+        print(f"{row['mode']:<17} {row['parse_seconds']:>8.2f} "
+              f"{base['parse_seconds'] / row['parse_seconds']:>8.1f}x {row['total_seconds']:>8.2f} "
+              f"{base['total_seconds'] / row['total_seconds']:>8.1f}x")
+    return rows
+
+
+def benchmark_bulk_delete(n_products: int, fraction: float, n_queries: int = 200, k: int = 10,
+                          rebuild_samples: int = 20) -> List[dict]:
+    """
+    Delete a fraction of the catalog one product at a time. "former ms" is
+    what a delete used to cost, measured on rebuild_samples deletes: a full
+    index rebuild with use_id_map=False, index.remove_ids with an id map
+    (HNSW deletes were already tombstoned). "delete" is a tombstoned delete
+    while background compaction runs. Search latency is measured with the
+    tombstones still in the index and again after the compacted index is in.
+    """
+    configs = [("flat", {}), ("flat no id map", {"use_id_map": False}),
+               ("ivf", {"index_type": "ivf"}), ("hnsw", {"index_type": "hnsw"})]
+    queries = synthetic_queries(n_queries)
+    rows = []
+    for name, config in configs:
+        catalog_mgr = build_catalog(n_products, **config)
+        query_vecs = catalog_mgr._encode_batch(queries)
+        product_ids = list(catalog_mgr.documents.keys())
+        doomed = random.Random(3).sample(product_ids, int(n_products * fraction))
+
+        former = []
+        for product_id in doomed[:rebuild_samples if name != "hnsw" else 0]:
+            start = time.perf_counter()
+            if catalog_mgr.use_id_map:
+                catalog_mgr.index.remove_ids(np.array([catalog_mgr.product_to_id[product_id]], dtype="int64"))
+                former.append(time.perf_counter() - start)
+                catalog_mgr.delete_product(product_id)
+            else:
+                catalog_mgr.delete_product(product_id)
+                catalog_mgr.compact()
+                former.append(time.perf_counter() - start)
+        catalog_mgr.compact()
+
+        deletes = []
+        for product_id in doomed[len(former):]:
+            start = time.perf_counter()
+            catalog_mgr.delete_product(product_id)
+            deletes.append(time.perf_counter() - start)
+        _, tombstoned = _search_latencies(catalog_mgr, query_vecs, k)
+        start = time.perf_counter()
+        catalog_mgr.compact()
+        drain_seconds = time.perf_counter() - start
+        _, compacted = _search_latencies(catalog_mgr, query_vecs, k)
+
+        rows.append({"index": name, "deletes": len(doomed),
+                     "former_ms": float(np.mean(former) * 1000) if former else None,
+                     "delete_p50_ms": float(np.percentile(deletes, 50) * 1000),
+                     "delete_p99_ms": float(np.percentile(deletes, 99) * 1000),
+                     "total_delete_s": float(np.sum(deletes)), "drain_s": drain_seconds,
+                     "compactions": catalog_mgr.compaction_info()["compactions"],
+                     "search_tombstoned_p50_ms": float(np.percentile(tombstoned, 50) * 1000),
+                     "search_compacted_p50_ms": float(np.percentile(compacted, 50) * 1000)})
+
+    print(f"{n_products} products, deleting {fraction:.0%} one at a time")
+    print(f"{'index':<15} {'former ms':>10} {'delete p50':>10} {'delete p99':>10} {'total s':>8} "
+          f"{'drain s':>8} {'compactions':>11} {'search ms':>16}")
+    for row in rows:
+        former_ms = f"{row['former_ms']:.2f}" if row['former_ms'] is not None else "-"
+        print(f"{row['index']:<15} {former_ms:>10} {row['delete_p50_ms']:>10.4f} "
+              f"{row['delete_p99_ms']:>10.4f} {row['total_delete_s']:>8.2f} {row['drain_s']:>8.2f} "
+              f"{row['compactions']:>11} {row['search_tombstoned_p50_ms']:>7.3f} -> "
+              f"{row['search_compacted_p50_ms']:<6.3f}")
+    return rows
+
+
+def benchmark_concurrent_search(n_products: int, n_queries: int, thread_counts: List[int],
+                                k: int = 10) -> List[dict]:
+    """
+    Search throughput with n search threads sharing one catalog, alone and
+    while a writer thread streams update_product calls as fast as it can.
+    Each run searches the same n_queries, split across the threads. Searches
+    never wait for the writer, so "with writer" QPS only drops by the CPU the
+    writer and its background compactions take.
+    """
+    catalog_mgr = build_catalog(n_products)
+    queries = synthetic_queries(n_queries)
+    product_ids = list(catalog_mgr.documents.keys())
+
+    def run(n_threads: int, with_writer: bool) -> dict:
+        searching = threading.Event()
+        updates = [0]
+
+        def write():
+            rng = random.Random(n_threads)
+            while searching.is_set():
+                catalog_mgr.update_product(rng.choice(product_ids), new_price=round(rng.uniform(10.99, 999.99), 2))
+                updates[0] += 1
+
+        def search(worker: int):
+            for query in queries[worker::n_threads]:
+                catalog_mgr.search_products(query, n_results=k)
+
+        searchers = [threading.Thread(target=search, args=(worker,)) for worker in range(n_threads)]
+        writer = threading.Thread(target=write)
+        compactions = catalog_mgr.compaction_info()["compactions"]
+        searching.set()
+        start = time.perf_counter()
+        if with_writer:
+            writer.start()
+        for thread in searchers:
+            thread.start()
+        for thread in searchers:
+            thread.join()
+        seconds = time.perf_counter() - start
+        searching.clear()
+        if with_writer:
+            writer.join()
+        return {"qps": n_queries / seconds, "updates_per_s": updates[0] / seconds,
+                "compactions": catalog_mgr.compaction_info()["compactions"] - compactions}
+
+    rows = []
+    for n_threads in thread_counts:
+        alone = run(n_threads, with_writer=False)
+        streaming = run(n_threads, with_writer=True)
+        rows.append({"threads": n_threads, "qps": alone["qps"], "qps_with_writer": streaming["qps"],
+                     "updates_per_s": streaming["updates_per_s"], "compactions": streaming["compactions"]})
+    catalog_mgr.compact()
+
+    print(f"{n_products} products, {n_queries} queries, k={k}, {os.cpu_count()} CPUs")
+    print(f"{'threads':>7} {'QPS':>9} {'QPS + writer':>13} {'updates/s':>10} {'compactions':>11}")
+    for row in rows:
+        print(f"{row['threads']:>7} {row['qps']:>9.1f} {row['qps_with_writer']:>13.1f} "
+              f"{row['updates_per_s']:>10.1f} {row['compactions']:>11}")
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="FaissCatalogManager benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    batch = subparsers.add_parser("batch", help="single-query loop vs search_products_batch")
+    batch.add_argument("--products", type=int, default=20000)
+    batch.add_argument("--queries", type=int, default=2000)
+    batch.add_argument("--k", type=int, default=10)
+
+    ann = subparsers.add_parser("ann", help="recall@k vs. latency of IVF/HNSW against flat")
+    ann.add_argument("--products", type=int, default=100000)
+    ann.add_argument("--queries", type=int, default=500)
+    ann.add_argument("--k", type=int, default=10)
+
+    compression = subparsers.add_parser("compression", help="memory and recall of SQ8/PQ with exact re-ranking")
+    compression.add_argument("--products", type=int, default=100000)
+    compression.add_argument("--queries", type=int, default=500)
+    compression.add_argument("--k", type=int, default=10)
+    compression.add_argument("--recall-tolerance", type=float, default=0.01)
+
+    metadata = subparsers.add_parser("metadata", help="per-product memory of the dict layout vs. the column store")
+    metadata.add_argument("--products", type=int, default=100000)
+
+    encoding = subparsers.add_parser("encoding", help="query encoding: sklearn transforms vs. folded projection + cache")
+    encoding.add_argument("--products", type=int, default=20000)
+    encoding.add_argument("--queries", type=int, default=5000)
+
+    shards = subparsers.add_parser("shards", help="single and batched search latency per shard count")
+    shards.add_argument("--products", type=int, default=200000)
+    shards.add_argument("--queries", type=int, default=500)
+    shards.add_argument("--shards", type=int, nargs="+", default=[1, 2, 4, 8])
+    shards.add_argument("--k", type=int, default=10)
+
+    hybrid = subparsers.add_parser("hybrid", help="per-stage latency and brand precision of hybrid search")
+    hybrid.add_argument("--products", type=int, default=100000)
+    hybrid.add_argument("--queries", type=int, default=500)
+    hybrid.add_argument("--k", type=int, default=10)
+
+    persistence = subparsers.add_parser("persistence", help="create_catalog_from_csv vs. load of a saved catalog")
+    persistence.add_argument("--products", type=int, default=100000)
+
+    streaming = subparsers.add_parser("streaming", help="peak memory of in-memory vs. chunked streaming ingestion")
+    streaming.add_argument("--products", type=int, nargs="+", default=[20000, 50000, 100000])
+    streaming.add_argument("--chunk-size", type=int, default=10000)
+
+    parsing = subparsers.add_parser("parsing", help="row-wise CSV parsing vs. Arrow columnar batches")
+    parsing.add_argument("--products", type=int, default=1000000)
+
+    deletes = subparsers.add_parser("deletes", help="tombstoned deletes with background compaction vs. rebuilds")
+    deletes.add_argument("--products", type=int, default=100000)
+    deletes.add_argument("--fraction", type=float, default=0.3)
+
+    concurrency = subparsers.add_parser("concurrency", help="search QPS per thread count, with and without a writer")
+    concurrency.add_argument("--products", type=int, default=100000)
+    concurrency.add_argument("--queries", type=int, default=2000)
+    concurrency.add_argument("--threads", type=int, nargs="+", default=[1, 2, 4, 8])
+
+    args = parser.parse_args()
+    if args.benchmark == "batch":
+        benchmark_batch_search(args.products, args.queries, args.k)
+    elif args.benchmark == "ann":
+        benchmark_ann(args.products, args.queries, args.k)
+    elif args.benchmark == "compression":
+        benchmark_compression(args.products, args.queries, args.k, args.recall_tolerance)
+    elif args.benchmark == "metadata":
+        benchmark_metadata_memory(args.products)
+    elif args.benchmark == "encoding":
+        benchmark_query_encoding(args.products, args.queries)
+    elif args.benchmark == "shards":
+        benchmark_sharded_search(args.products, args.queries, args.shards, args.k)
+    elif args.benchmark == "hybrid":
+        benchmark_hybrid_search(args.products, args.queries, args.k)
+    elif args.benchmark == "persistence":
+        benchmark_persistence(args.products)
+    elif args.benchmark == "streaming":
+        benchmark_streaming(args.products, args.chunk_size)
+    elif args.benchmark == "parsing":
+        benchmark_parsing(args.products)
+    elif args.benchmark == "deletes":
+        benchmark_bulk_delete(args.products, args.fraction)
+    elif args.benchmark == "concurrency":
+        benchmark_concurrent_search(args.products, args.queries, args.threads)
+
+
+if __name__ == "__main__":
+    main()
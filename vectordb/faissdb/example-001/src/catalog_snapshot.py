@@ -0,0 +1,99 @@
+from typing import Any, Dict, Optional, Tuple
+
+import numpy as np
+
+from src.filters import compile_filter
+from src.inverted_index import InvertedIndex
+from src.metadata_columns import MetadataColumns
+from src.query_encoder import QueryEncoder
+
+
+class CatalogSnapshot:
+    """
+    Everything a search reads, as of one generation of the catalog.
+
+    FaissCatalogManager publishes a new snapshot after every write by
+    replacing a single attribute; a search reads that attribute once and
+    works only on what the snapshot refers to. None of it changes afterwards:
+    a published FAISS index is replaced by compaction, never written to;
+    vector and column rows below n_rows are never rewritten (price and stock
+    changes go to a copy of the columns, see MetadataColumns.with_values);
+    and rows deleted by later generations stay visible here through their
+    deleted_at stamp.
+
+    Rows [indexed_rows, n_rows) were written after the index was built. They
+    are searched exactly over their full-precision vectors until a compaction
+    folds them into a new index.
+    """
+
+    __slots__ = ("generation", "index", "position_ids", "indexed_rows", "n_rows", "tombstones",
+                 "vectors", "columns", "encoder", "lexical_index")
+
+    def __init__(self, generation: int, index: Any, position_ids: Optional[np.ndarray], indexed_rows: int,
+                 n_rows: int, tombstones: int, vectors: np.ndarray, columns: MetadataColumns,
+                 encoder: QueryEncoder, lexical_index: Optional[InvertedIndex]):
+        self.generation = generation
+        self.index = index
+        # FAISS label -> row, only with use_id_map=False
+        self.position_ids = position_ids
+        self.indexed_rows = indexed_rows
+        self.n_rows = n_rows
+        # Vectors in the index whose row this generation has deleted
+        self.tombstones = tombstones
+        self.vectors = vectors
+        self.columns = columns
+        self.encoder = encoder
+        self.lexical_index = lexical_index
+
+    def row_mask(self, filters: Dict[str, Any] = None) -> np.ndarray:
+        """Boolean mask over rows [0, n_rows) of products alive in this generation and matching filters"""
+        mask = self.columns.visible(self.n_rows, self.generation)
+        if filters:
+            mask &= compile_filter(filters)(self.columns)[:self.n_rows]
+        return mask
+
+    def search_delta(self, query_vecs: np.ndarray, k: int,
+                     mask: np.ndarray = None) -> Optional[Tuple[np.ndarray, np.ndarray]]:
+        """
+        Exact top-k (distances, rows) among the rows not yet in the index, or
+        None when there are none; mask is a row_mask() result, by default
+        every row alive in this generation
+        """
+        if self.n_rows == self.indexed_rows:
+            return None
+        if mask is None:
+            eligible = self.columns.deleted_at[self.indexed_rows:self.n_rows] > self.generation
+        else:
+            eligible = mask[self.indexed_rows:self.n_rows]
+        rows = self.indexed_rows + np.flatnonzero(eligible)
+        if len(rows) == 0:
+            return None
+        vectors = self.vectors[rows]
+        distances = (query_vecs ** 2).sum(axis=1)[:, None] - 2 * query_vecs @ vectors.T \
+            + (vectors ** 2).sum(axis=1)[None, :]
+        np.maximum(distances, 0, out=distances)
+        if len(rows) > k:
+            top = np.argpartition(distances, k - 1, axis=1)[:, :k]
+            distances = np.take_along_axis(distances, top, axis=1)
+            candidates = rows[top]
+        else:
+            candidates = np.broadcast_to(rows, distances.shape)
+        order = np.argsort(distances, axis=1, kind="stable")
+        return (np.take_along_axis(distances, order, axis=1).astype("float32"),
+                np.take_along_axis(candidates, order, axis=1).astype("int64"))
+
+
+def merge_top_k(distances: np.ndarray, ids: np.ndarray,
+                other_distances: np.ndarray, other_ids: np.ndarray, k: int):
+    """Per-query k nearest of two (distances, ids) lists; -1 ids stay at the end"""
+    distances = np.concatenate([distances, other_distances], axis=1)
+    ids = np.concatenate([ids, other_ids], axis=1)
+    distances = np.where(ids < 0, np.inf, distances)
+    order = np.argsort(distances, axis=1, kind="stable")[:, :k]
+    distances = np.take_along_axis(distances, order, axis=1)
+    ids = np.take_along_axis(ids, order, axis=1)
+    if ids.shape[1] < k:
+        pad = k - ids.shape[1]
+        distances = np.pad(distances, ((0, 0), (0, pad)), constant_values=np.inf)
+        ids = np.pad(ids, ((0, 0), (0, pad)), constant_values=-1)
+    return distances, ids
@@ -0,0 +1,167 @@
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import List
+
+import faiss
+import numpy as np
+
+from src.catalog_snapshot import CatalogSnapshot
+from src.sharded_index import ShardedIndex
+
+# Live vectors copied into the compacted index per add call
+COMPACTION_CHUNK_SIZE = 65536
+
+
+class CatalogVersions:
+    """
+    Snapshot publishing and background compaction for one FaissCatalogManager.
+
+    publish() turns the catalog's writer state into the next CatalogSnapshot,
+    which is all a search reads. A compaction folds the rows written since
+    the index was built into a new index on a single worker thread, dropping
+    tombstoned vectors, and publishes it under the catalog's write lock.
+    Only the published index and rows below its n_rows are read while
+    building, and none of them change any more, so writes go on meanwhile;
+    they are rows the next compaction picks up.
+
+    Every create starts a new epoch (reset()), so a compaction of the
+    previous catalog is dropped when it finishes. Methods other than
+    close() and the compaction thread expect the write lock to be held.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        # What searches read, replaced whole by publish() after every write
+        self.snapshot: CatalogSnapshot = None
+        self.epoch = 0
+        self.compaction: Future = None
+        self.compactions = 0
+        # Set by close() under the write lock; writes and compactions refuse to start afterwards
+        self.closed = False
+        # Empty copy of a trained IVF/SQ/PQ index, compactions start from it (see empty_index)
+        self.template: faiss.Index = None
+        self._executor: ThreadPoolExecutor = None
+
+    def reset(self, template: faiss.Index = None) -> None:
+        """Start a new epoch for a newly created catalog; a running compaction is dropped when it finishes"""
+        self.epoch += 1
+        self.compaction = None
+        self.template = template
+
+    def check_open(self) -> None:
+        if self.closed:
+            raise ValueError("Catalog is closed")
+
+    def publish(self) -> None:
+        """Make the catalog's writer state visible to searches as the next snapshot"""
+        catalog, previous = self.catalog, self.snapshot
+        self.snapshot = CatalogSnapshot(
+            generation=previous.generation + 1 if previous is not None else 0, index=catalog.index,
+            position_ids=catalog._position_ids, indexed_rows=catalog._indexed_rows, n_rows=catalog._next_id,
+            tombstones=catalog._tombstones, vectors=catalog._vectors, columns=catalog.columns,
+            encoder=catalog._encoder(), lexical_index=catalog.lexical_index)
+        self.maybe_compact()
+
+    def maybe_compact(self) -> None:
+        """Start a compaction once unindexed rows or tombstones pass the catalog's limits"""
+        catalog = self.catalog
+        if self.compaction is not None or self.closed:
+            return
+        n_delta = catalog._next_id - catalog._indexed_rows
+        ntotal = catalog.index.ntotal
+        if (catalog.delta_size is not None and n_delta > catalog.delta_size) or \
+                (catalog.compaction_threshold is not None
+                 and catalog._tombstones > catalog.compaction_threshold * ntotal):
+            catalog._log(f"{n_delta} unindexed rows, {catalog._tombstones} of {ntotal} vectors "
+                         f"are tombstones, compacting")
+            self.start_compaction()
+
+    def start_compaction(self) -> Future:
+        """
+        Hand a compaction to the compaction thread, or return None when
+        there is nothing to compact. With tombstones the new index is built
+        from the live vectors, otherwise the published index is copied and
+        the unindexed rows appended.
+        """
+        self.check_open()
+        catalog = self.catalog
+        n_rows = catalog._next_id
+        if not catalog._tombstones and n_rows == catalog._indexed_rows:
+            return None
+        rebuild = catalog._tombstones > 0
+        first = 0 if rebuild else catalog._indexed_rows
+        rows = (first + np.flatnonzero(catalog.columns.alive[first:n_rows])).astype("int64")
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="faiss-compaction")
+        self.compaction = self._executor.submit(
+            self._run_compaction, self.epoch, rebuild, catalog.index, catalog._mmap_index_paths,
+            catalog._position_ids, self.template, catalog._vectors, rows, n_rows, catalog.dim)
+        return self.compaction
+
+    def close(self) -> None:
+        """Refuse further compactions, then wait for a running one to publish"""
+        with self.catalog._write_lock:
+            self.closed = True
+            executor, self._executor = self._executor, None
+        # Outside the lock: a running compaction takes it to publish its index
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    def _run_compaction(self, epoch: int, rebuild: bool, index, mmap_paths: List[str],
+                        position_ids: np.ndarray, template: faiss.Index, vectors: np.ndarray,
+                        rows: np.ndarray, n_rows: int, dim: int) -> None:
+        """Build the compacted index on the compaction thread, then publish it"""
+        catalog = self.catalog
+        try:
+            if rebuild:
+                if template is None and (catalog.index_type == "ivf" or catalog.compression):
+                    # Loaded catalogs: copy the trained quantizer out of the index once
+                    template = self.writable_copy(catalog._index_parts(index)[0], mmap_paths and mmap_paths[:1])
+                    template.reset()
+                index, position_ids = self.empty_index(template, dim), None
+            else:
+                index = self.writable_copy(index, mmap_paths)
+            for start in range(0, len(rows), COMPACTION_CHUNK_SIZE):
+                ids = rows[start:start + COMPACTION_CHUNK_SIZE]
+                if catalog.use_id_map:
+                    index.add_with_ids(np.ascontiguousarray(vectors[ids]), ids)
+                else:
+                    index.add(np.ascontiguousarray(vectors[ids]))
+            if not catalog.use_id_map:
+                position_ids = rows if position_ids is None else np.concatenate([position_ids, rows])
+        except BaseException:
+            with catalog._write_lock:
+                if epoch == self.epoch:
+                    self.compaction = None
+            raise
+
+        with catalog._write_lock:
+            if epoch != self.epoch:
+                return
+            catalog.index, catalog._position_ids = index, position_ids
+            catalog._indexed_rows = n_rows
+            # Every row alive now below n_rows is in the new index, the rest of it are tombstones
+            catalog._tombstones = index.ntotal - int(np.count_nonzero(catalog.columns.alive[:n_rows]))
+            if template is not None:
+                self.template = template
+            catalog._mmap_index_paths = None
+            self.compaction = None
+            self.compactions += 1
+            catalog._log(f"Compacted index published: {index.ntotal} vectors, {catalog._tombstones} tombstones")
+            self.publish()
+
+    def writable_copy(self, index, mmap_paths: List[str] = None):
+        """An in-memory copy of index; memory-mapped indexes are read again from their files"""
+        if mmap_paths:
+            return self.catalog._read_index(mmap_paths) if len(mmap_paths) > 1 else faiss.read_index(mmap_paths[0])
+        if isinstance(index, ShardedIndex):
+            return self.catalog._sharded_index([faiss.clone_index(shard) for shard in index.shards])
+        return faiss.clone_index(index)
+
+    def empty_index(self, template: faiss.Index, dim: int):
+        """A new empty index; IVF/SQ/PQ copy template so vectors encode exactly as before"""
+        if template is None:
+            return self.catalog._new_index(dim)
+        if self.catalog.n_shards > 1:
+            return self.catalog._sharded_index([faiss.clone_index(template)
+                                                for _ in range(self.catalog.n_shards)])
+        return faiss.clone_index(template)
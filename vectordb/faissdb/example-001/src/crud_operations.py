@@ -1,181 +1,633 @@
-import csv
+import functools
+import json
+import os
+import random
+import threading
+import time
+import zlib
+from concurrent.futures import ThreadPoolExecutor
 import faiss
 import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
 from typing import List, Dict, Any
+from catalog_reader import CatalogSource, price_text, read_catalog, read_catalog_batches
+from catalog_updates import plan_update, product_changes
 from sklearn.feature_extraction.text import TfidfVectorizer
+from scipy import sparse
 from sklearn.decomposition import TruncatedSVD
+from src.catalog_snapshot import CatalogSnapshot, merge_top_k
+from src.catalog_versions import CatalogVersions
+from src.featurizers import HashingTfidfVectorizer
+from src.fusion import FUSION_METHODS, reciprocal_rank_fusion, weighted_score_fusion
+from src.inverted_index import InvertedIndex
+from src.metadata_columns import MetadataColumns, RowMapping
+from src.query_encoder import QueryEncoder
+from src.sharded_index import ShardedIndex
+
+INDEX_TYPES = ("flat", "ivf", "hnsw")
+COMPRESSIONS = (None, "sq8", "pq")
+CATALOG_FORMAT_VERSION = 3
+COMPACTION_THRESHOLD = 0.2
+DELTA_SIZE = 8192
+
+def _exclusive(method):
+    """Run a FaissCatalogManager method under its write lock"""
+    @functools.wraps(method)
+    def locked(self, *args, **kwargs):
+        with self._write_lock:
+            return method(self, *args, **kwargs)
+    return locked
+
 
 class FaissCatalogManager:
-    def __init__(self, dim: int = 100):
+    def __init__(self, dim: int = 100, use_id_map: bool = True, verbose: bool = True,
+                 index_type: str = "flat", nlist: int = None, nprobe: int = 8,
+                 hnsw_m: int = 32, ef_search: int = 64, random_state: int = 42,
+                 compression: str = None, pq_m: int = None, rerank_factor: int = 4,
+                 query_cache_size: int = 1024, n_shards: int = 1, hybrid: bool = False,
+                 compaction_threshold: float = COMPACTION_THRESHOLD, delta_size: int = DELTA_SIZE):
         """
-        Initialize FAISS index with TF-IDF embeddings
+        Initialize FAISS index with TF-IDF embeddings; the options are described in README.md
         """
-        self.vectorizer = TfidfVectorizer(max_features=5000, stop_words='english')
+        if index_type not in INDEX_TYPES:
+            raise ValueError(f"Unknown index_type '{index_type}', expected one of {INDEX_TYPES}")
+        if compression not in COMPRESSIONS:
+            raise ValueError(f"Unknown compression '{compression}', expected one of {COMPRESSIONS}")
+        if (index_type != "flat" or compression) and not use_id_map:
+            raise ValueError("use_id_map=False is only supported with an uncompressed flat index")
+        if compression and index_type == "hnsw":
+            raise ValueError("compression is only supported with index_type 'flat' or 'ivf'")
+        if n_shards < 1 or (n_shards > 1 and not use_id_map):
+            raise ValueError("n_shards must be >= 1, and sharding requires use_id_map=True")
+        self.verbose = verbose
+        self.vectorizer = self._new_tfidf_vectorizer()
         self.dim = dim
-        self.index = faiss.IndexFlatL2(dim)
-        self.documents: Dict[str, str] = {}
-        self.metadatas: Dict[str, Dict] = {}
-        self.id_to_vector: Dict[str, np.ndarray] = {}
-        self.svd = TruncatedSVD(n_components=dim)
+        self.use_id_map = use_id_map
+        self.index_type = index_type
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.hnsw_m = hnsw_m
+        self.ef_search = ef_search
+        self.random_state = random_state
+        self.compression = compression
+        self.pq_m = pq_m
+        self.rerank_factor = max(1, rerank_factor)
+        self.query_cache_size = query_cache_size
+        self.n_shards = n_shards
+        # Searches every ShardedIndex of this catalog, including those compactions build; see close()
+        self._shard_pool = ThreadPoolExecutor(max_workers=n_shards, thread_name_prefix="faiss-shard") \
+            if n_shards > 1 else None
+        self.hybrid = hybrid
+        self.compaction_threshold = compaction_threshold
+        self.delta_size = delta_size
+        # The writer's state; searches read the published snapshot of it instead
+        self.index = self._new_index(dim)
+        # Full-precision vectors, row == FAISS id
+        self._vectors = np.zeros((0, dim), dtype="float32")
+        # The only per-product Python objects; row -> product goes through the columns
+        self.product_to_id: Dict[str, int] = {}
+        self._next_id = 0
+        # Metadata and document text as columns, row == FAISS id
+        self.columns = MetadataColumns()
+        # Only used with use_id_map=False, where FAISS labels are positions
+        self._position_ids: np.ndarray = None
+        # Vectors still in the index whose id no longer belongs to a product
+        self._tombstones = 0
+        # Live rows below this are in the index, later ones are searched exactly
+        self._indexed_rows = 0
+        # Serializes writers and compaction publishes; searches never take it
+        self._write_lock = threading.RLock()
+        # Published snapshots and background compaction
+        self._versions = CatalogVersions(self)
+        self.svd = TruncatedSVD(n_components=dim, random_state=random_state)
+        # Built from the fitted vectorizer/SVD on first use, see _encoder()
+        self._query_encoder: QueryEncoder = None
+        # TF-IDF postings per id, only kept with hybrid=True
+        self.lexical_index: InvertedIndex = None
+        # Per-stage milliseconds of the last search_products_hybrid call
+        self.last_stage_timings: Dict[str, float] = {}
         self.is_fitted = False
-        print(f"FAISS index initialized with dimension {dim}")
+        # Set by load(mmap=True): the index files, re-read when compaction needs a writable copy
+        self._mmap_index_paths: List[str] = None
+        # Set by load(mmap=True) until the first write copies vectors and columns
+        self._mmapped = False
+        self._log(f"FAISS index initialized with dimension {dim}")
 
-    def create_catalog_from_csv(self, csv_file_path: str) -> None:
+    @_exclusive
+    def create_catalog_from_csv(self, csv_file_path: CatalogSource) -> None:
         """
-        CREATE: Populate FAISS index from CSV file
+        CREATE: Populate FAISS index from a CSV, Parquet or Arrow file, or a pyarrow Table
         """
-        print("\n--- POPULATING CATALOG (CREATE) ---")
-        texts = []
-        rows = []
-        
-        with open(csv_file_path, newline='') as csvfile:
-            reader = csv.DictReader(csvfile)
-            for row in reader:
-                product_id = row['product_id']
-                doc_text = self._create_document_text(row)
-                metadata = self._create_metadata(row)
-                
-                texts.append(doc_text)
-                rows.append((product_id, doc_text, metadata))
+        self._versions.check_open()
+        self._log("\n--- POPULATING CATALOG (CREATE) ---")
+        self.vectorizer = self._new_tfidf_vectorizer()
+        table = read_catalog(csv_file_path)
+        documents = self._document_texts(table)
+        texts = documents.to_pylist()
+        rows = table.column('product_id').to_pylist()
         
         # Fit TF-IDF
         tfidf_matrix = self.vectorizer.fit_transform(texts)
         
         # Check vocabulary size and adjust SVD if needed
         vocab_size = len(self.vectorizer.get_feature_names_out())
-        print(f"Vocabulary size: {vocab_size}")
+        self._log(f"Vocabulary size: {vocab_size}")
         
         # RECREATE THE INDEX WITH THE CORRECT DIMENSION
         if vocab_size < self.dim:
             # Use all available features
             actual_dim = vocab_size
-            self.svd = TruncatedSVD(n_components=actual_dim)
-            print(f"Using all available features: {actual_dim}")
+            self.svd = TruncatedSVD(n_components=actual_dim, random_state=self.random_state)
+            self._log(f"Using all available features: {actual_dim}")
         else:
             actual_dim = self.dim
         
         # RECREATE FAISS INDEX WITH CORRECT DIMENSION
-        self.index = faiss.IndexFlatL2(actual_dim)
+        self.index = self._new_index(actual_dim, n_vectors=len(rows))
         self.dim = actual_dim  # Update the dimension
         
         reduced_vectors = self.svd.fit_transform(tfidf_matrix)
+
+        # IVF/SQ/PQ learn their quantizers from the catalog's own SVD vectors
+        if not self.index.is_trained:
+            self._log(f"Training {self.index_type.upper()} index on {len(rows)} vectors")
+            self.index.train(np.ascontiguousarray(reduced_vectors, dtype="float32"))
         
         # Clear any existing data
-        self.documents.clear()
-        self.metadatas.clear()
-        self.id_to_vector.clear()
-        
-        # Prepare all vectors for batch addition
-        all_vectors = []
-        for i, (product_id, doc_text, metadata) in enumerate(rows):
-            vector = reduced_vectors[i].astype("float32")
-            all_vectors.append(vector)
-            
-            self.documents[product_id] = doc_text
-            self.metadatas[product_id] = metadata
-            self.id_to_vector[product_id] = vector
+        self._reset_catalog(len(rows))
         
         # Add all vectors at once to the index
-        if all_vectors:
-            self.index.add(np.array(all_vectors))
+        if rows:
+            ids = self._assign_ids(rows)
+            self.columns.set_batch(ids, table, documents)
+            self._index_add(np.ascontiguousarray(reduced_vectors, dtype="float32"), ids)
+        if self.hybrid:
+            # Ids were assigned 0..N-1 in row order, so TF-IDF row i is id i
+            self.lexical_index = InvertedIndex.from_rows(tfidf_matrix.tocsr())
         
+        self._indexed_rows = self._next_id
+        self._versions.publish()
         self.is_fitted = True
-        print(f"Added {len(self.documents)} products to FAISS catalog with dimension {self.dim}")
+        self._log(f"Added {self.get_product_count()} products to FAISS catalog with dimension {self.dim}")
+
 
+    @_exclusive
+    def create_catalog_from_csv_streaming(self, csv_file_path: CatalogSource, chunk_size: int = 50000,
+                                          sample_size: int = None, n_features: int = 2 ** 14) -> None:
+        """
+        CREATE: Populate the catalog in two passes of chunk_size rows, for catalogs too large to load at once
+        """
+        self._versions.check_open()
+        self._log("\n--- POPULATING CATALOG (STREAMING CREATE) ---")
+        sample_size = sample_size or chunk_size
+        rng = random.Random(self.random_state)
+        vectorizer = HashingTfidfVectorizer(n_features=n_features)
+        sample: List[str] = []
+        n_rows = 0
+
+        for batch in read_catalog_batches(csv_file_path, chunk_size):
+            texts = self._document_texts(batch).to_pylist()
+            vectorizer.partial_fit(texts)
+            for text in texts:
+                if len(sample) < sample_size:
+                    sample.append(text)
+                else:
+                    slot = rng.randrange(n_rows + 1)
+                    if slot < sample_size:
+                        sample[slot] = text
+                n_rows += 1
+        self._log(f"Pass 1: {n_rows} products, projection fitted on a sample of {len(sample)}")
+
+        self.vectorizer = vectorizer
+        actual_dim = min(self.dim, len(sample))
+        self.svd = TruncatedSVD(n_components=actual_dim, random_state=self.random_state)
+        sample_vectors = self.svd.fit_transform(vectorizer.transform(sample))
+        del sample
+
+        self.index = self._new_index(actual_dim, n_vectors=n_rows)
+        self.dim = actual_dim
+        if not self.index.is_trained:
+            self._log(f"Training {self.index_type.upper()} index on {len(sample_vectors)} sampled vectors")
+            self.index.train(np.ascontiguousarray(sample_vectors, dtype="float32"))
+        del sample_vectors
+
+        self._reset_catalog(n_rows)
+        lexical_chunks = []
+        for batch in read_catalog_batches(csv_file_path, chunk_size):
+            documents = self._document_texts(batch)
+            texts = documents.to_pylist()
+            ids = self._assign_ids(batch.column('product_id').to_pylist())
+            self.columns.set_batch(ids, batch, documents)
+            self._index_add(self._encode_batch(texts), ids)
+            if self.hybrid:
+                lexical_chunks.append(self._encoder().tfidf(texts))
+            self._log(f"Pass 2: appended {self._next_id}/{n_rows} products")
+        if self.hybrid:
+            self.lexical_index = InvertedIndex.from_rows(sparse.vstack(lexical_chunks, format="csr"))
+
+        self._indexed_rows = self._next_id
+        self._versions.publish()
+        self.is_fitted = True
+        self._log(f"Added {self.get_product_count()} products to FAISS catalog with dimension {self.dim}")
 
     def search_products(self, query_text: str, n_results: int = 3,
-                        filters: Dict[str, Any] = None) -> List[Dict]:
+                        filters: Dict[str, Any] = None,
+                        nprobe: int = None, ef_search: int = None) -> List[Dict]:
         """
-        READ: Search products with optional filters
+        READ: Search products with optional filters; nprobe/ef_search override the defaults for this query
         """
         if not self.is_fitted:
             raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
             
-        print(f"\n--- SEARCHING PRODUCTS: '{query_text}' ---")
+        self._log(f"\n--- SEARCHING PRODUCTS: '{query_text}' ---")
 
         # Transform query using fitted vectorizer and SVD
-        query_tfidf = self.vectorizer.transform([query_text])
-        query_vec = self.svd.transform(query_tfidf)[0].astype("float32")
-
-        distances, indices = self.index.search(np.array([query_vec]), n_results * 5)
-
-        formatted_results = []
-        product_ids = list(self.documents.keys())
-
-        for idx, dist in zip(indices[0], distances[0]):
-            if idx == -1:
-                continue
-            product_id = product_ids[idx]
-            meta = self.metadatas[product_id]
-
-            if filters and not self._apply_filters(meta, filters):
-                continue
-
-            result = {
-                'id': product_id,
-                'name': meta['name'],
-                'price': meta['price'],
-                'in_stock': meta['in_stock'],
-                'category': meta['category'],
-                'distance': round(float(dist), 3),
-                'snippet': self.documents[product_id][:100] + "..."
-            }
-            formatted_results.append(result)
-
-            if len(formatted_results) >= n_results:
-                break
+        snapshot = self._versions.snapshot
+        query_vecs = snapshot.encoder.encode_queries([query_text])
+        formatted_results = self._search_vectors(query_vecs, n_results, filters, nprobe, ef_search, snapshot)[0]
 
         for r in formatted_results:
-            print(f"{r['name']} (${r['price']}, {r['category']}) - Distance: {r['distance']:.3f}")
+            self._log(f"{r['name']} (${r['price']}, {r['category']}) - Distance: {r['distance']:.3f}")
 
         return formatted_results
 
+    def search_products_batch(self, queries: List[str], n_results: int = 3,
+                              filters: Dict[str, Any] = None,
+                              nprobe: int = None, ef_search: int = None) -> List[List[Dict]]:
+        """
+        READ: Search many queries at once, one result list per query
+        """
+        if not self.is_fitted:
+            raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
+        if not queries:
+            return []
+
+        self._log(f"\n--- SEARCHING {len(queries)} QUERIES ---")
+        snapshot = self._versions.snapshot
+        query_vecs = snapshot.encoder.encode_queries(queries)
+        return self._search_vectors(query_vecs, n_results, filters, nprobe, ef_search, snapshot)
+
+    def search_products_hybrid(self, query_text: str, n_results: int = 3,
+                               filters: Dict[str, Any] = None, fusion: str = "rrf",
+                               alpha: float = 0.5, rrf_k: int = 60,
+                               nprobe: int = None, ef_search: int = None) -> List[Dict]:
+        """
+        READ: Fuse lexical and dense top-n_results lists with rrf or weighted scores
+        """
+        if not self.is_fitted:
+            raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
+        snapshot = self._versions.snapshot
+        if snapshot.lexical_index is None:
+            raise ValueError("Hybrid search needs a catalog built with FaissCatalogManager(hybrid=True)")
+        if fusion not in FUSION_METHODS:
+            raise ValueError(f"Unknown fusion '{fusion}', expected one of {FUSION_METHODS}")
+        self._log(f"\n--- HYBRID SEARCH: '{query_text}' ({fusion}) ---")
+
+        start = time.perf_counter()
+        encoder = snapshot.encoder
+        query_vecs = encoder.encode_queries([query_text])
+        query_tfidf = encoder.tfidf([query_text])
+        encoded = time.perf_counter()
+        distances, ids = self._search_ids(query_vecs, n_results, filters, nprobe, ef_search, snapshot)
+        dense = {int(i): float(d) for i, d in zip(ids[0], distances[0]) if i != -1}
+        dense_done = time.perf_counter()
+        lexical_ids, lexical_scores = snapshot.lexical_index.search(query_tfidf, n_results,
+                                                                    snapshot.row_mask(filters))
+        lexical_done = time.perf_counter()
+        if fusion == "rrf":
+            fused = reciprocal_rank_fusion([list(dense), lexical_ids.tolist()], rrf_k)
+        else:
+            fused = weighted_score_fusion(dense, dict(zip(lexical_ids.tolist(), lexical_scores.tolist())), alpha)
+        results = []
+        for faiss_id, score in fused[:n_results]:
+            # Lexical-only hits get their exact distance from the full-precision vectors
+            distance = dense.get(faiss_id)
+            if distance is None:
+                distance = float(((snapshot.vectors[faiss_id] - query_vecs[0]) ** 2).sum())
+            result = self._format_result(snapshot.columns, faiss_id, distance)
+            result['score'] = round(score, 6)
+            results.append(result)
+        done = time.perf_counter()
+
+        self.last_stage_timings = {"encode_ms": (encoded - start) * 1000, "dense_ms": (dense_done - encoded) * 1000,
+                                   "lexical_ms": (lexical_done - dense_done) * 1000,
+                                   "fusion_ms": (done - lexical_done) * 1000}
+        for r in results:
+            self._log(f"{r['name']} (${r['price']}, {r['category']}) - Score: {r['score']:.4f}")
+        self._log("Stage ms: " + ", ".join(f"{stage} {ms:.3f}" for stage, ms in self.last_stage_timings.items()))
+        return results
+
+    @_exclusive
+    def add_product(self, product_data: Dict) -> bool:
+        """
+        CREATE: Add a single product to an already populated catalog
+        """
+        self._versions.check_open()
+        if not self.is_fitted:
+            raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
+
+        product_id = product_data['product_id']
+        self._log(f"\n--- ADDING PRODUCT {product_id} ---")
+        if product_id in self.product_to_id:
+            self._log(f"Product {product_id} already exists")
+            return False
+        self._ensure_writable()
+
+        doc_text = self._create_document_text(product_data)
+        vector = self._encode(doc_text)
+
+        faiss_id = self._assign_id(product_id)
+        self.columns.set_row(faiss_id, self._create_metadata(product_data), doc_text)
+        self._store_vectors(vector.reshape(1, -1), np.array([faiss_id], dtype="int64"))
+        self._index_lexical(faiss_id, doc_text)
+        self._versions.publish()
+
+        self._log(f"Added product {product_id}")
+        return True
+
+    @_exclusive
     def update_product(self, product_id: str, new_price: float = None,
                        in_stock: bool = None, new_description: str = None) -> bool:
-        print(f"\n--- UPDATING PRODUCT {product_id} ---")
-        if product_id not in self.documents:
-            print(f"Product {product_id} not found")
+        """
+        UPDATE: Change price, stock and/or description; only a new description is re-encoded
+        """
+        self._versions.check_open()
+        self._log(f"\n--- UPDATING PRODUCT {product_id} ---")
+        if product_id not in self.product_to_id:
+            self._log(f"Product {product_id} not found")
             return False
+        row = self.product_to_id[product_id]
+        plan = plan_update({**self.columns.metadata(row), "description": self.columns.document.get(row)},
+                           product_changes(new_description, new_price, in_stock),
+                           embedded_fields=["description"])
+        if plan.noop:
+            self._log(f"Product {product_id} unchanged")
+            return True
+        if plan.reembed:
+            self._ensure_writable()
+            # Rows are never rewritten, so searches holding an older snapshot
+            # keep the old row: write the product under a new id, delete the old one
+            new_id = self._assign_id(product_id)
+            self.columns.copy_row(row, new_id)
+            self.columns.update_row(new_id, price=plan.changes.get("price"), in_stock=plan.changes.get("in_stock"),
+                                    document=plan.changes.get("description"))
+            doc_text = self.columns.document.get(new_id)
+            self._store_vectors(self._encode(doc_text).reshape(1, -1), np.array([new_id], dtype="int64"))
+            self._index_lexical(new_id, doc_text)
+            self._delete_row(row)
+        else:
+            # Price and stock only: the row keeps its id and vector, and searches
+            # see the new values from the next snapshot on
+            self.columns = self.columns.with_values(row, plan.changes.get("price"), plan.changes.get("in_stock"))
+        self._versions.publish()
 
         metadata = self.metadatas[product_id]
-        if new_price is not None:
-            metadata["price"] = new_price
-        if in_stock is not None:
-            metadata["in_stock"] = in_stock
-        if new_description:
-            self.documents[product_id] = new_description
-
-        # FIXED: Use TF-IDF transformation instead of model.encode()
-        updated_doc = self.documents[product_id]
-        updated_tfidf = self.vectorizer.transform([updated_doc])
-        new_vector = self.svd.transform(updated_tfidf)[0].astype("float32")
-
-        self.id_to_vector[product_id] = new_vector
-        self._rebuild_index()
-
-        print(f"Updated product {product_id} → Price: {metadata['price']}, In Stock: {metadata['in_stock']}")
+        self._log(f"Updated product {product_id} → Price: {metadata['price']}, In Stock: {metadata['in_stock']}")
         return True
 
+    @_exclusive
     def delete_product(self, product_id: str) -> bool:
-        print(f"\n--- DELETING PRODUCT {product_id} ---")
-        if product_id not in self.documents:
-            print(f"Product {product_id} not found")
+        self._versions.check_open()
+        self._log(f"\n--- DELETING PRODUCT {product_id} ---")
+        if product_id not in self.product_to_id:
+            self._log(f"Product {product_id} not found")
             return False
+        self._ensure_writable()
 
-        del self.documents[product_id]
-        del self.metadatas[product_id]
-        del self.id_to_vector[product_id]
-        self._rebuild_index()
-        print(f"Deleted product {product_id}")
+        faiss_id = self.product_to_id.pop(product_id)
+        self._delete_row(faiss_id)
+        self._versions.publish()
+        self._log(f"Deleted product {product_id}")
         return True
 
     def get_product_count(self) -> int:
-        return len(self.documents)
+        return len(self.product_to_id)
+
+    def compact(self, wait: bool = True) -> None:
+        """
+        Fold unindexed rows into a new index without tombstones, waiting for it with wait=True
+        """
+        if not self.is_fitted:
+            raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
+        # A compaction already running may predate the latest writes, so at most one more
+        for _ in range(2):
+            with self._write_lock:
+                self._versions.check_open()
+                future = self._versions.compaction or self._versions.start_compaction()
+            if future is None or not wait:
+                return
+            future.result()
+
+    def close(self) -> None:
+        """
+        Stop the compaction and shard search threads; writes raise ValueError afterwards
+        """
+        self._versions.close()
+        if self._shard_pool is not None:
+            self._shard_pool.shutdown(wait=True)
+
+    def __enter__(self) -> "FaissCatalogManager":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def compaction_info(self) -> Dict[str, Any]:
+        """Tombstones, rows waiting to be indexed, and background compaction state"""
+        with self._write_lock:
+            ntotal = self.index.ntotal
+            return {
+                "tombstones": self._tombstones,
+                "dead_fraction": self._tombstones / ntotal if ntotal else 0.0,
+                "delta_rows": self._next_id - self._indexed_rows,
+                "compacting": self._versions.compaction is not None,
+                "compactions": self._versions.compactions,
+            }
+
+    @property
+    def documents(self) -> RowMapping:
+        """Read-only product_id -> document text view"""
+        return RowMapping(self.product_to_id, self.columns.document.get)
+
+    @property
+    def metadatas(self) -> RowMapping:
+        """Read-only product_id -> metadata dict view"""
+        return RowMapping(self.product_to_id, self.columns.metadata)
+
+    @_exclusive
+    def save(self, directory: str) -> None:
+        """
+        PERSIST: Write the catalog to a directory that load() can memory-map
+        """
+        if not self.is_fitted:
+            raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
+        self._log(f"\n--- SAVING CATALOG TO {directory} ---")
+        os.makedirs(directory, exist_ok=True)
+
+        for index, path in zip(self._index_parts(), self._index_paths(directory)):
+            faiss.write_index(index, path)
+        hashing = isinstance(self.vectorizer, HashingTfidfVectorizer)
+        if hashing:
+            np.save(os.path.join(directory, "document_frequency.npy"), self.vectorizer.document_frequency)
+        else:
+            with open(os.path.join(directory, "vocabulary.json"), "w") as f:
+                json.dump({term: int(i) for term, i in self.vectorizer.vocabulary_.items()}, f)
+        np.save(os.path.join(directory, "idf.npy"), self.vectorizer.idf_)
+        np.save(os.path.join(directory, "svd_components.npy"), self.svd.components_)
+        if self.lexical_index is not None:
+            self.lexical_index.save(os.path.join(directory, "lexical"))
+        np.save(os.path.join(directory, "vectors.npy"), self._vectors[:self._next_id])
+        if self._position_ids is not None:
+            np.save(os.path.join(directory, "position_ids.npy"), self._position_ids)
+        self.columns.save(os.path.join(directory, "columns"))
+
+        manifest = {
+            "format_version": CATALOG_FORMAT_VERSION,
+            "featurizer": "hashing" if hashing else "tfidf",
+            "n_features": self.vectorizer.n_features if hashing else None,
+            "n_documents": self.vectorizer.n_documents if hashing else None,
+            "dim": self.dim,
+            "use_id_map": self.use_id_map,
+            "index_type": self.index_type,
+            "nlist": self.nlist,
+            "nprobe": self.nprobe,
+            "hnsw_m": self.hnsw_m,
+            "ef_search": self.ef_search,
+            "random_state": self.random_state,
+            "compression": self.compression,
+            "pq_m": self.pq_m,
+            "rerank_factor": self.rerank_factor,
+            "query_cache_size": self.query_cache_size,
+            "n_shards": self.n_shards,
+            "hybrid": self.hybrid,
+            "compaction_threshold": self.compaction_threshold,
+            "delta_size": self.delta_size,
+            "next_id": self._next_id,
+            "indexed_rows": self._indexed_rows,
+            "tombstones": self._tombstones,
+        }
+        with open(os.path.join(directory, "manifest.json"), "w") as f:
+            json.dump(manifest, f, indent=2)
+        self._log(f"Saved {self.get_product_count()} products")
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, verbose: bool = True) -> "FaissCatalogManager":
+        """
+        PERSIST: Reopen a catalog written by save() without refitting, memory-mapped with mmap=True
+        """
+        with open(os.path.join(directory, "manifest.json")) as f:
+            manifest = json.load(f)
+        # Version 2 catalogs had every row in the index
+        if manifest["format_version"] not in (2, CATALOG_FORMAT_VERSION):
+            raise ValueError(f"Unsupported catalog format version {manifest['format_version']}")
+
+        catalog_mgr = cls(dim=manifest["dim"], use_id_map=manifest["use_id_map"], verbose=verbose,
+                          index_type=manifest["index_type"], nlist=manifest["nlist"],
+                          nprobe=manifest["nprobe"], hnsw_m=manifest["hnsw_m"],
+                          ef_search=manifest["ef_search"], random_state=manifest["random_state"],
+                          compression=manifest["compression"], pq_m=manifest["pq_m"],
+                          rerank_factor=manifest["rerank_factor"],
+                          query_cache_size=manifest["query_cache_size"], n_shards=manifest["n_shards"],
+                          hybrid=manifest["hybrid"],
+                          compaction_threshold=manifest.get("compaction_threshold", COMPACTION_THRESHOLD),
+                          delta_size=manifest.get("delta_size", DELTA_SIZE))
+        catalog_mgr._log(f"\n--- LOADING CATALOG FROM {directory} (mmap={mmap}) ---")
+        mmap_mode = "r" if mmap else None
+
+        if manifest["featurizer"] == "hashing":
+            catalog_mgr.vectorizer = HashingTfidfVectorizer(n_features=manifest["n_features"])
+            catalog_mgr.vectorizer.document_frequency = np.load(os.path.join(directory, "document_frequency.npy"))
+            catalog_mgr.vectorizer.n_documents = manifest["n_documents"]
+        else:
+            with open(os.path.join(directory, "vocabulary.json")) as f:
+                catalog_mgr.vectorizer = cls._new_tfidf_vectorizer(json.load(f))
+        catalog_mgr.vectorizer.idf_ = np.load(os.path.join(directory, "idf.npy"))
+        catalog_mgr.svd.components_ = np.load(os.path.join(directory, "svd_components.npy"))
+        catalog_mgr.svd.n_components = catalog_mgr.svd.components_.shape[0]
+        catalog_mgr.svd.n_features_in_ = catalog_mgr.svd.components_.shape[1]
+
+        index_paths = catalog_mgr._index_paths(directory)
+        if mmap:
+            # IVF maps its inverted lists, the other families map their flat code arrays
+            flags = faiss.IO_FLAG_MMAP if catalog_mgr.index_type == "ivf" \
+                else faiss.IO_FLAG_MMAP_IFC | faiss.IO_FLAG_READ_ONLY
+            catalog_mgr.index = catalog_mgr._read_index(index_paths, flags)
+            catalog_mgr._mmap_index_paths = index_paths
+        else:
+            catalog_mgr.index = catalog_mgr._read_index(index_paths)
+        catalog_mgr._vectors = np.load(os.path.join(directory, "vectors.npy"), mmap_mode=mmap_mode)
+        if not catalog_mgr.use_id_map:
+            catalog_mgr._position_ids = np.load(os.path.join(directory, "position_ids.npy"))
+        catalog_mgr.columns = MetadataColumns.load(os.path.join(directory, "columns"), mmap=mmap)
+        if catalog_mgr.hybrid:
+            catalog_mgr.lexical_index = InvertedIndex.load(os.path.join(directory, "lexical"), mmap=mmap)
+
+        product_id_column = catalog_mgr.columns.product_id
+        catalog_mgr.product_to_id = {product_id_column.get(row): row
+                                     for row in np.flatnonzero(catalog_mgr.columns.alive).tolist()}
+
+        catalog_mgr._next_id = manifest["next_id"]
+        catalog_mgr._indexed_rows = manifest.get("indexed_rows", manifest["next_id"])
+        catalog_mgr._tombstones = manifest["tombstones"]
+        catalog_mgr._mmapped = mmap
+        catalog_mgr._versions.publish()
+        catalog_mgr.is_fitted = True
+        catalog_mgr._log(f"Loaded {catalog_mgr.get_product_count()} products with dimension {catalog_mgr.dim}")
+        return catalog_mgr
+
+    def get_vector(self, product_id: str) -> np.ndarray:
+        """Full-precision vector of a product"""
+        return self._vectors[self.product_to_id[product_id]]
+
+    def query_cache_info(self) -> Dict[str, int]:
+        """Hits, misses and size of the query vector cache"""
+        if not self.is_fitted:
+            raise ValueError("Catalog not initialized. Call create_catalog_from_csv first.")
+        return self._encoder().cache_info()
+
+    def memory_usage(self) -> Dict[str, int]:
+        """Approximate bytes held by the FAISS index, the full-precision vectors and the columns"""
+        return {
+            "index_bytes": sum(int(faiss.serialize_index(index).nbytes) for index in self._index_parts()),
+            "vector_bytes": int(self._next_id * self.dim * 4),
+            "column_bytes": self.columns.nbytes(),
+            "lexical_bytes": self.lexical_index.nbytes() if self.lexical_index is not None else 0,
+        }
+
+    @staticmethod
+    def _new_tfidf_vectorizer(vocabulary: Dict[str, int] = None) -> TfidfVectorizer:
+        return TfidfVectorizer(max_features=5000, stop_words='english', vocabulary=vocabulary)
+
+    def _reset_catalog(self, n_rows: int) -> None:
+        """Drop all products, pre-sizing the vector array for n_rows"""
+        # New objects rather than cleared ones: the published snapshot still refers to the old
+        self._vectors = np.zeros((n_rows, self.dim), dtype="float32")
+        self.product_to_id.clear()
+        self.columns = MetadataColumns(capacity=n_rows)
+        self._position_ids = None
+        self._tombstones = 0
+        self._indexed_rows = 0
+        # Called right after the new index is trained, so this copy holds no vectors
+        self._versions.reset(faiss.clone_index(self._index_parts()[0])
+                             if self.index_type == "ivf" or self.compression else None)
+        self._next_id = 0
+        self._mmap_index_paths = None
+        self._mmapped = False
+        self._query_encoder = None
+        self.lexical_index = None
 
     def _create_document_text(self, product_data: Dict) -> str:
         return f"{product_data['name']}. {product_data['description']} " \
                f"Category: {product_data['category']}. Price: ${product_data['price']}."
 
+    @staticmethod
+    def _document_texts(batch) -> pa.Array:
+        """_create_document_text for every row of an Arrow batch, computed column-wise"""
+        return pc.binary_join_element_wise(
+            batch.column('name'), ". ", batch.column('description'), " Category: ", batch.column('category'),
+            ". Price: $", price_text(batch.column('price')), ".", "")
+
     def _create_metadata(self, product_data: Dict) -> Dict:
         return {
             "product_id": product_data['product_id'],
@@ -185,23 +637,231 @@ class FaissCatalogManager:
             "name": product_data['name']
         }
 
-    def _apply_filters(self, metadata: Dict, filters: Dict) -> bool:
-        for key, condition in filters.items():
-            if isinstance(condition, dict):
-                if "$eq" in condition and metadata[key] != condition["$eq"]:
-                    return False
-                if "$lte" in condition and metadata[key] > condition["$lte"]:
-                    return False
-            else:
-                if metadata[key] != condition:
-                    return False
-        return True
+    def _new_index(self, dim: int, n_vectors: int = 0):
+        if self.n_shards > 1:
+            return self._sharded_index([self._new_shard_index(dim, n_vectors) for _ in range(self.n_shards)])
+        return self._new_shard_index(dim, n_vectors)
+
+    def _new_shard_index(self, dim: int, n_vectors: int):
+        if self.index_type == "ivf":
+            # IVF stores ids in its inverted lists, no IndexIDMap2 needed
+            nlist = self.nlist or self._default_nlist(n_vectors)
+            return faiss.index_factory(dim, f"IVF{nlist},{self._codec(dim, n_vectors)}")
+        if self.compression == "pq":
+            # IndexPQ can't take an id selector, a single-list IVFPQ scans the same codes and can
+            return faiss.index_factory(dim, f"IVF1,{self._codec(dim, n_vectors)}")
+        if self.index_type == "hnsw":
+            return faiss.IndexIDMap2(faiss.index_factory(dim, f"HNSW{self.hnsw_m}"))
+        if self.use_id_map:
+            return faiss.IndexIDMap2(faiss.index_factory(dim, self._codec(dim, n_vectors)))
+        return faiss.IndexFlatL2(dim)
+
+    def _ensure_writable(self) -> None:
+        """
+        Copy memory-mapped vectors and columns into private memory before a write
+        """
+        if not self._mmapped:
+            return
+        self._log("Copying memory-mapped catalog into memory for writing")
+        self._vectors = np.array(self._vectors)
+        self.columns.detach()
+        self._mmapped = False
+
+    def _index_parts(self, index=None) -> List[faiss.Index]:
+        index = index if index is not None else self.index
+        return index.shards if isinstance(index, ShardedIndex) else [index]
+
+    def _index_paths(self, directory: str) -> List[str]:
+        if self.n_shards > 1:
+            return [os.path.join(directory, f"index.shard{i}.faiss") for i in range(self.n_shards)]
+        return [os.path.join(directory, "index.faiss")]
+
+    def _read_index(self, paths: List[str], flags: int = 0):
+        parts = [faiss.read_index(path, flags) for path in paths]
+        return self._sharded_index(parts) if self.n_shards > 1 else parts[0]
+
+    def _sharded_index(self, parts: List[faiss.Index]) -> ShardedIndex:
+        return ShardedIndex(parts, self._shard_of, self._shard_pool)
+
+    def _shard_of(self, ids: np.ndarray) -> np.ndarray:
+        """Shard number of each id: a stable hash of its product_id"""
+        product_ids = self.columns.product_id
+        return np.fromiter((zlib.crc32(product_ids.get(i).encode("utf-8")) % self.n_shards for i in ids.tolist()),
+                           dtype=np.int64, count=len(ids))
+
+    def _codec(self, dim: int, n_vectors: int) -> str:
+        """index_factory suffix describing how vectors are stored"""
+        if self.compression == "sq8":
+            return "SQ8"
+        if self.compression == "pq":
+            pq_m = self.pq_m or max(m for m in range(1, dim // 4 + 1) if dim % m == 0)
+            if dim % pq_m:
+                raise ValueError(f"pq_m={pq_m} must divide the vector dimension {dim}")
+            # 8-bit codebooks need 256 training vectors, small catalogs get fewer centroids
+            nbits = int(min(8, max(1, np.log2(max(n_vectors, 2)))))
+            return f"PQ{pq_m}x{nbits}"
+        return "Flat"
+
+    @staticmethod
+    def _default_nlist(n_vectors: int) -> int:
+        # ~4*sqrt(N) cells, keeping the >= 39 training points per centroid FAISS asks for
+        return max(1, min(int(4 * np.sqrt(n_vectors)), n_vectors // 39))
+
+    def _assign_id(self, product_id: str) -> int:
+        # Ids are never reused, so a deleted product can't alias a new one
+        faiss_id = self._next_id
+        self._next_id += 1
+        self.product_to_id[product_id] = faiss_id
+        return faiss_id
+
+    def _assign_ids(self, product_ids: List[str]) -> np.ndarray:
+        """_assign_id for a batch of products, as consecutive new ids"""
+        ids = np.arange(self._next_id, self._next_id + len(product_ids), dtype="int64")
+        self._next_id += len(product_ids)
+        self.product_to_id.update(zip(product_ids, ids.tolist()))
+        return ids
+
+    def _index_add(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        """Store vectors and add them to the index being built by a create method"""
+        self._store_vectors(vectors, ids)
+        if self.use_id_map:
+            self.index.add_with_ids(vectors, ids)
+        else:
+            self.index.add(vectors)
+            previous = self._position_ids if self._position_ids is not None else np.empty(0, dtype="int64")
+            self._position_ids = np.concatenate([previous, ids])
+
+    def _store_vectors(self, vectors: np.ndarray, ids: np.ndarray) -> None:
+        required = int(ids.max()) + 1
+        if required > len(self._vectors):
+            # Grow geometrically so single adds stay amortized O(1)
+            grown = np.zeros((max(required, 2 * len(self._vectors)), self.dim), dtype="float32")
+            grown[:len(self._vectors)] = self._vectors
+            self._vectors = grown
+        self._vectors[ids] = vectors
+
+    @staticmethod
+    def _labels_to_ids(labels: np.ndarray, position_ids: np.ndarray) -> np.ndarray:
+        """Translate FAISS result labels into stable product ids"""
+        if position_ids is None:
+            return labels
+        return np.where(labels >= 0, position_ids[np.maximum(labels, 0)], -1)
+
+    def _id_mask(self, filters: Dict[str, Any] = None) -> np.ndarray:
+        """Boolean mask over ids of live products matching filters, as of the published snapshot"""
+        return self._versions.snapshot.row_mask(filters)
+
+    def _index_lexical(self, faiss_id: int, doc_text: str) -> None:
+        if self.lexical_index is not None:
+            self.lexical_index.set_rows(np.array([faiss_id], dtype="int64"), self._encoder().tfidf([doc_text]))
+
+    def _search_params(self, mask: np.ndarray = None, nprobe: int = None, ef_search: int = None):
+        """
+        FAISS SearchParameters with mask as a bitmap IDSelector; returns (params, refs to keep alive while searching)
+        """
+        refs = None
+        if mask is not None:
+            bitmap = np.packbits(mask, bitorder="little")
+            refs = (bitmap, faiss.IDSelectorBitmap(len(mask), faiss.swig_ptr(bitmap)))
+        # One per shard: an id-mapped index swaps params.sel while it searches
+        params = [self._new_search_params(nprobe, ef_search) for _ in range(self.n_shards)]
+        if refs is not None:
+            for shard_params in params:
+                shard_params.sel = refs[1]
+        return (params if self.n_shards > 1 else params[0]), refs
+
+    def _new_search_params(self, nprobe: int = None, ef_search: int = None) -> faiss.SearchParameters:
+        if self.index_type == "ivf":
+            return faiss.SearchParametersIVF(nprobe=nprobe or self.nprobe)
+        if self.index_type == "hnsw":
+            return faiss.SearchParametersHNSW(efSearch=ef_search or self.ef_search)
+        if self.compression == "pq":
+            # Flat PQ is a single inverted list, see _new_index
+            return faiss.SearchParametersIVF(nprobe=1)
+        return faiss.SearchParameters()
+
+    def _encode(self, text: str) -> np.ndarray:
+        return self._encode_batch([text])[0]
+
+    def _encode_batch(self, texts: List[str]) -> np.ndarray:
+        return self._encoder().transform(texts)
+
+    def _encoder(self) -> QueryEncoder:
+        if self._query_encoder is None:
+            self._query_encoder = QueryEncoder(self.vectorizer, self.svd, self.query_cache_size)
+        return self._query_encoder
+
+    def _search_ids(self, query_vecs: np.ndarray, n_results: int,
+                    filters: Dict[str, Any] = None,
+                    nprobe: int = None, ef_search: int = None,
+                    snapshot: CatalogSnapshot = None):
+        """Nearest neighbours as (distances, ids) arrays, -1 ids pad missing hits"""
+        snapshot = snapshot or self._versions.snapshot
+        # Filters are evaluated over the metadata columns and pushed into FAISS
+        # as an id selector, so exactly n_results matching products come back
+        mask = snapshot.row_mask(filters) if filters or snapshot.tombstones else None
+        if mask is not None and not mask.any():
+            empty = np.full((len(query_vecs), n_results), -1, dtype="int64")
+            return np.full(empty.shape, np.inf, dtype="float32"), empty
+        label_mask = mask[snapshot.position_ids] if mask is not None and snapshot.position_ids is not None else mask
+        params, selector_refs = self._search_params(label_mask, nprobe, ef_search)
+
+        k = n_results * self.rerank_factor if self.compression else n_results
+        distances, labels = snapshot.index.search(query_vecs, k, params=params)
+        ids = self._labels_to_ids(labels, snapshot.position_ids)
+        if self.compression:
+            distances, ids = self._rerank(snapshot.vectors, query_vecs, ids, n_results)
+        # Rows written since the index was built
+        delta = snapshot.search_delta(query_vecs, n_results, mask)
+        if delta is not None:
+            distances, ids = merge_top_k(distances, ids, *delta, n_results)
+        return distances, ids
+
+    @staticmethod
+    def _rerank(vectors: np.ndarray, query_vecs: np.ndarray, ids: np.ndarray, n_results: int):
+        """Exact L2 re-ranking of compressed-index candidates on full-precision vectors"""
+        candidates = vectors[np.maximum(ids, 0)]
+        distances = ((candidates - query_vecs[:, None, :]) ** 2).sum(axis=2)
+        distances[ids < 0] = np.inf
+        order = np.argsort(distances, axis=1, kind="stable")[:, :n_results]
+        distances = np.take_along_axis(distances, order, axis=1)
+        ids = np.take_along_axis(ids, order, axis=1)
+        ids[np.isinf(distances)] = -1
+        return distances, ids
+
+    def _search_vectors(self, query_vecs: np.ndarray, n_results: int,
+                        filters: Dict[str, Any] = None,
+                        nprobe: int = None, ef_search: int = None,
+                        snapshot: CatalogSnapshot = None) -> List[List[Dict]]:
+        snapshot = snapshot or self._versions.snapshot
+        distances, ids = self._search_ids(query_vecs, n_results, filters, nprobe, ef_search, snapshot)
+        return [[self._format_result(snapshot.columns, int(idx), float(dist))
+                 for idx, dist in zip(row_ids, row_distances) if idx != -1]
+                for row_ids, row_distances in zip(ids, distances)]
+
+    @staticmethod
+    def _format_result(columns: MetadataColumns, faiss_id: int, distance: float) -> Dict:
+        meta = columns.metadata(faiss_id)
+        return {
+            'id': meta['product_id'],
+            'name': meta['name'],
+            'price': meta['price'],
+            'in_stock': meta['in_stock'],
+            'category': meta['category'],
+            'distance': round(distance, 3),
+            'snippet': columns.document.get(faiss_id)[:100] + "..."
+        }
+
+    def _log(self, message: str) -> None:
+        if self.verbose:
+            print(message)
 
-    def _rebuild_index(self):
-        self.index = faiss.IndexFlatL2(self.dim)
-        all_vectors = np.array(list(self.id_to_vector.values()), dtype="float32")
-        if len(all_vectors) > 0:
-            self.index.add(all_vectors)
+    def _delete_row(self, row: int) -> None:
+        """Delete a row as of the generation the next publish() creates"""
+        self.columns.delete_row(row, self._versions.snapshot.generation + 1)
+        if row < self._indexed_rows:
+            # Left in the index, searches skip it until compaction
+            self._tombstones += 1
 
 
 if __name__ == "__main__":
@@ -0,0 +1,39 @@
+import numpy as np
+from typing import List
+from scipy import sparse
+from sklearn.feature_extraction.text import HashingVectorizer
+from sklearn.preprocessing import normalize
+
+
+class HashingTfidfVectorizer:
+    """
+    TF-IDF over hashed terms that can be fitted one chunk at a time.
+
+    Terms are hashed into n_features columns, so there is no vocabulary to
+    fit and the only state is a document-frequency counter of fixed size.
+    Weights match sklearn's TfidfVectorizer defaults (smooth idf, l2 norm).
+    """
+
+    def __init__(self, n_features: int = 2 ** 14, stop_words: str = 'english'):
+        self.n_features = n_features
+        self.hasher = HashingVectorizer(n_features=n_features, stop_words=stop_words,
+                                        alternate_sign=False, norm=None)
+        self.document_frequency = np.zeros(n_features, dtype=np.int64)
+        self.n_documents = 0
+        self.idf_: np.ndarray = None
+
+    def partial_fit(self, texts: List[str]) -> "HashingTfidfVectorizer":
+        """Count document frequencies of one chunk"""
+        counts = self.hasher.transform(texts)
+        # CSR rows hold each hashed term once, so column occurrences are document counts
+        self.document_frequency += np.bincount(counts.indices, minlength=self.n_features)
+        self.n_documents += len(texts)
+        self.idf_ = np.log((1 + self.n_documents) / (1 + self.document_frequency)) + 1
+        return self
+
+    def transform(self, texts: List[str]) -> sparse.csr_matrix:
+        if self.idf_ is None:
+            raise ValueError("HashingTfidfVectorizer is not fitted, call partial_fit first")
+        tfidf = self.hasher.transform(texts).astype(np.float64)
+        tfidf.data *= self.idf_[tfidf.indices]
+        return normalize(tfidf, norm='l2', copy=False)
@@ -0,0 +1,24 @@
+import numpy as np
+from typing import Any, Callable, Dict
+
+from catalog_filters import comparisons, parse_filter, to_numpy_predicate
+from src.metadata_columns import MetadataColumns
+
+# A compiled filter maps the metadata columns to a boolean row mask
+CompiledFilter = Callable[[MetadataColumns], np.ndarray]
+
+
+def compile_filter(filters: Dict[str, Any]) -> CompiledFilter:
+    """
+    Compile a filter in the shared filter language (catalog_filters) into a
+    vectorized predicate over the metadata columns.
+
+    Supports {"field": value}, {"field": {"$eq"|"$ne"|"$gt"|"$gte"|"$lt"|"$lte"|"$in"|"$nin": value}}
+    and {"$and"|"$or": [filter, ...]}. Multiple top-level keys are AND-ed.
+    """
+    node = parse_filter(filters)
+    for comparison in comparisons(node):
+        # Categories are stored as dictionary codes, which have no meaningful order
+        if comparison.field == "category" and comparison.op not in ("$eq", "$ne", "$in", "$nin"):
+            raise ValueError(f"Operator '{comparison.op}' is not supported on field 'category'")
+    return to_numpy_predicate(node)
@@ -0,0 +1,41 @@
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+
+FUSION_METHODS = ("rrf", "weighted")
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[int]], rrf_k: int = 60) -> List[Tuple[int, float]]:
+    """
+    Fuse ranked id lists by summing 1 / (rrf_k + rank), rank starting at 1.
+    Only ranks matter, so dense distances and lexical scores need no calibration.
+    """
+    scores: Dict[int, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (rrf_k + rank)
+    return sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+
+
+def weighted_score_fusion(dense: Dict[int, float], lexical: Dict[int, float],
+                          alpha: float = 0.5) -> List[Tuple[int, float]]:
+    """
+    Fuse alpha * dense + (1 - alpha) * lexical after min-max scaling each
+    list to [0, 1]. Dense inputs are L2 distances (smaller is better),
+    lexical inputs cosine scores; an id missing from a list scores 0 there.
+    """
+    dense_scaled = _min_max({item: -distance for item, distance in dense.items()})
+    lexical_scaled = _min_max(lexical)
+    scores = {item: alpha * dense_scaled.get(item, 0.0) + (1 - alpha) * lexical_scaled.get(item, 0.0)
+              for item in dense.keys() | lexical.keys()}
+    return sorted(scores.items(), key=lambda pair: (-pair[1], pair[0]))
+
+
+def _min_max(scores: Dict[int, float]) -> Dict[int, float]:
+    if not scores:
+        return {}
+    values = np.fromiter(scores.values(), dtype=np.float64, count=len(scores))
+    low, span = values.min(), np.ptp(values)
+    if span == 0:
+        return {item: 1.0 for item in scores}
+    return {item: float((value - low) / span) for item, value in scores.items()}
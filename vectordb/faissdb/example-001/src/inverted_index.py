@@ -0,0 +1,146 @@
+import json
+import os
+import threading
+from typing import Dict, Tuple
+
+import numpy as np
+from scipy import sparse
+
+
+class InvertedIndex:
+    """
+    Term -> (row, weight) postings over L2-normalized TF-IDF rows, answering
+    lexical top-k by cosine similarity. Rows are the catalog's stable ids.
+
+    The bulk of the postings is a term-major CSR matrix built in one go when
+    a catalog is created or loaded. Rows written afterwards go to a small
+    delta and their old base postings are masked as stale; the delta is
+    merged back into the base once it outgrows merge_fraction of it.
+
+    Writes and the base/delta hand-over are serialized by a lock, and search()
+    reads a consistent (postings, stale, delta) triple, so searches may run
+    concurrently with set_rows() and merge().
+    """
+
+    def __init__(self, n_terms: int, merge_fraction: float = 0.1):
+        self.n_terms = n_terms
+        self.merge_fraction = merge_fraction
+        self.postings = sparse.csr_matrix((n_terms, 0))
+        self.stale = np.zeros(0, dtype=bool)
+        self._delta: Dict[int, sparse.csr_matrix] = {}
+        self._delta_postings: sparse.csr_matrix = None
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_rows(cls, doc_terms: sparse.csr_matrix, merge_fraction: float = 0.1) -> "InvertedIndex":
+        """Build from a (rows x terms) TF-IDF matrix whose row i belongs to id i"""
+        index = cls(doc_terms.shape[1], merge_fraction)
+        index.postings = sparse.csr_matrix(doc_terms.T)
+        index.stale = np.zeros(doc_terms.shape[0], dtype=bool)
+        return index
+
+    @property
+    def n_rows(self) -> int:
+        return max(self.postings.shape[1], max(self._delta, default=-1) + 1)
+
+    def set_rows(self, ids: np.ndarray, doc_terms: sparse.csr_matrix) -> None:
+        """(Re-)index rows; deleted rows need no call, search() masks them out"""
+        with self._lock:
+            stale = self.stale
+            for i, row_id in enumerate(ids.tolist()):
+                if row_id < len(stale):
+                    # Copied on write, a running search keeps the mask it started with
+                    if stale is self.stale:
+                        stale = stale.copy()
+                    stale[row_id] = True
+                self._delta[row_id] = doc_terms[i]
+            self.stale, self._delta_postings = stale, None
+            if len(self._delta) > self.merge_fraction * self.postings.shape[1]:
+                self._merge()
+
+    def merge(self) -> None:
+        """Fold the delta into the base postings"""
+        with self._lock:
+            self._merge()
+
+    def _merge(self) -> None:
+        n_rows = self.n_rows
+        base = sparse.csr_matrix(self.postings.T)
+        base.data[self.stale[np.repeat(np.arange(base.shape[0]), np.diff(base.indptr))]] = 0
+        base.resize((n_rows, self.n_terms))
+        merged = base + self._delta_matrix(n_rows)
+        merged.eliminate_zeros()
+        self.postings = sparse.csr_matrix(merged.T)
+        self.stale = np.zeros(n_rows, dtype=bool)
+        self._delta = {}
+        self._delta_postings = None
+
+    def search(self, query: sparse.csr_matrix, k: int, mask: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Top-k (ids, cosine scores) for one TF-IDF query row among the ids
+        where mask is True; only the postings of the query's terms are read
+        """
+        terms, weights = query.indices, query.data
+        if len(terms) == 0:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+        with self._lock:
+            if self._delta and self._delta_postings is None:
+                self._delta_postings = sparse.csr_matrix(self._delta_matrix(self.n_rows).T)
+            postings, stale, delta_postings = self.postings, self.stale, self._delta_postings
+        ids, contributions = self._gather(postings, terms, weights)
+        keep = ~stale[ids]
+        ids, contributions = ids[keep], contributions[keep]
+        if delta_postings is not None:
+            delta_ids, delta_contributions = self._gather(delta_postings, terms, weights)
+            ids = np.concatenate([ids, delta_ids])
+            contributions = np.concatenate([contributions, delta_contributions])
+        eligible = ids < len(mask)
+        eligible[eligible] = mask[ids[eligible]]
+        candidates, inverse = np.unique(ids[eligible], return_inverse=True)
+        scores = np.bincount(inverse, weights=contributions[eligible], minlength=len(candidates))
+        # Highest score first, lower id first among ties
+        order = np.lexsort((candidates, -scores))[:k]
+        return candidates[order], scores[order]
+
+    def save(self, directory: str) -> None:
+        """Merge the delta and write the postings as CSR arrays load() can memory-map"""
+        with self._lock:
+            if self._delta:
+                self._merge()
+        os.makedirs(directory, exist_ok=True)
+        for name in ("data", "indices", "indptr"):
+            np.save(os.path.join(directory, f"{name}.npy"), getattr(self.postings, name))
+        with open(os.path.join(directory, "shape.json"), "w") as f:
+            json.dump(list(self.postings.shape), f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True, merge_fraction: float = 0.1) -> "InvertedIndex":
+        mmap_mode = "r" if mmap else None
+        arrays = [np.load(os.path.join(directory, f"{name}.npy"), mmap_mode=mmap_mode)
+                  for name in ("data", "indices", "indptr")]
+        with open(os.path.join(directory, "shape.json")) as f:
+            n_terms, n_rows = json.load(f)
+        index = cls(n_terms, merge_fraction)
+        index.postings = sparse.csr_matrix(tuple(arrays), shape=(n_terms, n_rows), copy=False)
+        index.stale = np.zeros(n_rows, dtype=bool)
+        return index
+
+    def nbytes(self) -> int:
+        postings = self.postings
+        return int(postings.data.nbytes + postings.indices.nbytes + postings.indptr.nbytes)
+
+    @staticmethod
+    def _gather(postings: sparse.csr_matrix, terms: np.ndarray, weights: np.ndarray):
+        """(id, weight * query weight) for every posting of the given terms"""
+        starts, ends = postings.indptr[terms], postings.indptr[terms + 1]
+        lengths = ends - starts
+        positions = np.repeat(starts - np.cumsum(lengths) + lengths, lengths) + np.arange(lengths.sum())
+        return (np.asarray(postings.indices[positions], dtype=np.int64),
+                postings.data[positions] * np.repeat(weights, lengths))
+
+    def _delta_matrix(self, n_rows: int) -> sparse.csr_matrix:
+        """The delta rows as an (n_rows x terms) matrix"""
+        ids = np.fromiter(self._delta, dtype=np.int64, count=len(self._delta))
+        rows = sparse.vstack(list(self._delta.values()), format="csr")
+        scatter = sparse.csr_matrix((np.ones(len(ids)), (ids, np.arange(len(ids)))), shape=(n_rows, len(ids)))
+        return (scatter @ rows).tocsr()
@@ -0,0 +1,248 @@
+import copy
+import json
+import os
+import numpy as np
+from collections.abc import Mapping
+from typing import Callable, Dict, List, Tuple
+import pyarrow.compute as pc
+from catalog_reader import string_buffers
+from src.string_column import StringColumn
+
+COLUMN_NAMES = ('category', 'price', 'in_stock', 'alive')
+STRING_COLUMN_NAMES = ('product_id', 'name', 'document')
+# deleted_at of a row no generation has deleted
+LIVE = np.iinfo(np.int64).max
+# Price/stock changes held in an overlay before they are folded into new arrays
+OVERLAY_LIMIT = 4096
+
+
+class MetadataColumns:
+    """
+    Product metadata and document text held column-wise, one row per FAISS id.
+
+    Rows are addressed by the same stable int64 id the index uses, so a
+    boolean mask over the columns is directly a mask over index ids and a
+    search hit maps back to its product in O(1). Categories are interned to
+    int32 codes; product ids, names and documents are StringColumns.
+
+    Rows are written once and never changed afterwards, except for being
+    deleted; a new document is written as a new row. deleted_at records the
+    generation that deleted each row, so a reader holding an older generation
+    still sees the rows that were alive at that point, see visible(). Price
+    and stock changes keep the row: with_values() returns a copy that sees
+    them, and readers of this object don't.
+    """
+
+    def __init__(self, capacity: int = 1024):
+        self.size = 0
+        self.categories: List[str] = []
+        self.category_codes: Dict[str, int] = {}
+        self.category = np.full(capacity, -1, dtype=np.int32)
+        self.price = np.zeros(capacity, dtype=np.float64)
+        self.in_stock = np.zeros(capacity, dtype=bool)
+        self.alive = np.zeros(capacity, dtype=bool)
+        self.deleted_at = np.full(capacity, LIVE, dtype=np.int64)
+        self.product_id = StringColumn(capacity)
+        self.name = StringColumn(capacity)
+        self.document = StringColumn(capacity)
+        # row -> (price, in_stock) written by with_values() and not yet folded into the arrays
+        self.overlay: Dict[int, Tuple[float, bool]] = {}
+
+    def set_row(self, row: int, metadata: Dict, document: str) -> None:
+        self.set_rows(np.array([row], dtype=np.int64), [metadata], [document])
+
+    def set_rows(self, rows: np.ndarray, metadatas: List[Dict], documents: List[str]) -> None:
+        """Write whole rows: the metadata dicts plus each product's document text"""
+        if len(rows) == 0:
+            return
+        self._ensure_capacity(int(rows.max()) + 1)
+        self.category[rows] = [self.category_code(m['category'], create=True) for m in metadatas]
+        self.price[rows] = [m['price'] for m in metadatas]
+        self.in_stock[rows] = [m['in_stock'] for m in metadatas]
+        self.alive[rows] = True
+        self.product_id.set_many(rows, [m['product_id'] for m in metadatas])
+        self.name.set_many(rows, [m['name'] for m in metadatas])
+        self.document.set_many(rows, documents)
+        self.size = max(self.size, int(rows.max()) + 1)
+
+    def set_batch(self, rows: np.ndarray, batch, documents) -> None:
+        """
+        Write whole rows column by column from an Arrow batch or table in
+        CATALOG_SCHEMA plus an Arrow array of document texts; strings are
+        copied from the Arrow buffers without creating Python objects
+        """
+        if len(rows) == 0:
+            return
+        self._ensure_capacity(int(rows.max()) + 1)
+        categories = pc.fill_null(_combined(batch.column('category')), "").dictionary_encode()
+        codes = np.array([self.category_code(c, create=True) for c in categories.dictionary.to_pylist()],
+                         dtype=np.int32)
+        self.category[rows] = codes[categories.indices.to_numpy()]
+        self.price[rows] = _combined(batch.column('price')).to_numpy(zero_copy_only=False)
+        self.in_stock[rows] = pc.fill_null(_combined(batch.column('in_stock')), False).to_numpy(zero_copy_only=False)
+        self.alive[rows] = True
+        self.product_id.set_encoded(rows, *string_buffers(batch.column('product_id')))
+        self.name.set_encoded(rows, *string_buffers(batch.column('name')))
+        self.document.set_encoded(rows, *string_buffers(documents))
+        self.size = max(self.size, int(rows.max()) + 1)
+
+    def update_row(self, row: int, price: float = None, in_stock: bool = None,
+                   document: str = None) -> None:
+        if price is not None:
+            self.price[row] = price
+        if in_stock is not None:
+            self.in_stock[row] = in_stock
+        if document is not None:
+            self.document.set(row, document)
+
+    def copy_row(self, source: int, target: int) -> None:
+        """Duplicate a row under a new id, e.g. to write an updated product"""
+        self.set_row(target, self.metadata(source), self.document.get(source))
+
+    def with_values(self, row: int, price: float = None, in_stock: bool = None) -> "MetadataColumns":
+        """
+        A copy of the columns in which row has a new price and/or stock
+        status. The copy shares every array and keeps the change in its
+        overlay; past OVERLAY_LIMIT changes it folds them into new price and
+        in_stock arrays instead.
+        """
+        current = self.metadata(row)
+        values = (current['price'] if price is None else float(price),
+                  current['in_stock'] if in_stock is None else bool(in_stock))
+        columns = copy.copy(self)
+        columns.overlay = {**self.overlay, row: values}
+        if len(columns.overlay) >= OVERLAY_LIMIT:
+            columns.price, columns.in_stock = columns._overlaid('price'), columns._overlaid('in_stock')
+            columns.overlay = {}
+        return columns
+
+    def metadata(self, row: int) -> Dict:
+        """The row as the metadata dict the catalog API returns"""
+        price, in_stock = self.overlay.get(row) or (self.price[row], self.in_stock[row])
+        return {
+            'product_id': self.product_id.get(row),
+            'category': self.categories[self.category[row]],
+            'price': float(price),
+            'in_stock': bool(in_stock),
+            'name': self.name.get(row),
+        }
+
+    def delete_row(self, row: int, generation: int = 0) -> None:
+        self.deleted_at[row] = generation
+        self.alive[row] = False
+
+    def visible(self, n_rows: int, generation: int) -> np.ndarray:
+        """Boolean mask of the first n_rows rows that were alive at generation"""
+        return self.deleted_at[:n_rows] > generation
+
+    def save(self, directory: str) -> None:
+        """Write each column as <directory>/<name>.npy plus the category dictionary"""
+        os.makedirs(directory, exist_ok=True)
+        for name in COLUMN_NAMES:
+            np.save(os.path.join(directory, f"{name}.npy"), self._overlaid(name)[:self.size])
+        for name in STRING_COLUMN_NAMES:
+            getattr(self, name).save(os.path.join(directory, name), self.size)
+        with open(os.path.join(directory, "categories.json"), "w") as f:
+            json.dump(self.categories, f)
+
+    @classmethod
+    def load(cls, directory: str, mmap: bool = True) -> "MetadataColumns":
+        """Reopen saved columns, memory-mapped read-only when mmap=True"""
+        columns = cls(capacity=0)
+        for name in COLUMN_NAMES:
+            setattr(columns, name, np.load(os.path.join(directory, f"{name}.npy"),
+                                           mmap_mode="r" if mmap else None))
+        for name in STRING_COLUMN_NAMES:
+            setattr(columns, name, StringColumn.load(os.path.join(directory, name), mmap=mmap))
+        columns.size = len(columns.alive)
+        columns.deleted_at = np.where(columns.alive, LIVE, 0)
+        with open(os.path.join(directory, "categories.json")) as f:
+            columns.categories = json.load(f)
+        columns.category_codes = {category: code for code, category in enumerate(columns.categories)}
+        return columns
+
+    def detach(self) -> None:
+        """Copy memory-mapped columns into writable memory"""
+        for name in COLUMN_NAMES:
+            setattr(self, name, np.array(getattr(self, name)))
+        for name in STRING_COLUMN_NAMES:
+            getattr(self, name).detach()
+
+    def nbytes(self) -> int:
+        """Bytes needed by the used rows of every column"""
+        numeric = sum(getattr(self, name)[:self.size].nbytes for name in COLUMN_NAMES)
+        return int(numeric + sum(getattr(self, name).nbytes(self.size) for name in STRING_COLUMN_NAMES))
+
+    def category_code(self, category: str, create: bool = False) -> int:
+        """Interned code for a category, -1 if unknown and create is False"""
+        code = self.category_codes.get(category)
+        if code is None:
+            if not create:
+                return -1
+            code = len(self.categories)
+            self.categories.append(category)
+            self.category_codes[category] = code
+        return code
+
+    def column(self, field: str) -> np.ndarray:
+        """Live view of a filterable column, trimmed to the used rows"""
+        if field == 'category':
+            return self.category[:self.size]
+        if field in ('price', 'in_stock'):
+            return self._overlaid(field)[:self.size]
+        raise ValueError(f"Field '{field}' is not filterable, expected one of: category, price, in_stock")
+
+    def encode_value(self, field: str, value):
+        """Translate a filter literal into the column's storage type"""
+        if field == 'category':
+            return self.category_code(value)
+        return value
+
+    def _overlaid(self, name: str) -> np.ndarray:
+        """Column name with the overlay applied, a copy when there is one"""
+        column = getattr(self, name)
+        if name not in ('price', 'in_stock') or not self.overlay:
+            return column
+        column = np.array(column)
+        field = 0 if name == 'price' else 1
+        column[list(self.overlay)] = [values[field] for values in self.overlay.values()]
+        return column
+
+    def _ensure_capacity(self, required: int) -> None:
+        capacity = len(self.alive)
+        if required <= capacity:
+            return
+        new_capacity = max(required, capacity * 2)
+        for name in COLUMN_NAMES:
+            old = getattr(self, name)
+            new = np.full(new_capacity, -1, dtype=old.dtype) if name == 'category' \
+                else np.zeros(new_capacity, dtype=old.dtype)
+            new[:capacity] = old
+            setattr(self, name, new)
+        deleted_at = np.full(new_capacity, LIVE, dtype=np.int64)
+        deleted_at[:capacity] = self.deleted_at
+        self.deleted_at = deleted_at
+        for name in STRING_COLUMN_NAMES:
+            getattr(self, name).resize(new_capacity)
+
+
+class RowMapping(Mapping):
+    """Read-only product_id -> value view that reads rows on access"""
+
+    def __init__(self, product_to_id: Dict[str, int], read_row: Callable[[int], object]):
+        self._product_to_id = product_to_id
+        self._read_row = read_row
+
+    def __getitem__(self, product_id: str):
+        return self._read_row(self._product_to_id[product_id])
+
+    def __iter__(self):
+        return iter(self._product_to_id)
+
+    def __len__(self) -> int:
+        return len(self._product_to_id)
+
+
+def _combined(column):
+    """A table's ChunkedArray column as one contiguous Array"""
+    return column.combine_chunks() if hasattr(column, 'combine_chunks') else column
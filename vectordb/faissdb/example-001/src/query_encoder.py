@@ -0,0 +1,122 @@
+import threading
+from collections import Counter, OrderedDict
+from typing import Dict, List
+
+import numpy as np
+from scipy import sparse
+from sklearn.decomposition import TruncatedSVD
+
+from src.featurizers import HashingTfidfVectorizer
+
+
+def normalize_query(text: str) -> str:
+    """Cache key: TF-IDF lowercases and ignores whitespace, so equal keys encode equally"""
+    return " ".join(text.lower().split())
+
+
+class QueryEncoder:
+    """
+    TF-IDF + SVD encoding as a single sparse-dense product.
+
+    TfidfVectorizer.transform followed by TruncatedSVD.transform computes
+    l2_normalize(counts * idf) @ components.T. The IDF weights are folded
+    into the projection once, so encoding is counts @ projection scaled by
+    1 / ||counts * idf||, without the per-call overhead of either sklearn
+    transformer.
+
+    encode_queries() additionally keeps encoded vectors in an LRU cache of
+    cache_size entries keyed by normalize_query(text). The cache is guarded
+    by a lock, so one encoder can serve concurrent searches.
+    """
+
+    def __init__(self, vectorizer, svd: TruncatedSVD, cache_size: int = 1024):
+        self.idf = np.asarray(vectorizer.idf_, dtype=np.float64)
+        self.projection = np.ascontiguousarray(self.idf[:, None] * svd.components_.T)
+        if isinstance(vectorizer, HashingTfidfVectorizer):
+            self._count = vectorizer.hasher.transform
+        else:
+            self._analyze = vectorizer.build_analyzer()
+            self._vocabulary: Dict[str, int] = vectorizer.vocabulary_
+            self._count = self._count_terms
+        self.cache_size = cache_size
+        self._cache: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def transform(self, texts: List[str]) -> np.ndarray:
+        """Encode texts to float32 vectors, bypassing the cache"""
+        counts, norms = self._counts_and_norms(texts)
+        vectors = (counts @ self.projection) / norms[:, None]
+        return np.ascontiguousarray(vectors, dtype="float32")
+
+    def tfidf(self, texts: List[str]) -> sparse.csr_matrix:
+        """The L2-normalized TF-IDF rows TfidfVectorizer.transform would return"""
+        counts, norms = self._counts_and_norms(texts)
+        rows = np.repeat(np.arange(len(texts)), np.diff(counts.indptr))
+        counts.data = counts.data * self.idf[counts.indices] / norms[rows]
+        return counts
+
+    def encode_queries(self, queries: List[str]) -> np.ndarray:
+        """Encode queries through the LRU cache, computing all misses in one product"""
+        keys = [normalize_query(q) for q in queries]
+        vectors = np.empty((len(keys), self.projection.shape[1]), dtype="float32")
+        missing: Dict[str, List[int]] = {}
+        with self._lock:
+            for i, key in enumerate(keys):
+                cached = self._cache.get(key)
+                if cached is None:
+                    missing.setdefault(key, []).append(i)
+                else:
+                    self._cache.move_to_end(key)
+                    vectors[i] = cached
+                    self.hits += 1
+            self.misses += sum(len(rows) for rows in missing.values())
+        if missing:
+            encoded = self.transform(list(missing))
+            with self._lock:
+                for (key, rows), vector in zip(missing.items(), encoded):
+                    vectors[rows] = vector
+                    self._remember(key, vector.copy())
+        return vectors
+
+    def cache_info(self) -> Dict[str, int]:
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses,
+                    "size": len(self._cache), "max_size": self.cache_size}
+
+    def clear_cache(self) -> None:
+        with self._lock:
+            self._cache.clear()
+            self.hits = 0
+            self.misses = 0
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        if self.cache_size <= 0:
+            return
+        self._cache[key] = vector
+        if len(self._cache) > self.cache_size:
+            self._cache.popitem(last=False)
+
+    def _counts_and_norms(self, texts: List[str]):
+        """Term counts plus the L2 norm of each row of counts * idf"""
+        counts = self._count(texts)
+        rows = np.repeat(np.arange(len(texts)), np.diff(counts.indptr))
+        weighted = counts.data * self.idf[counts.indices]
+        norms = np.sqrt(np.bincount(rows, weights=weighted * weighted, minlength=len(texts)))
+        # Texts without known terms stay all-zero, as with TfidfVectorizer
+        norms[norms == 0] = 1.0
+        return counts, norms
+
+    def _count_terms(self, texts: List[str]) -> sparse.csr_matrix:
+        """Term counts over the fitted vocabulary, like CountVectorizer.transform"""
+        indptr = [0]
+        indices: List[int] = []
+        data: List[int] = []
+        for text in texts:
+            counts = Counter(self._vocabulary[t] for t in self._analyze(text) if t in self._vocabulary)
+            indices.extend(counts.keys())
+            data.extend(counts.values())
+            indptr.append(len(indices))
+        return sparse.csr_matrix((np.array(data, dtype=np.float64), np.array(indices, dtype=np.int64), indptr),
+                                 shape=(len(texts), len(self.idf)))
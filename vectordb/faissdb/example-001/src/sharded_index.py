@@ -0,0 +1,71 @@
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, List, Union
+
+import faiss
+import numpy as np
+
+
+class ShardedIndex:
+    """
+    Several FAISS indexes holding disjoint sets of ids, searched in parallel.
+
+    Exposes the part of the faiss.Index API FaissCatalogManager uses, so it
+    can stand in for a single index. shard_of maps int64 ids to shard
+    numbers and routes every add and remove. Searches run one index.search
+    per shard on pool (FAISS releases the GIL while searching) and merge the
+    per-shard top-k lists with faiss.ResultHeap. The pool belongs to the
+    caller, which shares it between the indexes it builds and shuts it down.
+    """
+
+    def __init__(self, shards: List[faiss.Index], shard_of: Callable[[np.ndarray], np.ndarray],
+                 pool: ThreadPoolExecutor):
+        self.shards = shards
+        self.shard_of = shard_of
+        self._pool = pool
+
+    @property
+    def d(self) -> int:
+        return self.shards[0].d
+
+    @property
+    def ntotal(self) -> int:
+        return sum(shard.ntotal for shard in self.shards)
+
+    @property
+    def is_trained(self) -> bool:
+        return all(shard.is_trained for shard in self.shards)
+
+    def train(self, x: np.ndarray) -> None:
+        """Train once and copy the quantizer, so every shard encodes like an unsharded index"""
+        self.shards[0].train(x)
+        self.shards[1:] = [faiss.clone_index(self.shards[0]) for _ in self.shards[1:]]
+
+    def add_with_ids(self, x: np.ndarray, ids: np.ndarray) -> None:
+        for shard_no, rows in self._route(ids):
+            self.shards[shard_no].add_with_ids(np.ascontiguousarray(x[rows]), ids[rows])
+
+    def remove_ids(self, ids: np.ndarray) -> int:
+        return sum(self.shards[shard_no].remove_ids(ids[rows]) for shard_no, rows in self._route(ids))
+
+    def search(self, x: np.ndarray, k: int,
+               params: Union[faiss.SearchParameters, List[faiss.SearchParameters]] = None):
+        """
+        Per-shard top-k in parallel, merged into one (distances, labels) pair.
+        params is one SearchParameters per shard, or one for all of them when
+        it has no IDSelector (id-mapped shards swap params.sel while searching)
+        """
+        if not isinstance(params, list):
+            params = [params] * len(self.shards)
+        futures = [self._pool.submit(shard.search, x, k, params=shard_params)
+                   for shard, shard_params in zip(self.shards, params)]
+        heap = faiss.ResultHeap(len(x), k)
+        for future in futures:
+            heap.add_result(*future.result())
+        heap.finalize()
+        return heap.D, heap.I
+
+    def _route(self, ids: np.ndarray):
+        """(shard number, row indices) for every shard that owns some of ids"""
+        shard_numbers = self.shard_of(ids)
+        for shard_no in np.unique(shard_numbers):
+            yield int(shard_no), np.flatnonzero(shard_numbers == shard_no)
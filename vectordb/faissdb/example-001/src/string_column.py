@@ -0,0 +1,105 @@
+import os
+import numpy as np
+from typing import List
+
+
+class StringColumn:
+    """
+    Variable-length UTF-8 strings addressed by row.
+
+    All bytes live in one uint8 buffer and each row is a (start, length) pair,
+    so a row costs 16 bytes plus its text instead of a Python str object.
+    Overwriting a row appends the new bytes and repoints it; save() writes
+    only the bytes still referenced, back to back.
+    """
+
+    def __init__(self, capacity: int = 1024, blob_capacity: int = 65536):
+        self.starts = np.zeros(capacity, dtype=np.int64)
+        self.lengths = np.zeros(capacity, dtype=np.int64)
+        self.blob = np.zeros(blob_capacity, dtype=np.uint8)
+        self.used = 0
+
+    def get(self, row: int) -> str:
+        start = int(self.starts[row])
+        return self.blob[start:start + int(self.lengths[row])].tobytes().decode("utf-8")
+
+    def set(self, row: int, value: str) -> None:
+        self.set_many(np.array([row], dtype=np.int64), [value])
+
+    def set_many(self, rows: np.ndarray, values: List[str]) -> None:
+        """Append the encoded values in one copy and point rows at them"""
+        if len(rows) == 0:
+            return
+        encoded = [v.encode("utf-8") for v in values]
+        offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+        np.cumsum(np.fromiter((len(b) for b in encoded), dtype=np.int64, count=len(encoded)), out=offsets[1:])
+        self.set_encoded(rows, np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets)
+
+    def set_encoded(self, rows: np.ndarray, data: np.ndarray, offsets: np.ndarray) -> None:
+        """
+        Point rows at values that are already UTF-8 bytes, value i being
+        data[offsets[i]:offsets[i + 1]] (e.g. the buffers of an Arrow string array)
+        """
+        if len(rows) == 0:
+            return
+        base, end = int(offsets[0]), int(offsets[-1])
+        self.resize(max(len(self.starts), int(rows.max()) + 1))
+        self._ensure_blob_capacity(self.used + end - base)
+        self.blob[self.used:self.used + end - base] = data[base:end]
+        self.starts[rows] = self.used + offsets[:-1] - base
+        self.lengths[rows] = np.diff(offsets)
+        self.used += end - base
+
+    def resize(self, capacity: int) -> None:
+        """Grow the per-row arrays to at least capacity rows"""
+        if capacity <= len(self.starts):
+            return
+        for name in ("starts", "lengths"):
+            old = getattr(self, name)
+            new = np.zeros(capacity, dtype=np.int64)
+            new[:len(old)] = old
+            setattr(self, name, new)
+
+    def nbytes(self, n_rows: int) -> int:
+        """Bytes needed by the first n_rows: offsets plus referenced text"""
+        return int(self.starts[:n_rows].nbytes + self.lengths[:n_rows].nbytes + self.lengths[:n_rows].sum())
+
+    def save(self, path_prefix: str, n_rows: int) -> None:
+        """
+        Write the first n_rows as one UTF-8 blob (<prefix>.bin) plus int64
+        start offsets (<prefix>.offsets.npy, n_rows + 1 entries)
+        """
+        lengths = self.lengths[:n_rows]
+        offsets = np.zeros(n_rows + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        # Gather every referenced byte in row order, dropping overwritten ones
+        gather = np.repeat(self.starts[:n_rows] - offsets[:-1], lengths) + np.arange(offsets[-1])
+        self.blob[gather].tofile(f"{path_prefix}.bin")
+        np.save(f"{path_prefix}.offsets.npy", offsets)
+
+    @classmethod
+    def load(cls, path_prefix: str, mmap: bool = True) -> "StringColumn":
+        """Reopen a saved column, memory-mapped read-only when mmap=True"""
+        column = cls(capacity=0, blob_capacity=0)
+        offsets = np.load(f"{path_prefix}.offsets.npy")
+        column.starts = offsets[:-1].copy()
+        column.lengths = np.diff(offsets)
+        blob_path = f"{path_prefix}.bin"
+        if mmap and os.path.getsize(blob_path) > 0:
+            column.blob = np.memmap(blob_path, dtype=np.uint8, mode="r")
+        else:
+            column.blob = np.fromfile(blob_path, dtype=np.uint8)
+        column.used = len(column.blob)
+        return column
+
+    def detach(self) -> None:
+        """Copy a memory-mapped blob into writable memory"""
+        self.blob = np.array(self.blob)
+
+    def _ensure_blob_capacity(self, required: int) -> None:
+        capacity = len(self.blob)
+        if required <= capacity:
+            return
+        new = np.zeros(max(required, capacity * 2), dtype=np.uint8)
+        new[:self.used] = self.blob[:self.used]
+        self.blob = new
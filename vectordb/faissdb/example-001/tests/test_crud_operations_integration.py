@@ -0,0 +1,964 @@
+import unittest
+import os
+import csv
+import shutil
+import tempfile
+import threading
+from unittest import mock
+import numpy as np
+import pyarrow.csv as pa_csv
+import pyarrow.feather as feather
+import pyarrow.parquet as pq
+from catalog_generator import write_catalog
+from src.crud_operations import FaissCatalogManager
+
+TEST_CSV_DATA = [
+    {'product_id': 'prod_001', 'name': 'Test Laptop Pro', 'description': 'A high-performance laptop for testing',
+     'category': 'Laptop', 'price': '1299.99', 'in_stock': 'True'},
+    {'product_id': 'prod_002', 'name': 'Test Smartphone Lite', 'description': 'An affordable smartphone for testing',
+     'category': 'Smartphone', 'price': '299.99', 'in_stock': 'True'},
+    {'product_id': 'prod_003', 'name': 'Test Headphones Premium', 'description': 'Noise-cancelling headphones for testing',
+     'category': 'Headphones', 'price': '199.99', 'in_stock': 'False'},
+    {'product_id': 'prod_004', 'name': 'Gaming Laptop Extreme', 'description': 'High-end gaming laptop with RGB lighting',
+     'category': 'Laptop', 'price': '2499.99', 'in_stock': 'True'},
+    {'product_id': 'prod_005', 'name': 'Sennheiser Headphones Black', 'description': 'Wireless over-ear headphones with deep bass',
+     'category': 'Headphones', 'price': '349.00', 'in_stock': 'True'},
+    {'product_id': 'prod_006', 'name': 'Budget Laptop Basic', 'description': 'Lightweight laptop for students and office work',
+     'category': 'Laptop', 'price': '449.50', 'in_stock': 'False'},
+    {'product_id': 'prod_007', 'name': 'Yeti Coffee Mug Red', 'description': 'Insulated coffee mug that keeps drinks hot',
+     'category': 'Coffee Mug', 'price': '29.99', 'in_stock': 'True'},
+    {'product_id': 'prod_008', 'name': 'Casio Watch Silver', 'description': 'Water resistant digital watch with alarm',
+     'category': 'Watch', 'price': '59.95', 'in_stock': 'True'},
+]
+
+
+def write_test_csv():
+    """Write TEST_CSV_DATA to a temporary CSV file and return it"""
+    temp_csv_file = tempfile.NamedTemporaryFile(mode='w', suffix='.csv', delete=False)
+    with open(temp_csv_file.name, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=TEST_CSV_DATA[0].keys())
+        writer.writeheader()
+        writer.writerows(TEST_CSV_DATA)
+    return temp_csv_file
+
+
+class TestFaissCatalogIntegration(unittest.TestCase):
+    """Integration test suite for FaissCatalogManager"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Set up test data before all tests"""
+        cls.test_csv_data = TEST_CSV_DATA
+        cls.temp_csv_file = write_test_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up after all tests"""
+        os.unlink(cls.temp_csv_file.name)
+
+    def setUp(self):
+        """Set up before each test"""
+        self.catalog_mgr = FaissCatalogManager(dim=6)
+        self.catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+
+    def _brute_force_ids(self, query_text: str, k: int):
+        """Exact nearest neighbours over the current vectors, i.e. what a full rebuild returns"""
+        product_ids = list(self.catalog_mgr.documents.keys())
+        vectors = np.array([self.catalog_mgr.get_vector(pid) for pid in product_ids])
+        query_vec = self.catalog_mgr._encode(query_text)
+        distances = ((vectors - query_vec) ** 2).sum(axis=1)
+        return [product_ids[i] for i in np.argsort(distances, kind="stable")[:k]]
+
+    def test_1_create_catalog_from_csv(self):
+        """Test CREATE operation: Populate catalog from CSV"""
+        self.assertEqual(self.catalog_mgr.get_product_count(), 8)
+        self.assertEqual(self.catalog_mgr.index.ntotal, 8)
+        self.assertEqual(self.catalog_mgr.metadatas['prod_001']['name'], 'Test Laptop Pro')
+
+    def test_2_search_products_with_filters(self):
+        """Test READ operation: Search with metadata filters"""
+        filters = {"category": {"$eq": "Laptop"}, "price": {"$lte": 1500.0}}
+        results = self.catalog_mgr.search_products("good laptop", n_results=5, filters=filters)
+
+        self.assertEqual({r['id'] for r in results}, {'prod_001', 'prod_006'})
+        for r in results:
+            self.assertLessEqual(r['price'], 1500.0)
+
+    def test_3_add_product(self):
+        """Test CREATE operation: Add a single product without rebuilding"""
+        success = self.catalog_mgr.add_product({
+            'product_id': 'prod_009', 'name': 'Sennheiser Headphones White',
+            'description': 'Studio headphones for testing', 'category': 'Headphones',
+            'price': '129.00', 'in_stock': 'True'})
+
+        self.assertTrue(success)
+        self.assertEqual(self.catalog_mgr.get_product_count(), 9)
+        # Searched exactly until compaction folds it into the index
+        self.assertEqual(self.catalog_mgr.index.ntotal, 8)
+        self.assertEqual(self.catalog_mgr.compaction_info()["delta_rows"], 1)
+        results = self.catalog_mgr.search_products("studio headphones", n_results=9)
+        self.assertEqual(len({r['id'] for r in results}), 9)
+        self.assertFalse(self.catalog_mgr.add_product(self.test_csv_data[0]))
+
+        self.catalog_mgr.compact()
+        self.assertEqual(self.catalog_mgr.index.ntotal, 9)
+        self.assertEqual(self.catalog_mgr.compaction_info()["delta_rows"], 0)
+
+    def test_4_update_product(self):
+        """Test UPDATE operation: Modify product price, stock status and description"""
+        success = self.catalog_mgr.update_product("prod_003", new_price=179.99, in_stock=True,
+                                                  new_description="Noise-cancelling headphones - NOW ON SALE!")
+
+        self.assertTrue(success)
+        self.assertEqual(self.catalog_mgr.metadatas['prod_003']['price'], 179.99)
+        self.assertTrue(self.catalog_mgr.metadatas['prod_003']['in_stock'])
+        self.assertIn("NOW ON SALE", self.catalog_mgr.documents['prod_003'])
+        self.assertEqual(self.catalog_mgr.index.ntotal, 8)
+        self.assertFalse(self.catalog_mgr.update_product("prod_999", new_price=99.99))
+
+    def test_5_delete_product(self):
+        """Test DELETE operation: Remove product from catalog"""
+        self.assertTrue(self.catalog_mgr.delete_product("prod_002"))
+        self.assertEqual(self.catalog_mgr.get_product_count(), 7)
+        # Tombstoned until compaction
+        self.assertEqual(self.catalog_mgr.index.ntotal, 8)
+        self.assertFalse(self.catalog_mgr.delete_product("prod_002"))
+
+        results = self.catalog_mgr.search_products("smartphone", n_results=8)
+        self.assertNotIn('prod_002', [r['id'] for r in results])
+        self.assertEqual(len(results), 7)
+
+        self.catalog_mgr.compact()
+        self.assertEqual(self.catalog_mgr.index.ntotal, 7)
+        self.assertEqual(self.catalog_mgr.search_products("smartphone", n_results=8), results)
+
+    def test_6_incremental_matches_full_rebuild(self):
+        """Test in-place add/update/delete return the same neighbours as a full rebuild"""
+        self.catalog_mgr.update_product("prod_001", new_description="Rugged laptop for field work")
+        self.catalog_mgr.delete_product("prod_004")
+        self.catalog_mgr.add_product({
+            'product_id': 'prod_010', 'name': 'Dell Laptop Blue', 'description': 'Business laptop with long battery',
+            'category': 'Laptop', 'price': '899.00', 'in_stock': 'True'})
+
+        for query in ["laptop", "headphones with bass", "coffee"]:
+            results = self.catalog_mgr.search_products(query, n_results=4)
+            self.assertEqual([r['id'] for r in results], self._brute_force_ids(query, 4))
+
+    def test_7_legacy_rebuild_mode(self):
+        """Test use_id_map=False tombstones deletes and updates and compacts by rebuilding"""
+        catalog_mgr = FaissCatalogManager(dim=6, use_id_map=False, compaction_threshold=None)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+
+        self.assertTrue(catalog_mgr.delete_product("prod_001"))
+        self.assertTrue(catalog_mgr.update_product("prod_005", new_price=10.0))
+        results = catalog_mgr.search_products("laptop", n_results=8)
+
+        self.assertEqual(catalog_mgr.index.ntotal, 8)
+        self.assertNotIn('prod_001', [r['id'] for r in results])
+        self.assertEqual(len(results), 7)
+        catalog_mgr.compact()
+        self.assertEqual(catalog_mgr.index.ntotal, 7)
+        self.assertEqual(catalog_mgr.search_products("laptop", n_results=8), results)
+
+        results = catalog_mgr.search_products("laptop", n_results=8, filters={"category": "Laptop"})
+        self.assertEqual({r['id'] for r in results}, {'prod_004', 'prod_006'})
+
+    def test_8_filtered_search_returns_exactly_k(self):
+        """Test selective filters are pushed into FAISS instead of over-fetching"""
+        results = self.catalog_mgr.search_products("coffee mug", n_results=2,
+                                                   filters={"category": "Laptop", "in_stock": True})
+        self.assertEqual({r['id'] for r in results}, {'prod_001', 'prod_004'})
+
+        results = self.catalog_mgr.search_products("anything", n_results=3,
+                                                   filters={"price": {"$lt": 100.0}})
+        self.assertEqual({r['id'] for r in results}, {'prod_007', 'prod_008'})
+
+        results = self.catalog_mgr.search_products("laptop", n_results=5,
+                                                   filters={"category": "Tablet"})
+        self.assertEqual(results, [])
+
+    def test_9_filter_operators(self):
+        """Test $in/$ne/$gte and nested $and/$or compile to the right row mask"""
+        filters = {"$or": [{"category": {"$in": ["Watch", "Coffee Mug"]}},
+                           {"$and": [{"category": {"$ne": "Laptop"}}, {"price": {"$gte": 300.0}}]}]}
+        results = self.catalog_mgr.search_products("product", n_results=8, filters=filters)
+        self.assertEqual({r['id'] for r in results}, {'prod_007', 'prod_008', 'prod_005'})
+
+        self.catalog_mgr.delete_product("prod_007")
+        self.catalog_mgr.update_product("prod_008", new_price=500.0)
+        results = self.catalog_mgr.search_products("product", n_results=8,
+                                                   filters={"price": {"$gte": 400.0, "$lte": 600.0}})
+        self.assertEqual({r['id'] for r in results}, {'prod_006', 'prod_008'})
+
+        with self.assertRaises(ValueError):
+            self.catalog_mgr.search_products("product", filters={"price": {"$regex": "1.*"}})
+
+    def test_10_search_products_batch(self):
+        """Test batched search returns the same per-query results as single searches"""
+        queries = ["laptop", "headphones with bass", "coffee", "watch"]
+        filters = {"in_stock": True}
+
+        batch_results = self.catalog_mgr.search_products_batch(queries, n_results=3, filters=filters)
+
+        self.assertEqual(len(batch_results), len(queries))
+        for query, results in zip(queries, batch_results):
+            single = self.catalog_mgr.search_products(query, n_results=3, filters=filters)
+            self.assertEqual([r['id'] for r in results], [r['id'] for r in single])
+        self.assertEqual(self.catalog_mgr.search_products_batch([], n_results=3), [])
+
+    def test_11_column_store_rows_match_products(self):
+        """Test every live row maps back to its product after updates and deletes"""
+        # Arrange
+        self.catalog_mgr.update_product("prod_005", new_description="Studio headphones, flat response")
+        self.catalog_mgr.delete_product("prod_002")
+        self.catalog_mgr.add_product({
+            'product_id': 'prod_009', 'name': 'Dell Laptop Blue', 'description': 'Business laptop',
+            'category': 'Laptop', 'price': '899.00', 'in_stock': 'True'})
+        columns = self.catalog_mgr.columns
+
+        # Act
+        live_rows = np.flatnonzero(columns.alive[:columns.size])
+
+        # Assert
+        self.assertEqual(len(live_rows), self.catalog_mgr.get_product_count())
+        for row in live_rows:
+            product_id = columns.product_id.get(row)
+            self.assertEqual(self.catalog_mgr.product_to_id[product_id], row)
+        self.assertEqual(self.catalog_mgr.documents['prod_005'], "Studio headphones, flat response")
+        self.assertNotIn('prod_002', self.catalog_mgr.metadatas)
+        self.assertEqual(self.catalog_mgr.metadatas['prod_009']['category'], 'Laptop')
+        results = self.catalog_mgr.search_products("business laptop", n_results=3, filters={"price": 899.0})
+        self.assertEqual([(r['id'], r['name']) for r in results], [('prod_009', 'Dell Laptop Blue')])
+        self.assertGreater(self.catalog_mgr.memory_usage()["column_bytes"], 0)
+
+    def test_12_query_encoding_fast_path_and_cache(self):
+        """Test the folded projection matches sklearn's transforms and repeated queries hit the cache"""
+        # Arrange
+        queries = ["Gaming LAPTOP", "wireless headphones with deep bass", "unknown words only"]
+        tfidf = self.catalog_mgr.vectorizer.transform(queries)
+        expected = self.catalog_mgr.svd.transform(tfidf)
+
+        # Act
+        encoded = self.catalog_mgr._encode_batch(queries)
+        first = self.catalog_mgr.search_products("Gaming laptop", n_results=2)
+        second = self.catalog_mgr.search_products("  gaming   LAPTOP ", n_results=2)
+
+        # Assert
+        np.testing.assert_allclose(encoded, expected, rtol=1e-5, atol=1e-6)
+        self.assertEqual(first, second)
+        self.assertEqual(self.catalog_mgr.query_cache_info(),
+                         {"hits": 1, "misses": 1, "size": 1, "max_size": 1024})
+
+    def test_13_query_cache_evicts_least_recently_used(self):
+        """Test the query cache stays within its bound, evicting the least recently used query"""
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False, query_cache_size=2)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+
+        catalog_mgr.search_products_batch(["laptop", "watch"])
+        catalog_mgr.search_products("laptop")
+        catalog_mgr.search_products("coffee")  # evicts "watch", not the more recently used "laptop"
+        catalog_mgr.search_products_batch(["laptop", "watch"])
+
+        self.assertEqual(catalog_mgr.query_cache_info(),
+                         {"hits": 2, "misses": 4, "size": 2, "max_size": 2})
+
+    def test_14_metadata_only_update_skips_encoding(self):
+        """Test price/stock updates reuse the stored vector, and unchanged values write nothing"""
+        vector = self.catalog_mgr.get_vector("prod_003").copy()
+        with mock.patch.object(self.catalog_mgr, "_encode", side_effect=AssertionError("re-encoded")):
+            self.assertTrue(self.catalog_mgr.update_product("prod_003", new_price=149.99, in_stock=True))
+            generation = self.catalog_mgr._versions.snapshot.generation
+            self.assertTrue(self.catalog_mgr.update_product("prod_003", new_price=149.99))
+            self.assertEqual(self.catalog_mgr._versions.snapshot.generation, generation)
+
+        self.assertEqual(self.catalog_mgr.metadatas["prod_003"]["price"], 149.99)
+        self.assertTrue(self.catalog_mgr.metadatas["prod_003"]["in_stock"])
+        np.testing.assert_array_equal(self.catalog_mgr.get_vector("prod_003"), vector)
+        results = self.catalog_mgr.search_products("headphones", n_results=3,
+                                                  filters={"category": "Headphones", "price": {"$lt": 150.0}})
+        self.assertEqual([r['id'] for r in results], ["prod_003"])
+
+        self.catalog_mgr.update_product("prod_003", new_description="Coffee mug that keeps drinks hot")
+        self.assertFalse(np.array_equal(self.catalog_mgr.get_vector("prod_003"), vector))
+
+    def test_15_price_update_keeps_the_row_and_vector(self):
+        """Test a price/stock change moves no vectors and leaves older snapshots as they were"""
+        snapshot = self.catalog_mgr._versions.snapshot
+        row, next_id = self.catalog_mgr.product_to_id["prod_003"], self.catalog_mgr._next_id
+        ntotal, tombstones = self.catalog_mgr.index.ntotal, self.catalog_mgr.compaction_info()["tombstones"]
+
+        self.assertTrue(self.catalog_mgr.update_product("prod_003", new_price=9.99, in_stock=True))
+
+        self.assertEqual(self.catalog_mgr.product_to_id["prod_003"], row)
+        self.assertEqual(self.catalog_mgr._next_id, next_id)
+        self.assertEqual(self.catalog_mgr.index.ntotal, ntotal)
+        self.assertEqual(self.catalog_mgr.compaction_info()["tombstones"], tombstones)
+        self.assertEqual(self.catalog_mgr.metadatas["prod_003"]["price"], 9.99)
+        self.assertEqual(snapshot.columns.metadata(row)["price"], 199.99)
+        self.assertEqual(snapshot.row_mask({"price": {"$lt": 10.0}})[row], False)
+        self.assertEqual([r['id'] for r in self.catalog_mgr.search_products(
+            "headphones", n_results=3, filters={"price": {"$lt": 10.0}, "in_stock": True})], ["prod_003"])
+
+        # Past the overlay limit the changes are folded into new arrays, still without touching older snapshots
+        with mock.patch("src.metadata_columns.OVERLAY_LIMIT", 2):
+            self.catalog_mgr.update_product("prod_005", new_price=5.0)
+        self.assertEqual(self.catalog_mgr.columns.overlay, {})
+        self.assertEqual(self.catalog_mgr.metadatas["prod_005"]["price"], 5.0)
+        self.assertEqual(self.catalog_mgr.metadatas["prod_003"]["price"], 9.99)
+        self.assertEqual(snapshot.columns.metadata(row)["price"], 199.99)
+        self.assertEqual(self.catalog_mgr._next_id, next_id)
+
+    def test_16_empty_description_is_unchanged(self):
+        """Test an empty new_description keeps the document and its vector"""
+        document = self.catalog_mgr.documents["prod_003"]
+        vector = self.catalog_mgr.get_vector("prod_003").copy()
+        with mock.patch.object(self.catalog_mgr, "_encode", side_effect=AssertionError("re-encoded")):
+            self.assertTrue(self.catalog_mgr.update_product("prod_003", new_description="", new_price=139.99))
+
+        self.assertEqual(self.catalog_mgr.documents["prod_003"], document)
+        self.assertEqual(self.catalog_mgr.metadatas["prod_003"]["price"], 139.99)
+        np.testing.assert_array_equal(self.catalog_mgr.get_vector("prod_003"), vector)
+
+class TestFaissApproximateIndexes(unittest.TestCase):
+    """Integration tests for the IVF and HNSW index families"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_csv_file = write_test_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.temp_csv_file.name)
+
+    def _create(self, **kwargs) -> FaissCatalogManager:
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False, **kwargs)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+        return catalog_mgr
+
+    def _assert_matches_brute_force(self, catalog_mgr, **search_kwargs):
+        product_ids = list(catalog_mgr.documents.keys())
+        vectors = np.array([catalog_mgr.get_vector(pid) for pid in product_ids])
+        for query in ["laptop", "headphones with bass", "coffee"]:
+            distances = ((vectors - catalog_mgr._encode(query)) ** 2).sum(axis=1)
+            expected = [product_ids[i] for i in np.argsort(distances, kind="stable")[:4]]
+            results = catalog_mgr.search_products(query, n_results=4, **search_kwargs)
+            self.assertEqual([r['id'] for r in results], expected)
+
+    def test_invalid_index_type(self):
+        with self.assertRaises(ValueError):
+            FaissCatalogManager(index_type="lsh")
+        with self.assertRaises(ValueError):
+            FaissCatalogManager(index_type="ivf", use_id_map=False)
+        with self.assertRaises(ValueError):
+            FaissCatalogManager(compression="pq", index_type="hnsw")
+
+    def test_ivf_trains_and_updates_in_place(self):
+        catalog_mgr = self._create(index_type="ivf", nlist=2, nprobe=1)
+
+        self.assertTrue(catalog_mgr.index.is_trained)
+        self.assertEqual(catalog_mgr.index.nlist, 2)
+        catalog_mgr.update_product("prod_001", new_description="Rugged laptop for field work")
+        catalog_mgr.delete_product("prod_004")
+        catalog_mgr.compact()
+        self.assertEqual(catalog_mgr.index.ntotal, 7)
+
+        # Visiting every cell makes IVF exact
+        self._assert_matches_brute_force(catalog_mgr, nprobe=2)
+        results = catalog_mgr.search_products("laptop", n_results=8, filters={"category": "Laptop"}, nprobe=2)
+        self.assertEqual({r['id'] for r in results}, {'prod_001', 'prod_006'})
+
+    def test_hnsw_tombstones_deletes_and_updates(self):
+        catalog_mgr = self._create(index_type="hnsw", hnsw_m=4, compaction_threshold=None)
+
+        catalog_mgr.update_product("prod_001", new_description="Rugged laptop for field work")
+        catalog_mgr.delete_product("prod_004")
+        # Old vectors stay in the graph but are never returned
+        self.assertEqual(catalog_mgr.index.ntotal, 8)
+        self.assertEqual(catalog_mgr.get_product_count(), 7)
+
+        self._assert_matches_brute_force(catalog_mgr, ef_search=16)
+        results = catalog_mgr.search_products("laptop", n_results=8)
+        self.assertEqual(len(results), 7)
+        self.assertEqual(len({r['id'] for r in results}), 7)
+
+    def test_compressed_modes_rerank_exactly(self):
+        for compression in ("sq8", "pq"):
+            for index_type in ("flat", "ivf"):
+                with self.subTest(compression=compression, index_type=index_type):
+                    # Re-ranking every candidate makes compressed search exact
+                    catalog_mgr = self._create(compression=compression, index_type=index_type,
+                                               nlist=1, rerank_factor=2)
+                    catalog_mgr.update_product("prod_001", new_description="Rugged laptop for field work")
+                    catalog_mgr.delete_product("prod_004")
+
+                    self._assert_matches_brute_force(catalog_mgr)
+                    results = catalog_mgr.search_products("laptop", n_results=3, filters={"category": "Laptop"})
+                    self.assertEqual({r['id'] for r in results}, {'prod_001', 'prod_006'})
+
+    def test_compressed_index_is_smaller(self):
+        flat = self._create().memory_usage()
+        sq8 = self._create(compression="sq8").memory_usage()
+
+        self.assertLess(sq8["index_bytes"], flat["index_bytes"])
+        self.assertEqual(sq8["vector_bytes"], flat["vector_bytes"])
+
+class TestFaissShardedSearch(unittest.TestCase):
+    """Integration tests for n_shards > 1"""
+
+    QUERIES = ["laptop", "headphones with bass", "coffee mug", "watch", "gaming"]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_csv_file = write_test_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.temp_csv_file.name)
+
+    def _create(self, **kwargs):
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False, **kwargs)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+        return catalog_mgr
+
+    def _results(self, catalog_mgr, filters=None):
+        return [[(r['id'], r['distance']) for r in results]
+                for results in catalog_mgr.search_products_batch(self.QUERIES, n_results=5, filters=filters)]
+
+    def test_sharded_results_match_unsharded(self):
+        """Flat, IVF and SQ8 shards return exactly the unsharded results, before and after writes"""
+        configs = [{}, {"index_type": "ivf", "nlist": 2, "nprobe": 1}, {"compression": "sq8"}]
+        for config in configs:
+            with self.subTest(config=config):
+                unsharded = self._create(**config)
+                sharded = self._create(n_shards=3, **config)
+                self.assertEqual(sharded.index.ntotal, 8)
+                self.assertEqual(sum(shard.ntotal > 0 for shard in sharded.index.shards), 3)
+
+                for catalog_mgr in (unsharded, sharded):
+                    catalog_mgr.update_product("prod_001", new_description="Rugged laptop for field work")
+                    catalog_mgr.delete_product("prod_004")
+                    catalog_mgr.compact()
+                self.assertEqual(sharded.index.ntotal, 7)
+                self.assertEqual(self._results(sharded), self._results(unsharded))
+                self.assertEqual(self._results(sharded, {"in_stock": True}),
+                                 self._results(unsharded, {"in_stock": True}))
+                self.assertEqual(sharded.search_products("laptop", n_results=2),
+                                 unsharded.search_products("laptop", n_results=2))
+
+    def test_shards_share_one_search_pool(self):
+        """Indexes built by compactions reuse the catalog's shard pool, and close() shuts it down"""
+        with self._create(n_shards=3) as catalog_mgr:
+            pool = catalog_mgr.index._pool
+            for i in range(3):
+                catalog_mgr.update_product("prod_001", new_description=f"Rugged laptop, revision {i}")
+                catalog_mgr.compact()
+                self.assertIs(catalog_mgr.index._pool, pool)
+            self.assertEqual(catalog_mgr.search_products("rugged laptop", n_results=1)[0]['id'], "prod_001")
+        with self.assertRaises(RuntimeError):
+            pool.submit(int)
+
+    def test_sharding_requires_id_map(self):
+        """Test invalid shard settings are rejected"""
+        with self.assertRaises(ValueError):
+            FaissCatalogManager(n_shards=2, use_id_map=False)
+        with self.assertRaises(ValueError):
+            FaissCatalogManager(n_shards=0)
+
+
+class TestFaissHybridSearch(unittest.TestCase):
+    """Integration tests for search_products_hybrid()"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_csv_file = write_test_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.temp_csv_file.name)
+
+    def setUp(self):
+        self.catalog_mgr = FaissCatalogManager(dim=6, verbose=False, hybrid=True)
+        self.catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+
+    def _lexical_ids(self, query_text, filters=None):
+        catalog_mgr = self.catalog_mgr
+        ids, _ = catalog_mgr.lexical_index.search(catalog_mgr._encoder().tfidf([query_text]), 5,
+                                                  catalog_mgr._id_mask(filters))
+        return [catalog_mgr.columns.product_id.get(i) for i in ids]
+
+    def test_brand_query_ranks_exact_match_first(self):
+        """Test both fusion methods put the product naming the brand first and report stage timings"""
+        for fusion in ("rrf", "weighted"):
+            with self.subTest(fusion=fusion):
+                results = self.catalog_mgr.search_products_hybrid("Sennheiser headphones", n_results=3,
+                                                                  fusion=fusion)
+
+                self.assertEqual(results[0]['id'], 'prod_005')
+                self.assertEqual(len(results), 3)
+                self.assertTrue(all(a['score'] >= b['score'] for a, b in zip(results, results[1:])))
+                self.assertEqual(set(self.catalog_mgr.last_stage_timings),
+                                 {"encode_ms", "dense_ms", "lexical_ms", "fusion_ms"})
+
+    def test_lexical_index_follows_writes_and_filters(self):
+        """Test updates, deletes and filters are reflected in the lexical stage"""
+        # Act
+        self.catalog_mgr.update_product("prod_007", new_description="Sennheiser branded coffee mug")
+        updated = self._lexical_ids("sennheiser")
+        self.catalog_mgr.delete_product("prod_005")
+        deleted = self._lexical_ids("sennheiser")
+        filtered = self._lexical_ids("laptop", filters={"in_stock": False})
+
+        # Assert
+        self.assertEqual(set(updated), {'prod_005', 'prod_007'})
+        self.assertEqual(deleted, ['prod_007'])
+        self.assertEqual(filtered, ['prod_006'])
+        self.assertNotIn('prod_007', self._lexical_ids("insulated"))
+
+    def test_hybrid_catalog_round_trip(self):
+        """Test the inverted index is saved and memory-mapped back with identical results"""
+        self.catalog_mgr.update_product("prod_007", new_description="Sennheiser branded coffee mug")
+        catalog_dir = tempfile.mkdtemp()
+        try:
+            self.catalog_mgr.save(catalog_dir)
+            loaded = FaissCatalogManager.load(catalog_dir, mmap=True, verbose=False)
+            for query in ("sennheiser", "gaming laptop", "watch alarm"):
+                self.assertEqual(loaded.search_products_hybrid(query, n_results=4),
+                                 self.catalog_mgr.search_products_hybrid(query, n_results=4))
+            self.assertTrue(loaded.add_product({
+                'product_id': 'prod_009', 'name': 'Sennheiser Earbuds', 'description': 'Wireless earbuds',
+                'category': 'Headphones', 'price': '129.00', 'in_stock': 'True'}))
+            self.assertIn('prod_009', [r['id'] for r in loaded.search_products_hybrid("sennheiser", n_results=3)])
+        finally:
+            shutil.rmtree(catalog_dir)
+
+    def test_hybrid_requires_inverted_index(self):
+        """Test hybrid search on a catalog built without hybrid=True is rejected"""
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+        with self.assertRaises(ValueError):
+            catalog_mgr.search_products_hybrid("laptop")
+        with self.assertRaises(ValueError):
+            self.catalog_mgr.search_products_hybrid("laptop", fusion="max")
+
+
+class TestFaissTombstoneCompaction(unittest.TestCase):
+    """Integration tests for tombstoned deletes and background compaction"""
+
+    QUERIES = ["wireless headphones", "durable laptop", "classic watch", "budget water bottle"]
+    CONFIGS = [{}, {"use_id_map": False}, {"index_type": "ivf", "nlist": 8, "nprobe": 8},
+               {"index_type": "hnsw", "hnsw_m": 16, "ef_search": 1000}, {"n_shards": 3}]
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data_dir = tempfile.mkdtemp()
+        cls.csv_path = os.path.join(cls.data_dir, "catalog.csv")
+        write_catalog(cls.csv_path, 1000, seed=5)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.data_dir)
+
+    def _create(self, **kwargs) -> FaissCatalogManager:
+        catalog_mgr = FaissCatalogManager(dim=16, verbose=False, **kwargs)
+        catalog_mgr.create_catalog_from_csv(self.csv_path)
+        return catalog_mgr
+
+    def _assert_matches_brute_force(self, catalog_mgr):
+        product_ids = list(catalog_mgr.documents.keys())
+        vectors = np.array([catalog_mgr.get_vector(pid) for pid in product_ids])
+        for query in self.QUERIES:
+            distances = ((vectors - catalog_mgr._encode(query)) ** 2).sum(axis=1)
+            expected = np.sort(distances)[:10]
+            results = catalog_mgr.search_products(query, n_results=10)
+            self.assertEqual(len({r['id'] for r in results}), 10)
+            # Distances, so equidistant duplicates may come back in either order
+            np.testing.assert_allclose([r['distance'] for r in results], expected, atol=2e-3)
+
+    def test_bulk_delete_compacts_in_background(self):
+        """A discontinued product line is tombstoned, then compacted out without changing results"""
+        for config in self.CONFIGS:
+            with self.subTest(config=config):
+                catalog_mgr = self._create(**config)
+                discontinued = [pid for pid, meta in catalog_mgr.metadatas.items()
+                                if meta['category'] in ("Laptop", "Smartphone")]
+
+                for product_id in discontinued:
+                    self.assertTrue(catalog_mgr.delete_product(product_id))
+                info = catalog_mgr.compaction_info()
+                self.assertTrue(info["compacting"] or info["compactions"] > 0)
+                self._assert_matches_brute_force(catalog_mgr)
+
+                catalog_mgr.compact()
+                self.assertEqual(catalog_mgr.index.ntotal, 1000 - len(discontinued))
+                self.assertEqual(catalog_mgr.compaction_info()["tombstones"], 0)
+                self._assert_matches_brute_force(catalog_mgr)
+                results = catalog_mgr.search_products("laptop", n_results=5, filters={"category": "Laptop"})
+                self.assertEqual(results, [])
+
+    def test_writes_during_compaction_are_replayed(self):
+        """Adds, updates and deletes made while the compacted index is built end up in it"""
+        for config in self.CONFIGS:
+            with self.subTest(config=config):
+                catalog_mgr = self._create(compaction_threshold=None, **config)
+                product_ids = list(catalog_mgr.documents.keys())
+                for product_id in product_ids[:300]:
+                    catalog_mgr.delete_product(product_id)
+                self.assertEqual(catalog_mgr.compaction_info()["compactions"], 0)
+
+                catalog_mgr.compact(wait=False)
+                catalog_mgr.add_product({
+                    'product_id': 'prod_new', 'name': 'Dell Laptop Blue', 'description': 'Business laptop',
+                    'category': 'Laptop', 'price': '899.00', 'in_stock': 'True'})
+                catalog_mgr.update_product(product_ids[400], new_description="Rugged laptop for field work")
+                catalog_mgr.delete_product(product_ids[500])
+                catalog_mgr.compact()
+
+                self.assertEqual(catalog_mgr.get_product_count(), 700)
+                self.assertEqual(catalog_mgr.index.ntotal, 700)
+                self._assert_matches_brute_force(catalog_mgr)
+                results = catalog_mgr.search_products("rugged laptop field work", n_results=1)
+                self.assertEqual(results[0]['id'], product_ids[400])
+
+    def test_close_during_compaction(self):
+        """close() waits out a running compaction, which publishes without starting another; writes then fail"""
+        catalog_mgr = self._create(compaction_threshold=None, n_shards=3)
+        product_ids = list(catalog_mgr.documents.keys())
+        for product_id in product_ids[:300]:
+            catalog_mgr.delete_product(product_id)
+
+        building, release = threading.Event(), threading.Event()
+        empty_index = catalog_mgr._versions.empty_index
+
+        def blocked_empty_index(*args):
+            building.set()
+            release.wait(10)
+            return empty_index(*args)
+
+        with mock.patch.object(catalog_mgr._versions, "empty_index", side_effect=blocked_empty_index):
+            catalog_mgr.compact(wait=False)
+            self.assertTrue(building.wait(10))
+            future = catalog_mgr._versions.compaction
+            # Enough tombstones for the publish to want another compaction
+            catalog_mgr.compaction_threshold = 0.1
+            for product_id in product_ids[300:400]:
+                catalog_mgr.delete_product(product_id)
+            closer = threading.Thread(target=catalog_mgr.close)
+            closer.start()
+            while not catalog_mgr._versions.closed:
+                closer.join(0.01)
+            release.set()
+            closer.join(10)
+
+        self.assertFalse(closer.is_alive())
+        future.result()
+        info = catalog_mgr.compaction_info()
+        self.assertEqual((info["compactions"], info["compacting"], info["tombstones"]), (1, False, 100))
+        self.assertEqual(catalog_mgr.index.ntotal, 700)
+        for write in (lambda: catalog_mgr.delete_product(product_ids[600]),
+                      lambda: catalog_mgr.update_product(product_ids[600], new_price=1.0),
+                      lambda: catalog_mgr.add_product({'product_id': 'prod_new'}),
+                      catalog_mgr.compact):
+            with self.assertRaisesRegex(ValueError, "closed"):
+                write()
+        self.assertEqual(catalog_mgr.get_product_count(), 600)
+
+    def test_tombstones_survive_save_and_load(self):
+        """A loaded catalog keeps its tombstones and compacts from its own trained quantizer"""
+        catalog_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, catalog_dir)
+        for config in ({"index_type": "ivf", "nlist": 8, "nprobe": 8}, {"compression": "sq8", "rerank_factor": 4}):
+            with self.subTest(config=config):
+                catalog_mgr = self._create(compaction_threshold=None, **config)
+                for product_id in list(catalog_mgr.documents.keys())[::3]:
+                    catalog_mgr.delete_product(product_id)
+                catalog_mgr.save(catalog_dir)
+                expected = catalog_mgr.search_products_batch(self.QUERIES, n_results=10)
+
+                loaded = FaissCatalogManager.load(catalog_dir, mmap=True, verbose=False)
+                self.assertEqual(loaded.compaction_info()["tombstones"], 334)
+                self.assertEqual(loaded.search_products_batch(self.QUERIES, n_results=10), expected)
+                loaded.compact()
+                self.assertEqual(loaded.index.ntotal, 666)
+                self.assertEqual(loaded.search_products_batch(self.QUERIES, n_results=10), expected)
+
+
+class TestFaissConcurrentAccess(unittest.TestCase):
+    """Stress tests for searches running while updates stream in"""
+
+    QUERIES = ["wireless headphones", "durable laptop", "classic watch", "budget water bottle"]
+    CONFIGS = [{"hybrid": True}, {"use_id_map": False}, {"index_type": "ivf", "nlist": 8, "nprobe": 8},
+               {"compression": "sq8", "rerank_factor": 2}, {"n_shards": 3}]
+    N_PRODUCTS = 1000
+    N_UPDATES = 400
+    N_SEARCHERS = 4
+
+    @classmethod
+    def setUpClass(cls):
+        cls.data_dir = tempfile.mkdtemp()
+        cls.csv_path = os.path.join(cls.data_dir, "catalog.csv")
+        write_catalog(cls.csv_path, cls.N_PRODUCTS, seed=7)
+
+    @classmethod
+    def tearDownClass(cls):
+        shutil.rmtree(cls.data_dir)
+
+    def _check_results(self, results, product_ids):
+        """Every product exactly once, each with the price its document was written with"""
+        self.assertEqual(sorted(r['id'] for r in results), product_ids)
+        for r in results:
+            if r['snippet'].startswith("Revision"):
+                self.assertEqual(r['price'], float(r['snippet'].split()[1]))
+
+    def test_searches_see_consistent_snapshots_during_updates(self):
+        """Searches return complete, untorn results while a writer updates and compaction republishes"""
+        for config in self.CONFIGS:
+            with self.subTest(config=config):
+                # Small limits so compactions are published while searches run
+                catalog_mgr = FaissCatalogManager(dim=16, verbose=False, delta_size=32, compaction_threshold=0.05,
+                                                  **config)
+                catalog_mgr.create_catalog_from_csv(self.csv_path)
+                product_ids = sorted(catalog_mgr.documents.keys())
+                laptops = {"category": "Laptop"}
+                n_laptops = len(catalog_mgr.search_products("laptop", n_results=self.N_PRODUCTS, filters=laptops))
+                writer_done = threading.Event()
+                errors, searches = [], []
+
+                def write():
+                    try:
+                        rng = np.random.default_rng(0)
+                        for revision in range(self.N_UPDATES):
+                            product_id = product_ids[rng.integers(len(product_ids))]
+                            # Price and description change together, a search must never see one without the other
+                            self.assertTrue(catalog_mgr.update_product(
+                                product_id, new_price=float(revision),
+                                new_description=f"Revision {revision} of {product_id}"))
+                    except BaseException as e:
+                        errors.append(e)
+                    finally:
+                        writer_done.set()
+
+                def search(worker):
+                    try:
+                        n = 0
+                        while not writer_done.is_set() or n < 2:
+                            query = self.QUERIES[(worker + n) % len(self.QUERIES)]
+                            self._check_results(catalog_mgr.search_products(query, n_results=self.N_PRODUCTS),
+                                                product_ids)
+                            for results in catalog_mgr.search_products_batch(self.QUERIES, n_results=5):
+                                self.assertEqual(len({r['id'] for r in results}), 5)
+                            filtered = catalog_mgr.search_products(query, n_results=self.N_PRODUCTS, filters=laptops)
+                            self.assertEqual(len(filtered), n_laptops)
+                            self.assertEqual(len({r['id'] for r in filtered}), n_laptops)
+                            if config.get("hybrid"):
+                                hybrid = catalog_mgr.search_products_hybrid(query, n_results=20)
+                                self.assertEqual(len({r['id'] for r in hybrid}), len(hybrid))
+                            n += 1
+                        searches.append(n)
+                    except BaseException as e:
+                        errors.append(e)
+
+                threads = [threading.Thread(target=write)] + \
+                          [threading.Thread(target=search, args=(worker,)) for worker in range(self.N_SEARCHERS)]
+                for thread in threads:
+                    thread.start()
+                for thread in threads:
+                    thread.join()
+
+                if errors:
+                    raise errors[0]
+                self.assertEqual(len(searches), self.N_SEARCHERS)
+                self.assertGreater(catalog_mgr.compaction_info()["compactions"], 0)
+                catalog_mgr.compact()
+                info = catalog_mgr.compaction_info()
+                self.assertEqual((info["tombstones"], info["delta_rows"]), (0, 0))
+                self.assertEqual(catalog_mgr.index.ntotal, self.N_PRODUCTS)
+                self._check_results(catalog_mgr.search_products("laptop", n_results=self.N_PRODUCTS),
+                                    product_ids)
+
+
+class TestFaissCatalogPersistence(unittest.TestCase):
+    """Integration tests for save() / load()"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_csv_file = write_test_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.temp_csv_file.name)
+
+    def setUp(self):
+        self.catalog_dir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.catalog_dir)
+
+    def _search_ids(self, catalog_mgr, filters=None):
+        return [[r['id'] for r in results] for results in
+                catalog_mgr.search_products_batch(["laptop", "headphones with bass", "coffee"],
+                                                  n_results=4, filters=filters)]
+
+    def test_save_and_load_round_trip(self):
+        configs = [{}, {"use_id_map": False}, {"index_type": "ivf", "nlist": 2, "nprobe": 2},
+                   {"index_type": "hnsw", "hnsw_m": 4}, {"compression": "sq8", "rerank_factor": 2},
+                   {"n_shards": 3}]
+        for config in configs:
+            for mmap in (True, False):
+                with self.subTest(config=config, mmap=mmap):
+                    catalog_mgr = FaissCatalogManager(dim=6, verbose=False, **config)
+                    catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+                    catalog_mgr.update_product("prod_001", new_price=999.0,
+                                               new_description="Rugged laptop for field work")
+                    catalog_mgr.delete_product("prod_004")
+                    catalog_mgr.save(self.catalog_dir)
+
+                    loaded = FaissCatalogManager.load(self.catalog_dir, mmap=mmap, verbose=False)
+
+                    self.assertEqual(loaded.get_product_count(), 7)
+                    self.assertEqual(loaded.metadatas, catalog_mgr.metadatas)
+                    self.assertEqual(loaded.documents, catalog_mgr.documents)
+                    self.assertEqual(self._search_ids(loaded), self._search_ids(catalog_mgr))
+                    self.assertEqual(self._search_ids(loaded, {"category": "Laptop"}),
+                                     self._search_ids(catalog_mgr, {"category": "Laptop"}))
+
+    def test_loaded_mmap_catalog_accepts_writes(self):
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False)
+        catalog_mgr.create_catalog_from_csv(self.temp_csv_file.name)
+        catalog_mgr.save(self.catalog_dir)
+
+        loaded = FaissCatalogManager.load(self.catalog_dir, mmap=True, verbose=False)
+        self.assertIsInstance(loaded.columns.price, np.memmap)
+
+        self.assertTrue(loaded.update_product("prod_002", new_price=1.0))
+        self.assertTrue(loaded.delete_product("prod_003"))
+        self.assertTrue(loaded.add_product({
+            'product_id': 'prod_009', 'name': 'Dell Laptop Blue', 'description': 'Business laptop',
+            'category': 'Laptop', 'price': '899.00', 'in_stock': 'True'}))
+
+        self.assertEqual(loaded.get_product_count(), 8)
+        results = loaded.search_products("laptop", n_results=3, filters={"price": {"$lt": 5.0}})
+        self.assertEqual([r['id'] for r in results], ['prod_002'])
+        # The saved catalog itself is untouched
+        reloaded = FaissCatalogManager.load(self.catalog_dir, verbose=False)
+        self.assertEqual(reloaded.get_product_count(), 8)
+        self.assertEqual(reloaded.metadatas['prod_002']['price'], 299.99)
+
+
+class TestFaissStreamingIngestion(unittest.TestCase):
+    """Integration tests for create_catalog_from_csv_streaming()"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_csv_file = write_test_csv()
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.temp_csv_file.name)
+
+    def _create(self, **kwargs):
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False, **kwargs)
+        catalog_mgr.create_catalog_from_csv_streaming(self.temp_csv_file.name, chunk_size=3)
+        return catalog_mgr
+
+    def test_streaming_create_matches_in_memory_catalog(self):
+        """Chunked ingestion loads every row with the same metadata and searches sensibly"""
+        # Arrange
+        in_memory = FaissCatalogManager(dim=6, verbose=False)
+        in_memory.create_catalog_from_csv(self.temp_csv_file.name)
+
+        # Act
+        streamed = self._create()
+
+        # Assert
+        self.assertEqual(streamed.get_product_count(), 8)
+        self.assertEqual(streamed.metadatas, in_memory.metadatas)
+        self.assertEqual(streamed.documents, in_memory.documents)
+        self.assertEqual(streamed.vectorizer.n_documents, 8)
+        queries = ["laptop", "wireless headphones with deep bass"]
+        np.testing.assert_allclose(streamed._encode_batch(queries),
+                                   streamed.svd.transform(streamed.vectorizer.transform(queries)),
+                                   rtol=1e-5, atol=1e-6)
+        results = streamed.search_products("laptop", n_results=3, filters={"category": "Laptop"})
+        self.assertEqual({r['id'] for r in results}, {'prod_001', 'prod_004', 'prod_006'})
+
+    def test_streaming_catalog_supports_writes_and_persistence(self):
+        """Streamed catalogs accept CRUD and round-trip through save()/load()"""
+        for config in ({}, {"index_type": "ivf", "nlist": 2, "nprobe": 2}):
+            with self.subTest(config=config):
+                catalog_mgr = self._create(**config)
+                self.assertTrue(catalog_mgr.update_product("prod_002", new_price=1.0))
+                self.assertTrue(catalog_mgr.delete_product("prod_004"))
+                results = catalog_mgr.search_products("laptop", n_results=3, filters={"price": {"$lt": 5.0}})
+                self.assertEqual([r['id'] for r in results], ['prod_002'])
+
+                catalog_dir = tempfile.mkdtemp()
+                try:
+                    catalog_mgr.save(catalog_dir)
+                    loaded = FaissCatalogManager.load(catalog_dir, verbose=False)
+                finally:
+                    shutil.rmtree(catalog_dir)
+                self.assertEqual(loaded.get_product_count(), 7)
+                self.assertEqual(loaded.search_products("headphones bass", n_results=4),
+                                 catalog_mgr.search_products("headphones bass", n_results=4))
+
+
+class TestFaissColumnarIngestion(unittest.TestCase):
+    """Integration tests for creating catalogs from Parquet and Arrow input"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.temp_csv_file = write_test_csv()
+        cls.table = pa_csv.read_csv(cls.temp_csv_file.name)
+        cls.data_dir = tempfile.mkdtemp()
+        cls.parquet_path = os.path.join(cls.data_dir, "catalog.parquet")
+        pq.write_table(cls.table, cls.parquet_path)
+        cls.arrow_path = os.path.join(cls.data_dir, "catalog.arrow")
+        feather.write_feather(cls.table, cls.arrow_path)
+        cls.from_csv = FaissCatalogManager(dim=6, verbose=False)
+        cls.from_csv.create_catalog_from_csv(cls.temp_csv_file.name)
+
+    @classmethod
+    def tearDownClass(cls):
+        os.unlink(cls.temp_csv_file.name)
+        shutil.rmtree(cls.data_dir)
+
+    def test_columnar_sources_match_csv(self):
+        """Parquet, Arrow IPC and in-memory tables load the same catalog as the CSV"""
+        for source in (self.parquet_path, self.arrow_path, self.table):
+            with self.subTest(source=type(source).__name__ if not isinstance(source, str) else source[-7:]):
+                # Act
+                catalog_mgr = FaissCatalogManager(dim=6, verbose=False)
+                catalog_mgr.create_catalog_from_csv(source)
+
+                # Assert
+                self.assertEqual(catalog_mgr.metadatas, self.from_csv.metadatas)
+                self.assertEqual(catalog_mgr.documents, self.from_csv.documents)
+                self.assertEqual(catalog_mgr.search_products("gaming laptop", n_results=3),
+                                 self.from_csv.search_products("gaming laptop", n_results=3))
+
+    def test_metadata_is_typed_from_columns(self):
+        """'True'/'False' and prices become bools and floats without per-row parsing"""
+        # Act
+        metadata = self.from_csv.metadatas['prod_003']
+
+        # Assert
+        self.assertIs(metadata['in_stock'], False)
+        self.assertEqual(metadata['price'], 199.99)
+        self.assertEqual(self.from_csv.documents['prod_005'],
+                         "Sennheiser Headphones Black. Wireless over-ear headphones with deep bass "
+                         "Category: Headphones. Price: $349.0.")
+
+    def test_streaming_reads_parquet_in_batches(self):
+        """Streaming ingestion reads Parquet one chunk at a time, like CSV"""
+        # Act
+        catalog_mgr = FaissCatalogManager(dim=6, verbose=False)
+        catalog_mgr.create_catalog_from_csv_streaming(self.parquet_path, chunk_size=3)
+
+        # Assert
+        self.assertEqual(catalog_mgr.get_product_count(), 8)
+        self.assertEqual(catalog_mgr.metadatas, self.from_csv.metadatas)
+
+
+if __name__ == '__main__':
+    # Run tests with verbose output
+    unittest.main(verbosity=2)
@@ -1,6 +1,13 @@
 import os
-import pandas as pd
+from catalog_filters import to_milvus_expr
+from catalog_reader import CatalogSource, read_catalog_batches
+from catalog_sync import CatalogSync, remove_manifest
+from catalog_updates import plan_update, product_changes
 from dotenv import load_dotenv
+from embedding_cache import cache_from_env
+from embedding_client import EmbeddingClient, openai_embed_batch
+from ingest_pipeline import Stage, format_pipeline_stats, run_pipeline
+from lazy_client import LazyClient
 from openai import OpenAI
 from pymilvus import MilvusClient, FieldSchema, CollectionSchema, DataType, Collection
 
@@ -10,15 +17,45 @@ MILVUS_URL = os.getenv("MILVUS_URL")  # e.g., "https://in01-xxxx.api.gcp-us-west
 MILVUS_TOKEN = os.getenv("MILVUS_TOKEN")  # cloud token
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 
-client = OpenAI(api_key=OPENAI_API_KEY)
+def create_embedder() -> EmbeddingClient:
+    # Batched, concurrent, rate-limited embedding requests; texts embedded before come from the shared cache
+    return EmbeddingClient(openai_embed_batch(OpenAI(api_key=OPENAI_API_KEY), "text-embedding-3-small"),
+                           max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+                           requests_per_minute=float(os.getenv("EMBEDDING_RPM", "3000")),
+                           tokens_per_minute=float(os.getenv("EMBEDDING_TPM", "1000000")),
+                           cache=cache_from_env())
+
+
+def create_milvus_client() -> MilvusClient:
+    return MilvusClient(uri=MILVUS_URL,
+                        token=MILVUS_TOKEN
+                        )
+
+
+# Clients are created on first use, so importing this module makes no connection
+embedder = LazyClient(create_embedder, close=lambda client: client.close(close_cache=True), name="embedder")
+milvus_client = LazyClient(create_milvus_client, name="milvus")
+
+
+def connect():
+    """Create the clients now instead of on first use, e.g. to fail fast on bad credentials"""
+    embedder.connect()
+    milvus_client.connect()
+
+
+def close():
+    """Release the clients; they are created again on next use"""
+    milvus_client.close()
+    embedder.close()
 
-# Connect to Milvus
-milvus_client = MilvusClient(uri=MILVUS_URL,
-                             token=MILVUS_TOKEN
-                             )
 
 COLLECTION_NAME = "product_catalog"
 DIM = 1536  # OpenAI embedding dimension
+INSERT_BATCH_SIZE = 1000  # products per insert request
+EMBEDDED_FIELDS = ["description"]  # the fields the vector is computed from
+INSERT_WORKERS = int(os.getenv("INSERT_WORKERS", "2"))  # insert requests in flight
+# Row hashes of the products loaded so far, for incremental sync
+SYNC_MANIFEST_PATH = os.getenv("SYNC_MANIFEST_PATH", f"data/{COLLECTION_NAME}.manifest.arrow")
 
 # Define schema
 fields = [
@@ -34,8 +71,7 @@ schema = CollectionSchema(fields, description="Product catalog collection")
 
 def generate_embedding(text: str):
     """Generate embedding using OpenAI"""
-    emb = client.embeddings.create(model="text-embedding-3-small", input=text)
-    return emb.data[0].embedding
+    return embedder.embed_one(text)
 
 
 # Create collection
@@ -60,25 +96,46 @@ def create_schema_product():
 
 
 # Create
-def insert_products_from_csv(file_path: str):
-    df = pd.read_csv(file_path)
-    
-    records = []
-    for _, row in df.iterrows():
-        embedding = generate_embedding(row["description"])
-        records.append({
-            "product_id": str(row["product_id"]),
-            "name": row["name"],
-            "description": row["description"],
-            "category": row["category"],
-            "price": float(row["price"]),
-            "in_stock": bool(row["in_stock"]),
-            "vector": embedding
-        })
-
-    milvus_client.insert(collection_name=COLLECTION_NAME, data=records)
+def insert_products_from_csv(file_path: CatalogSource, sync: bool = False):
+    """
+    Insert a CSV, Parquet or Arrow catalog as a read -> embed -> insert pipeline:
+    the stages run concurrently on typed Arrow batches, with bounded queues in
+    between, so memory stays flat whatever the catalog size.
+
+    With sync=True the catalog is diffed against the row hashes of the last
+    sync (SYNC_MANIFEST_PATH): only new and changed products are embedded and
+    upserted, and products missing from the file are deleted
+    """
+    def embed_records(batch):
+        # Arrow has already typed price/in_stock, so its rows are ready-made records
+        records = batch.to_pylist()
+        # One call per insert batch, sent as concurrent batched requests
+        vectors = embedder.embed([record["description"] for record in records])
+        for record, vector in zip(records, vectors):
+            record["vector"] = vector
+        return records
+
+    def insert_records(records):
+        # Synced products may already exist, and Milvus insert does not replace rows
+        write = milvus_client.upsert if sync else milvus_client.insert
+        write(collection_name=COLLECTION_NAME, data=records)
+
+    catalog_sync = CatalogSync(SYNC_MANIFEST_PATH) if sync else None
+    batches = catalog_sync.changed_batches(file_path, batch_size=INSERT_BATCH_SIZE) if sync \
+        else read_catalog_batches(file_path, batch_size=INSERT_BATCH_SIZE)
+    stats = run_pipeline(batches, [Stage("embed", embed_records),
+                                   Stage("insert", insert_records, workers=INSERT_WORKERS)])
+    if sync:
+        deleted = catalog_sync.deleted_ids()
+        for start in range(0, len(deleted), INSERT_BATCH_SIZE):
+            milvus_client.delete(collection_name=COLLECTION_NAME, ids=deleted[start:start + INSERT_BATCH_SIZE])
     milvus_client.flush(collection_name=COLLECTION_NAME)
-    print(f"Inserted {len(df)} products from {file_path}")
+    if sync:
+        catalog_sync.commit()
+        print(f"Synced {file_path}: {catalog_sync.stats()}")
+    print(f"Inserted {stats['rows']} products from {file_path}, "
+          f"embedding cache hit rate {embedder.stats().get('cache_hit_rate', 0.0):.0%}")
+    print(format_pipeline_stats(stats))
 
 # find by product id
 def find_one(product_id: str) -> dict:
@@ -93,12 +150,18 @@ def find_one(product_id: str) -> dict:
         return {}
 
 # search
-def search_product(query: str, top_k: int = 3):
+def search_product(query: str, top_k: int = 3, filters: dict = None):
+    """
+    Vector search; filters (shared filter language, see catalog_filters) are
+    compiled to a Milvus boolean expression and applied by Milvus during the
+    search, so top_k matching products come back
+    """
     q_emb = generate_embedding(query)
     results = milvus_client.search(
         collection_name= COLLECTION_NAME,
         data=[q_emb],
         anns_field="vector",
+        filter=to_milvus_expr(filters) if filters else "",
         search_params={"metric_type": "COSINE", "params": {"nprobe": 10}},
         limit=top_k,
         output_fields=["product_id", "name", "description", "category", "price", "in_stock"]
@@ -110,22 +173,25 @@ def search_product(query: str, top_k: int = 3):
               f"In Stock: {res.entity.get('in_stock')} | Score: {res.score:.4f}")
 
 # update
-def update_product(product_id: str, new_description: str):
+def update_product(product_id: str, new_description: str = None, new_price: float = None, in_stock: bool = None):
+    """
+    Partial update: only the changed fields are upserted (partial_update), and
+    the vector is re-embedded only when the description changed, so price and
+    stock updates make no embedding call and send no vector
+    """
     old_product = find_one(product_id=product_id)
-    embedding = generate_embedding(new_description)
-    print(f"sss {old_product['product_id']}")
-    new_product={
-            "product_id": old_product['product_id'],
-            "name": old_product['name'],
-            "description": new_description,
-            "category": old_product['category'],
-            "price": old_product['price'],
-            "in_stock": old_product['in_stock'],
-            "vector": embedding
-        }
-    milvus_client.upsert(collection_name=COLLECTION_NAME, data=new_product)
+    if not old_product:
+        return
+    plan = plan_update(old_product, product_changes(new_description, new_price, in_stock), EMBEDDED_FIELDS)
+    if plan.noop:
+        print(f"Product {product_id} unchanged.")
+        return
+    row = {"product_id": product_id, **plan.changes}
+    if plan.reembed:
+        row["vector"] = generate_embedding(plan.changes["description"])
+    milvus_client.upsert(collection_name=COLLECTION_NAME, data=[row], partial_update=True)
     milvus_client.flush(collection_name=COLLECTION_NAME)
-    print(f"Product {product_id} updated.")
+    print(f"Product {product_id} updated{'' if plan.reembed else ' (metadata only)'}.")
 
 # delete
 def delete_product(product_id: str):
@@ -138,6 +204,8 @@ def delete_all_products():
     print(f"Collection {COLLECTION_NAME} index name vector dropped.")
     milvus_client.drop_collection(collection_name=COLLECTION_NAME)
     print(f"Collection {COLLECTION_NAME} dropped.")
+    # The next sync has to load everything again
+    remove_manifest(SYNC_MANIFEST_PATH)
     
 
 
@@ -147,21 +215,31 @@ if __name__ == "__main__":
     # delete collection
     #delete_all_products()
 
+    # connect the clients
+    connect()
+
     # create collection
     create_schema_product()
 
     # Insert data from CSV
     insert_products_from_csv("data/product_catalog.csv")
+    # Nightly feed: only new, changed and removed products are written
+    #insert_products_from_csv("data/product_catalog.csv", sync=True)
 
     # Search example
     #search_product("blue smartphone")
     #search_product("HarperCollins")
+    #search_product("powerful laptop", filters={"category": "Laptop", "price": {"$lte": 1000.0}})
 
     # Update example
     #update_product("prod_002", "A premium green Sennheiser headphone, perfect for music lovers.")
+    #update_product("prod_002", new_price=129.99, in_stock=False)  # metadata only, no embedding
 
     # Delete example
     # delete_product("prod_001")
 
     # find example
     find_one("prod_002")
+
+    # release the clients
+    close()
@@ -0,0 +1,56 @@
+import importlib
+import importlib.util
+import os
+import socket
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+DEPENDENCIES = ("pymilvus", "openai", "dotenv", "lazy_client")
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError("network access while importing src.crud_operations")
+
+
+@unittest.skipUnless(all(importlib.util.find_spec(name) for name in DEPENDENCIES), "needs the project's dependencies")
+class TestImport(unittest.TestCase):
+    """Importing the CRUD module must cost nothing: no connection, no thread, no cache file"""
+
+    def setUp(self):
+        cache_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(cache_dir.cleanup)
+        self.cache_path = os.path.join(cache_dir.name, "embeddings.cache")
+        env = mock.patch.dict(os.environ, {"EMBEDDING_CACHE_PATH": self.cache_path})
+        env.start()
+        self.addCleanup(env.stop)
+
+    def import_module(self):
+        sys.modules.pop("src.crud_operations", None)
+        with mock.patch.object(socket.socket, "connect", no_network), \
+                mock.patch.object(socket, "getaddrinfo", no_network):
+            module = importlib.import_module("src.crud_operations")
+        self.addCleanup(module.close)
+        return module
+
+    def test_1_import_makes_no_connection(self):
+        module = self.import_module()
+        self.assertFalse(module.milvus_client.connected)
+        self.assertFalse(module.embedder.connected)
+        self.assertFalse(os.path.exists(self.cache_path))
+
+    def test_2_clients_are_created_once_and_released_by_close(self):
+        module = self.import_module()
+        with mock.patch.object(module, "MilvusClient") as milvus_client:
+            module.connect()
+            module.milvus_client.list_collections()
+            module.milvus_client.list_collections()
+            self.assertEqual(milvus_client.call_count, 1)
+            module.close()
+            milvus_client.return_value.close.assert_called_once()
+            self.assertFalse(module.milvus_client.connected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,8 +1,18 @@
+import json
 import os
-import pandas as pd
+import threading
+import pyarrow.compute as pa_compute
+from catalog_filters import to_pinecone_filter
+from catalog_reader import CatalogSource, read_catalog_batches
+from catalog_sync import CatalogSync, remove_manifest
+from catalog_updates import plan_update, product_changes
 from openai import OpenAI
 from pinecone import Pinecone, ServerlessSpec
 from dotenv import load_dotenv
+from embedding_cache import cache_from_env
+from embedding_client import EmbeddingClient, openai_embed_batch
+from ingest_pipeline import Stage, format_pipeline_stats, run_pipeline
+from lazy_client import LazyClient
 
 # 1. Setup Pinecone & OpenAI
 load_dotenv()
@@ -11,113 +21,243 @@ PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
 PINECONE_INDEX_NAME = "products-catalog-indx"
 PINECONE_CLOUD_NAME = os.getenv("PINECONE_CLOUD_NAME")
 PINECONE_CLOUD_REGION = os.getenv("PINECONE_CLOUD_REGION")
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "100"))  # vectors per upsert request, at most
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "2"))  # upsert requests in flight
+# Pinecone's limits per upsert request
+MAX_UPSERT_VECTORS = 1000
+MAX_UPSERT_BYTES = 2 * 1024 * 1024
+# JSON characters per vector value, e.g. "-0.012345678901234567, ", to size requests without serializing them
+JSON_BYTES_PER_VALUE = 24
+DELETE_BATCH_SIZE = 1000  # ids per delete request, Pinecone's limit
+CATALOG_PATH = "data/product_catalog.csv"  # CSV, Parquet or Arrow
+# Row hashes of the products loaded so far, for incremental sync; one manifest per namespace
+SYNC_MANIFEST_PATH = os.getenv("SYNC_MANIFEST_PATH", f"data/{PINECONE_INDEX_NAME}.manifest.arrow")
+METADATA_FIELDS = ["name", "description", "category", "price", "in_stock"]
+EMBEDDED_FIELDS = ["name", "description"]  # the fields the vector is computed from
 
-# Initialize OpenAI client
-client = OpenAI(api_key=OPENAI_API_KEY)
+# Client factories
+def create_embedder() -> EmbeddingClient:
+    # Batched, concurrent, rate-limited embedding requests; texts embedded before come from the shared cache
+    return EmbeddingClient(openai_embed_batch(OpenAI(api_key=OPENAI_API_KEY), "text-embedding-3-small"),
+                           max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+                           requests_per_minute=float(os.getenv("EMBEDDING_RPM", "3000")),
+                           tokens_per_minute=float(os.getenv("EMBEDDING_TPM", "1000000")),
+                           cache=cache_from_env())
 
-# Initialize Pinecone client.
-# Note: on HTTP-401 error or unauthorised error, copy/paste api key directly here.
-pc = Pinecone(api_key=PINECONE_API_KEY)
+def create_pinecone_client() -> Pinecone:
+    # Note: on HTTP-401 error or unauthorised error, copy/paste api key directly here.
+    return Pinecone(api_key=PINECONE_API_KEY)
 
-# Create index (only if not exists)
-print("Available indexes:", pc.list_indexes().names())
+def open_index():
+    # Create index (only if not exists)
+    index_names = pc.list_indexes().names()
+    print("Available indexes:", index_names)
 
-if PINECONE_INDEX_NAME not in pc.list_indexes().names():
-    pc.create_index(
-        name=PINECONE_INDEX_NAME,
-        dimension=1536,   # depends on embedding model
-        metric="cosine",
-        spec=ServerlessSpec(
-            cloud=PINECONE_CLOUD_NAME,
-            region=PINECONE_CLOUD_REGION
+    if PINECONE_INDEX_NAME not in index_names:
+        pc.create_index(
+            name=PINECONE_INDEX_NAME,
+            dimension=1536,   # depends on embedding model
+            metric="cosine",
+            spec=ServerlessSpec(
+                cloud=PINECONE_CLOUD_NAME,
+                region=PINECONE_CLOUD_REGION
+            )
         )
-    )
+    return pc.Index(PINECONE_INDEX_NAME)
 
-index = pc.Index(PINECONE_INDEX_NAME)
+# Clients are created on first use, so importing this module makes no connection and creates no index
+embedder = LazyClient(create_embedder, close=lambda client: client.close(close_cache=True), name="embedder")
+pc = LazyClient(create_pinecone_client, name="pinecone")
+index = LazyClient(open_index, name=PINECONE_INDEX_NAME)
 
-# 2. Load Dataset
-df = pd.read_csv("data/product_catalog.csv")
+# Create the clients and the index now instead of on first use, e.g. to fail fast on bad credentials
+def connect():
+    embedder.connect()
+    index.connect()
+
+# Release the clients; they are created again on next use
+def close():
+    index.close()
+    pc.close()
+    embedder.close()
+
+# 2. Dataset (CSV, Parquet or Arrow) is streamed from CATALOG_PATH as typed Arrow batches
 
 # 3. Generate Embeddings
 def get_embedding(text: str):
-    response = client.embeddings.create(
-        model="text-embedding-3-small",
-        input=text
-    )
-    return response.data[0].embedding
+    return embedder.embed_one(text)
+
+# Namespaces: every operation takes namespace (one per tenant); None is the index's default namespace
+def sync_manifest_path(namespace: str = None) -> str:
+    if not namespace:
+        return SYNC_MANIFEST_PATH
+    directory, name = os.path.split(SYNC_MANIFEST_PATH)
+    return os.path.join(directory, f"{namespace}.{name}")
+
+def vector_bytes(vector: dict) -> int:
+    """Upper bound of the size of one vector in an upsert request"""
+    return (len(vector["id"]) + JSON_BYTES_PER_VALUE * len(vector["values"])
+            + len(json.dumps(vector["metadata"])) + 64)
+
+def upsert_requests(vectors, max_vectors: int = UPSERT_BATCH_SIZE, max_bytes: int = MAX_UPSERT_BYTES):
+    """Split vectors into upsert requests of at most max_vectors vectors and max_bytes bytes, in order"""
+    max_vectors = min(max_vectors, MAX_UPSERT_VECTORS)
+    request, request_bytes = [], 0
+    for vector in vectors:
+        size = vector_bytes(vector)
+        if request and (len(request) >= max_vectors or request_bytes + size > max_bytes):
+            yield request
+            request, request_bytes = [], 0
+        request.append(vector)
+        request_bytes += size
+    if request:
+        yield request
 
 # 4. CRUD Operations
 
 # Create / Insert
-def create_products(df):
-    vectors = []
-    for _, row in df.iterrows():
-        text = f"{row['name']} {row['description']}"
-        embedding = get_embedding(text)
-        vectors.append({
-            "id": row["product_id"],
-            "values": embedding,
-            "metadata": {
-                "name": row["name"],
-                "description": row["description"],
-                "category": row["category"],
-                "price": row["price"],
-                "in_stock": row["in_stock"]
-            }
-        })
-    index.upsert(vectors=vectors)
-    print("Products inserted into Pinecone")
+def embed_vectors(batch):
+    """The upsert vectors of a catalog batch: embedded name + description, and the metadata"""
+    texts = pa_compute.binary_join_element_wise(batch.column("name"), batch.column("description"), " ").to_pylist()
+    metadatas = batch.select(METADATA_FIELDS).to_pylist()
+    return [{"id": product_id, "values": values, "metadata": metadata}
+            for product_id, values, metadata in zip(batch.column("product_id").to_pylist(),
+                                                    embedder.embed(texts), metadatas)]
+
+def create_products(catalog: CatalogSource, sync: bool = False, namespace: str = None):
+    """
+    Upsert a catalog (path or Arrow table) into namespace as a read -> embed
+    -> upsert pipeline: the stages run concurrently with bounded queues in
+    between, so memory stays flat whatever the catalog size. Each embedded
+    batch is sent as upsert requests within Pinecone's request limits
+    (UPSERT_BATCH_SIZE vectors, 2 MB), from UPSERT_WORKERS threads.
+
+    With sync=True the catalog is diffed against the row hashes of the last
+    sync of namespace: only new and changed products are embedded and
+    upserted, and products missing from the catalog are deleted
+    """
+    requests, lock = {"requests": 0, "vectors": 0}, threading.Lock()
+
+    def upsert_vectors(vectors):
+        for request in upsert_requests(vectors):
+            index.upsert(vectors=request, namespace=namespace)
+            with lock:
+                requests["requests"] += 1
+                requests["vectors"] += len(request)
+
+    catalog_sync = CatalogSync(sync_manifest_path(namespace)) if sync else None
+    batches = catalog_sync.changed_batches(catalog, batch_size=UPSERT_BATCH_SIZE) if sync \
+        else read_catalog_batches(catalog, batch_size=UPSERT_BATCH_SIZE)
+    stats = run_pipeline(batches, [Stage("embed", embed_vectors),
+                                   Stage("upsert", upsert_vectors, workers=UPSERT_WORKERS)])
+    if sync:
+        deleted = catalog_sync.deleted_ids()
+        for start in range(0, len(deleted), DELETE_BATCH_SIZE):
+            index.delete(ids=deleted[start:start + DELETE_BATCH_SIZE], namespace=namespace)
+        catalog_sync.commit()
+        print(f"Synced catalog: {catalog_sync.stats()}")
+    print(f"Products inserted into Pinecone namespace {namespace or '(default)'}, "
+          f"embedding cache hit rate {embedder.stats().get('cache_hit_rate', 0.0):.0%}")
+    if requests["requests"]:
+        print(f"{requests['requests']} upsert requests of {requests['vectors'] / requests['requests']:.0f} vectors "
+              f"on average, {stats['stages']['upsert']['rows_per_second']:.0f} vectors/s")
+    print(format_pipeline_stats(stats))
+
+# Upsert throughput per batch size, into a scratch namespace that is deleted afterwards.
+# The catalog's vectors are held in memory, so benchmark on a sample (e.g. 10k rows)
+def benchmark_upsert(catalog: CatalogSource, batch_sizes=(25, 50, 100, 200, 500),
+                     namespace: str = "upsert-benchmark") -> dict:
+    # Embed once (the cache makes reruns free), so only the upserts are timed
+    vectors = [vector for batch in read_catalog_batches(catalog, batch_size=UPSERT_BATCH_SIZE)
+               for vector in embed_vectors(batch)]
+    vectors_per_second = {}
+    try:
+        for batch_size in batch_sizes:
+            stats = run_pipeline(upsert_requests(vectors, max_vectors=batch_size),
+                                 [Stage("upsert", lambda request: index.upsert(vectors=request, namespace=namespace),
+                                        workers=UPSERT_WORKERS)])
+            vectors_per_second[batch_size] = stats["rows_per_second"]
+            n_requests = stats["stages"]["upsert"]["batches"]
+            # Requests hold fewer vectors than batch_size when the 2 MB limit comes first
+            print(f"batch size {batch_size:4d}: {stats['rows_per_second']:8.0f} vectors/s "
+                  f"({n_requests} requests of {stats['rows'] / max(n_requests, 1):.0f} vectors, {UPSERT_WORKERS} in flight)")
+    finally:
+        index.delete(delete_all=True, namespace=namespace)
+    return vectors_per_second
 
 # Read / Query (Semantic Search)
-def search_products(query, top_k=2):
+# filters (shared filter language, see catalog_filters) become a Pinecone metadata filter applied by the query
+def search_products(query, top_k=2, filters=None, namespace=None):
     query_emb = get_embedding(query)
-    results = index.query(vector=query_emb, top_k=top_k, include_metadata=True)
+    results = index.query(vector=query_emb, top_k=top_k, include_metadata=True, namespace=namespace,
+                          filter=to_pinecone_filter(filters) if filters else None)
     return results
 
-# Update (re-insert with same id)
-def update_product(product_id, new_description):
-    results = index.fetch(ids=[product_id])
+# Update: metadata patch, plus new values only when the embedded text changed
+def update_product(product_id, new_description=None, new_price=None, in_stock=None, namespace=None):
+    results = index.fetch(ids=[product_id], namespace=namespace)
     if not results.vectors:
         print("Product not found")
         return
     metadata = results.vectors[product_id].metadata
-    metadata["description"] = new_description
-    embedding = get_embedding(metadata["name"] + " " + new_description)
-    index.upsert(vectors=[{
-        "id": product_id,
-        "values": embedding,
-        "metadata": metadata
-    }])
-    print(f"Product {product_id} updated")
+    plan = plan_update(metadata, product_changes(new_description, new_price, in_stock), EMBEDDED_FIELDS)
+    if plan.noop:
+        print(f"Product {product_id} unchanged")
+        return
+    if plan.reembed:
+        text = {**metadata, **plan.changes}
+        index.update(id=product_id, values=get_embedding(text["name"] + " " + text["description"]),
+                     set_metadata=plan.changes, namespace=namespace)
+    else:
+        # Price and stock feeds: no embedding call, no vector sent
+        index.update(id=product_id, set_metadata=plan.changes, namespace=namespace)
+    print(f"Product {product_id} updated{'' if plan.reembed else ' (metadata only)'}")
 
 # Delete
-def delete_product(product_id):
-    index.delete(ids=[product_id])
+def delete_product(product_id, namespace=None):
+    index.delete(ids=[product_id], namespace=namespace)
     print(f"Product {product_id} deleted")
 
 
-# Clean all data from index
-def clean_all():
-    index.delete(delete_all=True)
+# Clean all data from a namespace of the index
+def clean_all(namespace=None):
+    index.delete(delete_all=True, namespace=namespace)
     print(f"all deleted")
+    # The next sync has to load everything again
+    remove_manifest(sync_manifest_path(namespace))
 
 
 # 5. Example Usage
 if __name__ == "__main__":
+    # Connect the clients
+    connect()
+
     # Insert products
-    create_products(df)
+    create_products(CATALOG_PATH)
+    # Nightly feed: only new, changed and removed products are written
+    #create_products(CATALOG_PATH, sync=True)
+    # One namespace per tenant
+    #create_products("data/tenant_a_catalog.csv", namespace="tenant-a")
+    #search_products("red book", namespace="tenant-a")
+    # Upsert throughput per batch size
+    #benchmark_upsert(CATALOG_PATH)
 
     # Search
     print("\n Searching for 'red book':")
     res = search_products("red book")
     for match in res["matches"]:
         print(match["metadata"], "Score:", match["score"])
+    res = search_products("red book", filters={"category": "Book", "price": {"$lt": 50.0}})
 
     # Update
     update_product("prod_002", "An elegant Fossil watch suitable for parties and meetings.")
+    update_product("prod_002", new_price=89.99, in_stock=False)  # metadata only, no embedding
 
     # Delete
     delete_product("prod_001")
 
     # Delete all data
     clean_all()
+
+    # Release the clients
+    close()
@@ -0,0 +1,56 @@
+import importlib
+import importlib.util
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pyarrow as pa
+
+DEPENDENCIES = ("pinecone", "openai", "dotenv", "catalog_generator")
+
+
+@unittest.skipUnless(all(importlib.util.find_spec(name) for name in DEPENDENCIES), "needs the project's dependencies")
+class TestUpsertRequests(unittest.TestCase):
+    """Chunked upserts within Pinecone's request limits, and namespaces"""
+
+    @classmethod
+    def setUpClass(cls):
+        cls.crud = importlib.import_module("src.crud_operations")
+
+    def vector(self, i, dim=1536):
+        return {"id": f"prod_{i:03d}", "values": [0.0] * dim, "metadata": {"name": f"Product {i}"}}
+
+    def test_1_requests_stay_within_count_and_size_limits(self):
+        vectors = [self.vector(i) for i in range(250)]
+        requests = list(self.crud.upsert_requests(vectors, max_vectors=100))
+        self.assertEqual([vector["id"] for request in requests for vector in request], [v["id"] for v in vectors])
+        for request in requests:
+            self.assertLessEqual(sum(map(self.crud.vector_bytes, request)), self.crud.MAX_UPSERT_BYTES)
+        # ~37 KB per 1536-dimension vector, so 2 MB holds fewer than 100 of them
+        self.assertLess(max(map(len, requests)), 100)
+
+        small = [self.vector(i, dim=8) for i in range(2500)]
+        self.assertEqual([len(request) for request in self.crud.upsert_requests(small, max_vectors=5000)],
+                         [1000, 1000, 500])
+
+    def test_2_catalog_is_upserted_in_chunks_into_its_namespace(self):
+        from catalog_generator import generate_block
+        catalog = pa.table(generate_block(seed=1, block_no=0, n_rows=300))
+        index, embedder = mock.MagicMock(), mock.MagicMock()
+        embedder.embed.side_effect = lambda texts: [[0.0] * 1536 for _ in texts]
+        embedder.stats.return_value = {}
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.multiple(self.crud, index=index, embedder=embedder,
+                                    SYNC_MANIFEST_PATH=os.path.join(tmp, "index.manifest.arrow")):
+            self.crud.create_products(catalog, sync=True, namespace="tenant-a")
+            self.assertTrue(os.path.exists(os.path.join(tmp, "tenant-a.index.manifest.arrow")))
+
+        upserts = index.upsert.call_args_list
+        self.assertEqual({call.kwargs["namespace"] for call in upserts}, {"tenant-a"})
+        self.assertEqual(sum(len(call.kwargs["vectors"]) for call in upserts), 300)
+        self.assertTrue(all(len(call.kwargs["vectors"]) <= self.crud.UPSERT_BATCH_SIZE for call in upserts))
+
+
+if __name__ == "__main__":
+    unittest.main()
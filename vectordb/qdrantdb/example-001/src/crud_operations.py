@@ -1,9 +1,16 @@
 import os
-import pandas as pd
+from catalog_filters import to_qdrant_filter
+from catalog_reader import CatalogSource, read_catalog, read_catalog_batches
+from catalog_sync import CatalogSync, remove_manifest
+from catalog_updates import plan_update, product_changes
 from qdrant_client import QdrantClient
 from qdrant_client.http import models
 from openai import OpenAI
 from dotenv import load_dotenv
+from embedding_cache import cache_from_env
+from embedding_client import EmbeddingClient, openai_embed_batch
+from ingest_pipeline import Stage, format_pipeline_stats, run_pipeline
+from lazy_client import LazyClient
 import uuid
 
 # Load environment variables
@@ -15,20 +22,49 @@ QDRANT_URL = os.getenv("QDRANT_URL")
 QDRANT_API_KEY = os.getenv("QDRANT_API_KEY")
 
 COLLECTION_NAME = "products_catalog"
-
-# Initialize clients
-client = OpenAI(api_key=OPENAI_API_KEY)
-qdrant = QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=10.0)
+UPSERT_BATCH_SIZE = 256  # points per upsert request
+EMBEDDED_FIELDS = ["description"]  # the fields the vector is computed from
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "2"))  # upsert requests in flight
+# Row hashes of the products loaded so far, for incremental sync
+SYNC_MANIFEST_PATH = os.getenv("SYNC_MANIFEST_PATH", f"data/{COLLECTION_NAME}.manifest.arrow")
+# Payload indexes for the filterable fields, so filtered searches don't scan payloads
+PAYLOAD_INDEXES = {
+    "category": models.PayloadSchemaType.KEYWORD,
+    "price": models.PayloadSchemaType.FLOAT,
+    "in_stock": models.PayloadSchemaType.BOOL,
+}
+
+# Client factories
+def create_embedder() -> EmbeddingClient:
+    # Batched, concurrent, rate-limited embedding requests; texts embedded before come from the shared cache
+    return EmbeddingClient(openai_embed_batch(OpenAI(api_key=OPENAI_API_KEY), "text-embedding-3-small"),
+                           max_concurrency=int(os.getenv("EMBEDDING_CONCURRENCY", "4")),
+                           requests_per_minute=float(os.getenv("EMBEDDING_RPM", "3000")),
+                           tokens_per_minute=float(os.getenv("EMBEDDING_TPM", "1000000")),
+                           cache=cache_from_env())
+
+def create_qdrant_client() -> QdrantClient:
+    return QdrantClient(url=QDRANT_URL, api_key=QDRANT_API_KEY, timeout=10.0)
+
+# Clients are created on first use, so importing this module makes no connection
+embedder = LazyClient(create_embedder, close=lambda client: client.close(close_cache=True), name="embedder")
+qdrant = LazyClient(create_qdrant_client, name="qdrant")
+
+# Create the clients now instead of on first use, e.g. to fail fast on bad credentials
+def connect():
+    embedder.connect()
+    qdrant.connect()
+
+# Release the clients; they are created again on next use
+def close():
+    qdrant.close()
+    embedder.close()
 
 # Generate embedding
 def generate_embedding(text: str):
-    response = client.embeddings.create(
-        input=text,
-        model="text-embedding-3-small"
-    )
-    return response.data[0].embedding
+    return embedder.embed_one(text)
 
-# Ensure collection exists
+# Ensure collection and its payload indexes exist
 def init_collection():
     if not qdrant.collection_exists(COLLECTION_NAME):
         qdrant.create_collection(
@@ -38,59 +74,91 @@ def init_collection():
                 distance=models.Distance.COSINE,
             ),
         )
-
-# Load CSV
+    # Also for collections created before the indexes were added
+    indexed = qdrant.get_collection(COLLECTION_NAME).payload_schema or {}
+    for field_name, field_schema in PAYLOAD_INDEXES.items():
+        if field_name not in indexed:
+            qdrant.create_payload_index(collection_name=COLLECTION_NAME, field_name=field_name,
+                                        field_schema=field_schema)
+
+# Load CSV, Parquet or Arrow catalog as a typed Arrow table
 def load_products(csv_file: str):
-    return pd.read_csv(csv_file)
+    return read_catalog(csv_file)
 
 # Insert products
-def insert_products(df):
-    points = []
-    for _, row in df.iterrows():
-        vector = generate_embedding(row["description"])
-        metadata = {
-            "product_id": row["product_id"],
-            "name": row["name"],
-            "description": row["description"],
-            "category": row["category"],
-            "price": float(row["price"]),
-            "in_stock": bool(row["in_stock"]),
-        }
-        points.append(
-            models.PointStruct(
-                id=str(uuid.uuid5(uuid.NAMESPACE_DNS,row["product_id"])),  # use uuid of product_id as point id
-                vector=vector,
-                payload=metadata,
-            )
+def insert_products(catalog: CatalogSource, sync: bool = False):
+    """
+    Upsert a catalog (path or Arrow table) as a read -> embed -> upsert pipeline:
+    the stages run concurrently with bounded queues in between, so memory stays
+    flat whatever the catalog size.
+
+    With sync=True the catalog is diffed against the row hashes of the last
+    sync (SYNC_MANIFEST_PATH): only new and changed products are embedded and
+    upserted, and products missing from the catalog are deleted
+    """
+    def embed_points(batch):
+        # One column-oriented Batch per upsert; payloads come typed from Arrow
+        product_ids = batch.column("product_id").to_pylist()
+        return models.Batch(
+            ids=[str(uuid.uuid5(uuid.NAMESPACE_DNS, product_id)) for product_id in product_ids],  # use uuid of product_id as point id
+            vectors=embedder.embed(batch.column("description").to_pylist()),
+            payloads=batch.to_pylist(),
         )
-    qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
-    print("Products inserted into Qdrant")
 
-# Search
-def search_products(query: str, top_k=3):
+    def upsert_points(points):
+        qdrant.upsert(collection_name=COLLECTION_NAME, points=points)
+
+    catalog_sync = CatalogSync(SYNC_MANIFEST_PATH) if sync else None
+    batches = catalog_sync.changed_batches(catalog, batch_size=UPSERT_BATCH_SIZE) if sync \
+        else read_catalog_batches(catalog, batch_size=UPSERT_BATCH_SIZE)
+    stats = run_pipeline(batches, [Stage("embed", embed_points),
+                                   Stage("upsert", upsert_points, workers=UPSERT_WORKERS)])
+    if sync:
+        deleted = catalog_sync.deleted_ids()
+        for start in range(0, len(deleted), UPSERT_BATCH_SIZE):
+            point_ids = [str(uuid.uuid5(uuid.NAMESPACE_DNS, product_id))
+                         for product_id in deleted[start:start + UPSERT_BATCH_SIZE]]
+            qdrant.delete(collection_name=COLLECTION_NAME, points_selector=models.PointIdsList(points=point_ids))
+        catalog_sync.commit()
+        print(f"Synced catalog: {catalog_sync.stats()}")
+    print(f"Products inserted into Qdrant, embedding cache hit rate {embedder.stats().get('cache_hit_rate', 0.0):.0%}")
+    print(format_pipeline_stats(stats))
+
+# Search; filters (shared filter language, see catalog_filters) become a Qdrant Filter applied during the search
+def search_products(query: str, top_k=3, filters: dict = None):
     query_vector = generate_embedding(query)
     results = qdrant.search(
         collection_name=COLLECTION_NAME,
         query_vector=query_vector,
+        query_filter=to_qdrant_filter(filters) if filters else None,
         limit=top_k,
     )
     for r in results:
         print(r.payload, "Score:", r.score)
 
 # Update
-def update_product(product_id: str, new_description: str):
-    vector = generate_embedding(new_description)
-    qdrant.upsert(
-        collection_name=COLLECTION_NAME,
-        points=[
-            models.PointStruct(
-                id=str(uuid.uuid5(uuid.NAMESPACE_DNS,product_id)),
-                vector=vector,
-                payload={"description": new_description}
-            )
-        ]
-    )
-    print(f"Product {product_id} updated")
+def update_product(product_id: str, new_description: str = None, new_price: float = None, in_stock: bool = None):
+    """
+    Partial update: the changed fields are written with set_payload, and the
+    vector is re-embedded (update_vectors) only when the description changed,
+    so price and stock updates make no embedding call and send no vector
+    """
+    point_id = str(uuid.uuid5(uuid.NAMESPACE_DNS, product_id))
+    points = qdrant.retrieve(collection_name=COLLECTION_NAME, ids=[point_id], with_payload=True, with_vectors=False)
+    if not points:
+        print(f"Product {product_id} not found")
+        return
+    plan = plan_update(points[0].payload, product_changes(new_description, new_price, in_stock), EMBEDDED_FIELDS)
+    if plan.noop:
+        print(f"Product {product_id} unchanged")
+        return
+    if plan.reembed:
+        qdrant.update_vectors(
+            collection_name=COLLECTION_NAME,
+            points=[models.PointVectors(id=point_id, vector=generate_embedding(plan.changes["description"]))]
+        )
+    qdrant.set_payload(collection_name=COLLECTION_NAME, payload=plan.changes, points=[point_id])
+    print(f"Product {product_id} updated{'' if plan.reembed else ' (payload only)'}")
 
 # Delete
 def delete_product(product_id: str):
@@ -105,24 +173,32 @@ def delete_product(product_id: str):
 def delete_all_products():
     qdrant.delete_collection(collection_name=COLLECTION_NAME)
     print(f"collection_name {COLLECTION_NAME} deleted")
+    # The next sync has to load everything again
+    remove_manifest(SYNC_MANIFEST_PATH)
     print(f"collection list {qdrant.get_collections()}")
 
 
 if __name__ == "__main__":
 
+    # 0. Connect the clients
+    connect()
+
     # 1. Create collection
     init_collection()
 
-    # 2. Load and insert data
-    df = load_products("data/product_catalog.csv")
-    #insert_products(df)
+    # 2. Insert data, streamed from the file batch by batch
+    #insert_products("data/product_catalog.csv")
+    # Nightly feed: only new, changed and removed products are written
+    #insert_products("data/product_catalog.csv", sync=True)
 
     # 3. Search
     print("\n Searching for 'red book':")
     search_products("red book")
+    search_products("red book", filters={"category": "Book", "in_stock": True})
 
     # 4. Update
     update_product("prod_002", "An elegant Fossil watch suitable for parties and meetings.")
+    update_product("prod_002", new_price=89.99, in_stock=False)  # payload only, no embedding
 
     # 5. Search again
     print("\n Searching for 'Fossil watch':")
@@ -137,3 +213,6 @@ if __name__ == "__main__":
 
     # 8. Delete all
     delete_all_products()
+
+    # 9. Release the clients
+    close()
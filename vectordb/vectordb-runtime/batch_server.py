@@ -0,0 +1,191 @@
+"""
+Local stand-in for a vector database's batch-insert endpoint.
+
+StandInBatchServer answers POST /v1/batch/objects on localhost like
+Weaviate's REST batch endpoint: a list of objects in, one result per object
+out, with errors for the objects it rejected. Each request takes a fixed
+latency plus a per-object latency (server-side vectorization), and only
+`workers` requests are processed at a time, so extra concurrent requests
+queue like on a saturated server. It records batch sizes and the peak number
+of requests in flight, and can reject each n-th object once, so BatchWriter
+can be tested and benchmarked offline.
+
+Throughput of one request per object, fixed batch sizes and BatchWriter:
+
+    python batch_server.py --objects 5000 --latency-ms 20 --per-object-ms 0.5
+"""
+import argparse
+import json
+import threading
+import time
+import urllib.request
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+
+import pyarrow as pa
+
+from batch_writer import MAX_BATCH_SIZE, BatchWriter, WriteBatch, format_batch_stats
+from catalog_generator import BLOCK_SIZE, generate_block
+
+
+class StandInBatchServer:
+    """
+    Batch-insert server on 127.0.0.1 and a free port, as a context manager.
+
+    Each request takes latency + per_object_latency * len(objects) seconds
+    once one of the `workers` is free. Requests with more than
+    max_batch_size objects get HTTP 413. With fail_every=n, every n-th
+    object the server sees is rejected the first time it is sent.
+    """
+
+    def __init__(self, latency: float = 0.02, per_object_latency: float = 0.0005, workers: int = 2,
+                 max_batch_size: int = MAX_BATCH_SIZE, fail_every: int = 0):
+        self.latency = latency
+        self.per_object_latency = per_object_latency
+        self.max_batch_size = max_batch_size
+        self.fail_every = fail_every
+        self.batch_sizes: List[int] = []
+        self.objects: Dict[str, Dict] = {}
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._seen = 0
+        self._rejected = set()
+        self._workers = threading.BoundedSemaphore(workers)
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StandInBatchServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandInBatchServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _respond(self, body: Dict) -> tuple:
+        """(status, response body) for one request body"""
+        objects = body.get("objects") or []
+        if len(objects) > self.max_batch_size:
+            return 413, {"error": [{"message": f"at most {self.max_batch_size} objects per batch"}]}
+        with self._lock:
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            with self._workers:
+                time.sleep(self.latency + self.per_object_latency * len(objects))
+            results = []
+            with self._lock:
+                for obj in objects:
+                    self._seen += 1
+                    if self.fail_every and self._seen % self.fail_every == 0 and obj["id"] not in self._rejected:
+                        self._rejected.add(obj["id"])
+                        results.append({**obj, "result": {"errors": {"error": [{"message": "vectorizer timed out"}]}}})
+                    else:
+                        self.objects[obj["id"]] = obj["properties"]
+                        results.append({**obj, "result": {}})
+                self.batch_sizes.append(len(objects))
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+        return 200, results
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip("/") != "/v1/batch/objects":
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, response = server._respond(body)
+                payload = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def http_write_batch(base_url: str, class_name: str, id_field: str = "product_id", timeout: float = 60.0) -> WriteBatch:
+    """WriteBatch over a Weaviate-style REST batch endpoint; objects are property dicts keyed by id_field"""
+    url = base_url.rstrip("/") + "/batch/objects"
+
+    def write_batch(objects: List[Dict[str, Any]]) -> Dict[int, str]:
+        body = {"objects": [{"class": class_name, "id": obj[id_field], "properties": obj} for obj in objects]}
+        request = urllib.request.Request(url, data=json.dumps(body).encode(),
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            results = json.loads(response.read())
+        return {i: "; ".join(error["message"] for error in result["result"]["errors"]["error"])
+                for i, result in enumerate(results) if result["result"].get("errors")}
+
+    return write_batch
+
+
+def benchmark(n_objects: int, latency: float, per_object_latency: float, workers: int, concurrency: int,
+              fixed_sizes=(10, 100, 1000), serial_sample: int = 200) -> Dict[str, float]:
+    """Objects per second of one request per object (on a sample), fixed batch sizes and BatchWriter"""
+    products = [product for block_no in range(-(-n_objects // BLOCK_SIZE))
+                for product in pa.table(generate_block(seed=1, block_no=block_no, n_rows=n_objects)).to_pylist()]
+    results = {}
+    print(f"{len(products)} objects, {latency * 1000:.0f} ms + {per_object_latency * 1000:.2f} ms/object "
+          f"per request, {workers} server workers, {concurrency} requests in flight")
+    with StandInBatchServer(latency=latency, per_object_latency=per_object_latency, workers=workers) as server:
+        write_batch = http_write_batch(server.url, "Product")
+        sample = products[:min(serial_sample, len(products))]
+        start = time.perf_counter()
+        for product in sample:
+            write_batch([product])
+        results["one_per_object"] = len(sample) / (time.perf_counter() - start)
+        print(f"one request per object: {results['one_per_object']:10.1f} objects/s")
+
+        for size in fixed_sizes:
+            writer = BatchWriter(write_batch, max_concurrency=concurrency, batch_size=size,
+                                 min_batch_size=size, max_batch_size=size)
+            stats = writer.write(products)
+            results[f"fixed_{size}"] = stats["objects_per_second"]
+            print(f"batches of {size:<13} {stats['objects_per_second']:10.1f} objects/s "
+                  f"({stats['mean_latency'] * 1000:.0f} ms per request)")
+
+        writer = BatchWriter(write_batch, max_concurrency=concurrency)
+        stats = writer.write(products)
+        results["dynamic"] = stats["objects_per_second"]
+        print(f"BatchWriter (dynamic):  {stats['objects_per_second']:10.1f} objects/s, "
+              f"{results['dynamic'] / results['one_per_object']:.0f}x")
+        print(f"  {format_batch_stats(stats)}")
+    return results
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Batch insert throughput against a local stand-in server")
+    parser.add_argument("--objects", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=20.0, help="fixed latency per request")
+    parser.add_argument("--per-object-ms", type=float, default=0.5, help="added latency per object in a request")
+    parser.add_argument("--workers", type=int, default=2, help="requests the server processes at a time")
+    parser.add_argument("--concurrency", type=int, default=2, help="requests in flight")
+    args = parser.parse_args(argv)
+    benchmark(args.objects, args.latency_ms / 1000, args.per_object_ms / 1000, args.workers, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Dynamically sized, concurrent batch writer shared by the vectordb examples.
+
+BatchWriter(write_batch).write(objects) groups a stream of objects into
+batch requests and keeps up to max_concurrency of them in flight. The
+batch size follows the server: after every response the writer estimates
+the seconds per object and sizes the next batches to take about
+target_latency, at most doubling at a time, within [min_batch_size,
+max_batch_size]. A fast, idle server gets large batches; a slow or
+saturated one (vectorizing, queueing) gets smaller ones instead of
+timeouts.
+
+write_batch(objects) sends one batch and returns {index: error message}
+for the objects the server rejected. Those objects, and every object of a
+batch whose request raised, are collected in writer.failed as
+FailedObject(object, error) rather than printed, and retry_failed() writes
+them again.
+
+The client is transport-agnostic, like EmbeddingClient: the Weaviate
+example wraps collection.data.insert_many; batch_server holds a local
+stand-in and the benchmark.
+"""
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple
+
+DEFAULT_BATCH_SIZE = 100
+MIN_BATCH_SIZE = 10
+MAX_BATCH_SIZE = 1000
+DEFAULT_TARGET_LATENCY = 1.0
+# Weight of the latest response in the seconds-per-object estimate
+_SMOOTHING = 0.5
+
+WriteBatch = Callable[[List[Any]], Dict[int, str]]
+
+
+class FailedObject(NamedTuple):
+    """An object the server did not store, with its error"""
+    object: Any
+    error: str
+
+
+class BatchWriter:
+    """
+    Writes objects in dynamically sized batches with bounded concurrency;
+    see the module docstring
+    """
+
+    def __init__(self, write_batch: WriteBatch, max_concurrency: int = 2,
+                 target_latency: float = DEFAULT_TARGET_LATENCY, batch_size: int = DEFAULT_BATCH_SIZE,
+                 min_batch_size: int = MIN_BATCH_SIZE, max_batch_size: int = MAX_BATCH_SIZE):
+        if max_concurrency < 1 or not 1 <= min_batch_size <= max_batch_size or target_latency <= 0:
+            raise ValueError("max_concurrency must be at least 1, target_latency positive and "
+                             "1 <= min_batch_size <= max_batch_size")
+        self.write_batch = write_batch
+        self.max_concurrency = max_concurrency
+        self.target_latency = target_latency
+        self.min_batch_size = min_batch_size
+        self.max_batch_size = max_batch_size
+        self.batch_size = min(max(batch_size, min_batch_size), max_batch_size)
+        self.failed: List[FailedObject] = []
+        self._seconds_per_object = None
+        self._lock = threading.Lock()
+        self._stats = {"objects": 0, "batches": 0, "failed": 0, "request_seconds": 0.0, "max_in_flight": 0}
+        self._in_flight = 0
+
+    def write(self, objects: Iterable[Any]) -> Dict[str, Any]:
+        """Write every object; returns the counters of this call"""
+        before = self.stats()
+        start = time.perf_counter()
+        slots = threading.BoundedSemaphore(self.max_concurrency)
+        with ThreadPoolExecutor(max_workers=self.max_concurrency, thread_name_prefix="batch-writer") as pool:
+            batch = []
+            for obj in objects:
+                batch.append(obj)
+                if len(batch) >= self.batch_size:
+                    # Waits for a free slot, so at most max_concurrency batches are held in memory
+                    slots.acquire()
+                    pool.submit(self._send, batch, slots)
+                    batch = []
+            if batch:
+                slots.acquire()
+                pool.submit(self._send, batch, slots)
+        stats = self.stats()
+        seconds = time.perf_counter() - start
+        counts = {name: stats[name] - before[name] for name in ("objects", "batches", "failed", "request_seconds")}
+        return {**counts, "seconds": seconds,
+                "objects_per_second": counts["objects"] / seconds if seconds else 0.0,
+                "mean_batch_size": counts["objects"] / counts["batches"] if counts["batches"] else 0.0,
+                "mean_latency": counts["request_seconds"] / counts["batches"] if counts["batches"] else 0.0,
+                "batch_size": self.batch_size, "max_in_flight": stats["max_in_flight"]}
+
+    def retry_failed(self) -> Dict[str, Any]:
+        """Write the failed objects again; those failing again are back in self.failed"""
+        with self._lock:
+            failed, self.failed = self.failed, []
+        return self.write([failure.object for failure in failed])
+
+    def stats(self) -> Dict[str, Any]:
+        """Counters since the writer was created, and the current batch size"""
+        with self._lock:
+            return {**self._stats, "batch_size": self.batch_size}
+
+    def _send(self, batch: List[Any], slots: threading.BoundedSemaphore) -> None:
+        try:
+            with self._lock:
+                self._in_flight += 1
+                self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._in_flight)
+            start = time.perf_counter()
+            try:
+                errors = self.write_batch(batch)
+            except Exception as e:
+                errors = {i: f"{type(e).__name__}: {e}" for i in range(len(batch))}
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self._in_flight -= 1
+                self.failed.extend(FailedObject(batch[i], error) for i, error in sorted(errors.items()))
+                self._stats["objects"] += len(batch)
+                self._stats["batches"] += 1
+                self._stats["failed"] += len(errors)
+                self._stats["request_seconds"] += seconds
+                if len(errors) < len(batch):
+                    # A request that failed outright says nothing about the server's speed
+                    self._resize(len(batch), seconds)
+        finally:
+            slots.release()
+
+    def _resize(self, n_objects: int, seconds: float) -> None:
+        """Size the next batches to take about target_latency at the observed seconds per object"""
+        per_object = seconds / n_objects
+        self._seconds_per_object = per_object if self._seconds_per_object is None \
+            else _SMOOTHING * per_object + (1 - _SMOOTHING) * self._seconds_per_object
+        size = self.target_latency / self._seconds_per_object if self._seconds_per_object else self.max_batch_size
+        self.batch_size = int(min(self.max_batch_size, 2 * self.batch_size, max(self.min_batch_size, size)))
+
+
+def format_batch_stats(stats: Dict[str, Any]) -> str:
+    """One summary line of write() counters"""
+    return (f"{stats['objects']} objects in {stats['seconds']:.2f} s ({stats['objects_per_second']:.0f} objects/s), "
+            f"{stats['batches']} batches of {stats['mean_batch_size']:.0f} on average "
+            f"({stats['mean_latency'] * 1000:.0f} ms each, now {stats['batch_size']}), "
+            f"{stats['max_in_flight']} in flight, {stats['failed']} failed")
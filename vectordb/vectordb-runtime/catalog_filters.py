@@ -0,0 +1,240 @@
+"""
+Metadata filter language shared by the vectordb examples.
+
+A filter is a Chroma-style dict: {"field": value}, {"field": {op: value}}
+with op one of $eq, $ne, $gt, $gte, $lt, $lte, $in, $nin, and
+{"$and" | "$or": [filter, ...]}; several keys in one dict are AND-ed, e.g.
+
+    {"category": {"$in": ["Laptop", "Smartphone"]}, "price": {"$lte": 1000.0}}
+
+parse_filter() validates a filter once into a small tree, and the to_*
+functions turn that tree into each backend's native form, so the backend
+evaluates it next to its index instead of the example over-fetching and
+filtering results in Python.
+"""
+import json
+import re
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Union
+
+import numpy as np
+
+COMPARISON_OPERATORS = ("$eq", "$ne", "$gt", "$gte", "$lt", "$lte")
+MEMBERSHIP_OPERATORS = ("$in", "$nin")
+LOGICAL_OPERATORS = ("$and", "$or")
+# Field names end up inside Milvus expressions, so only plain identifiers are accepted
+_FIELD = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+_SCALARS = (str, bool, int, float)
+
+
+class Comparison(NamedTuple):
+    field: str
+    op: str
+    value: Any
+
+
+class Logical(NamedTuple):
+    op: str
+    children: List[Union["Comparison", "Logical"]]
+
+
+FilterNode = Union[Comparison, Logical]
+FilterLike = Union[Dict[str, Any], FilterNode]
+
+
+def parse_filter(filters: FilterLike) -> FilterNode:
+    """Validate a filter dict into a tree of Comparison and Logical nodes; a parsed tree is returned as is"""
+    if isinstance(filters, (Comparison, Logical)):
+        return filters
+    if not isinstance(filters, dict) or not filters:
+        raise ValueError(f"Invalid filter: {filters!r}")
+
+    clauses = []
+    for key, condition in filters.items():
+        if key in LOGICAL_OPERATORS:
+            if not isinstance(condition, list) or not condition:
+                raise ValueError(f"'{key}' expects a non-empty list of filters")
+            clauses.append(_logical(key, [parse_filter(child) for child in condition]))
+        elif key.startswith("$"):
+            raise ValueError(f"Unsupported logical operator '{key}'")
+        elif isinstance(condition, dict):
+            if not condition:
+                raise ValueError(f"Empty condition on field '{key}'")
+            clauses.extend(_comparison(key, op, value) for op, value in condition.items())
+        else:
+            clauses.append(_comparison(key, "$eq", condition))
+    return _logical("$and", clauses)
+
+
+def comparisons(node: FilterNode) -> Iterator[Comparison]:
+    """Every Comparison in a parsed filter, e.g. to check fields against a schema"""
+    if isinstance(node, Comparison):
+        yield node
+    else:
+        for child in node.children:
+            yield from comparisons(child)
+
+
+def to_chroma_where(filters: FilterLike) -> Dict[str, Any]:
+    """
+    Chroma `where` dict. Chroma rejects several fields in one dict, so they
+    are spelled out as an explicit $and
+    """
+    node = parse_filter(filters)
+    if isinstance(node, Comparison):
+        return {node.field: {node.op: node.value}}
+    return {node.op: [to_chroma_where(child) for child in node.children]}
+
+
+def to_pinecone_filter(filters: FilterLike) -> Dict[str, Any]:
+    """Pinecone metadata filter, which takes the same operators as Chroma"""
+    return to_chroma_where(filters)
+
+
+_MILVUS_OPERATORS = {"$eq": "==", "$ne": "!=", "$gt": ">", "$gte": ">=", "$lt": "<", "$lte": "<=",
+                     "$in": "in", "$nin": "not in"}
+
+
+def to_milvus_expr(filters: FilterLike) -> str:
+    """Milvus boolean expression for the `filter` argument of search/query"""
+    node = parse_filter(filters)
+    if isinstance(node, Comparison):
+        return f"{node.field} {_MILVUS_OPERATORS[node.op]} {_milvus_literal(node.value)}"
+    joiner = " and " if node.op == "$and" else " or "
+    return joiner.join(f"({to_milvus_expr(child)})" for child in node.children)
+
+
+def to_qdrant_filter(filters: FilterLike):
+    """qdrant_client `models.Filter`, passed as query_filter"""
+    from qdrant_client.http import models
+
+    node = parse_filter(filters)
+    if isinstance(node, Logical):
+        children = [_qdrant_condition(child, models) for child in node.children]
+        return models.Filter(must=children) if node.op == "$and" else models.Filter(should=children)
+    return models.Filter(must=[_qdrant_condition(node, models)])
+
+
+def to_weaviate_filter(filters: FilterLike):
+    """weaviate.classes.query `Filter`, passed as filters= to a query"""
+    from weaviate.classes.query import Filter
+
+    node = parse_filter(filters)
+    if isinstance(node, Logical):
+        children = [to_weaviate_filter(child) for child in node.children]
+        return Filter.all_of(children) if node.op == "$and" else Filter.any_of(children)
+    prop = Filter.by_property(node.field)
+    if node.op == "$in":
+        return Filter.any_of([prop.equal(value) for value in node.value]) if len(node.value) > 1 \
+            else prop.equal(node.value[0])
+    if node.op == "$nin":
+        return Filter.all_of([prop.not_equal(value) for value in node.value]) if len(node.value) > 1 \
+            else prop.not_equal(node.value[0])
+    return {"$eq": prop.equal, "$ne": prop.not_equal, "$gt": prop.greater_than, "$gte": prop.greater_or_equal,
+            "$lt": prop.less_than, "$lte": prop.less_or_equal}[node.op](node.value)
+
+
+_NUMPY_COMPARISONS = {
+    "$eq": np.equal,
+    "$ne": np.not_equal,
+    "$gt": np.greater,
+    "$gte": np.greater_equal,
+    "$lt": np.less,
+    "$lte": np.less_equal,
+}
+
+# A NumPy predicate maps columns to a boolean row mask
+NumpyPredicate = Callable[[Any], np.ndarray]
+
+
+def to_numpy_predicate(filters: FilterLike) -> NumpyPredicate:
+    """
+    Vectorized predicate over columnar metadata. The columns object passed
+    to it provides column(field) -> array and encode_value(field, value),
+    which translates a literal into the column's storage type (e.g. a
+    dictionary code); every comparison is one NumPy operation over a column.
+    """
+    node = parse_filter(filters)
+    if isinstance(node, Logical):
+        children = [to_numpy_predicate(child) for child in node.children]
+        reduce = np.logical_and if node.op == "$and" else np.logical_or
+
+        def combined(columns) -> np.ndarray:
+            mask = children[0](columns)
+            for child in children[1:]:
+                mask = reduce(mask, child(columns))
+            return mask
+        return combined
+
+    field, op, value = node
+    if op in MEMBERSHIP_OPERATORS:
+        def membership(columns) -> np.ndarray:
+            mask = np.isin(columns.column(field), [columns.encode_value(field, v) for v in value])
+            return mask if op == "$in" else ~mask
+        return membership
+
+    compare = _NUMPY_COMPARISONS[op]
+
+    def comparison(columns) -> np.ndarray:
+        return compare(columns.column(field), columns.encode_value(field, value))
+    return comparison
+
+
+def _logical(op: str, children: List[FilterNode]) -> FilterNode:
+    """op over children, with nested nodes of the same op spliced in: a and (b and c) is a and b and c"""
+    flat = []
+    for child in children:
+        flat.extend(child.children if isinstance(child, Logical) and child.op == op else [child])
+    return flat[0] if len(flat) == 1 else Logical(op, flat)
+
+
+def _comparison(field: str, op: str, value: Any) -> Comparison:
+    if not _FIELD.match(field):
+        raise ValueError(f"Invalid field name {field!r}")
+    if op in MEMBERSHIP_OPERATORS:
+        if not isinstance(value, (list, tuple)) or not value or not all(isinstance(v, _SCALARS) for v in value):
+            raise ValueError(f"'{op}' on field '{field}' expects a non-empty list of values")
+        return Comparison(field, op, list(value))
+    if op not in COMPARISON_OPERATORS:
+        raise ValueError(f"Unsupported filter operator '{op}' on field '{field}'")
+    if not isinstance(value, _SCALARS):
+        raise ValueError(f"'{op}' on field '{field}' expects a string, number or bool, got {value!r}")
+    if op not in ("$eq", "$ne") and isinstance(value, (str, bool)):
+        raise ValueError(f"'{op}' on field '{field}' expects a number, got {value!r}")
+    return Comparison(field, op, value)
+
+
+def _milvus_literal(value: Any) -> str:
+    if isinstance(value, list):
+        return "[" + ", ".join(_milvus_literal(v) for v in value) + "]"
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, str):
+        # JSON string escaping is what Milvus string literals accept
+        return json.dumps(value)
+    return repr(value)
+
+
+def _qdrant_condition(node: FilterNode, models):
+    """A Filter or FieldCondition usable inside must/should"""
+    if isinstance(node, Logical):
+        return to_qdrant_filter(node)
+    field, op, value = node
+    if op == "$eq":
+        return _qdrant_equal(field, value, models)
+    if op == "$ne":
+        return models.Filter(must_not=[_qdrant_equal(field, value, models)])
+    if op in MEMBERSHIP_OPERATORS:
+        if all(isinstance(v, (str, int)) and not isinstance(v, bool) for v in value):
+            match = models.MatchAny(any=value) if op == "$in" else models.MatchExcept(**{"except": value})
+            return models.FieldCondition(key=field, match=match)
+        # MatchAny only takes keywords and integers
+        conditions = [_qdrant_equal(field, v, models) for v in value]
+        return models.Filter(should=conditions) if op == "$in" else models.Filter(must_not=conditions)
+    return models.FieldCondition(key=field, range=models.Range(**{op[1:]: value}))
+
+
+def _qdrant_equal(field: str, value: Any, models):
+    if isinstance(value, float):
+        # MatchValue takes keywords, integers and bools; a float matches as a closed range
+        return models.FieldCondition(key=field, range=models.Range(gte=value, lte=value))
+    return models.FieldCondition(key=field, match=models.MatchValue(value=value))
@@ -0,0 +1,139 @@
+"""
+Incremental catalog sync shared by the vectordb examples' loaders.
+
+A manifest file records a 64-bit content hash for every product a loader
+has written to its vector store. CatalogSync streams a new catalog against
+it: changed_batches() yields only the rows that are new or whose hash
+changed, deleted_ids() then lists the products the new catalog no longer
+has, and commit() writes the new manifest once the loader has upserted and
+deleted them. Unchanged rows are hashed but never embedded or sent, so a
+nightly feed costs one read of the file plus work in proportion to its churn.
+
+The manifest is an Arrow IPC file of (product_id, key, row_hash) sorted by
+key, the hash of product_id; lookups are vectorized binary searches over it,
+so a sync holds ~30 bytes per product rather than a dict of every row.
+"""
+import hashlib
+import os
+from typing import Any, Dict, Iterable, Iterator, List
+
+import numpy as np
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.ipc as pa_ipc
+
+from catalog_reader import DEFAULT_BATCH_SIZE, CatalogSource, price_text, read_catalog_batches, rebatch
+
+MANIFEST_SCHEMA = pa.schema([
+    ("product_id", pa.string()),
+    ("key", pa.uint64()),
+    ("row_hash", pa.uint64()),
+])
+# Every column but product_id, which is the key
+HASHED_FIELDS = ("name", "description", "category", "price", "in_stock")
+_SEPARATOR = "\x1f"
+
+
+def hash_strings(values: Iterable[str]) -> np.ndarray:
+    """64-bit BLAKE2b hash of each string, as uint64"""
+    digests = b"".join(hashlib.blake2b(value.encode(), digest_size=8).digest() for value in values)
+    return np.frombuffer(digests, dtype="<u8").astype(np.uint64)
+
+
+def row_hashes(batch: pa.RecordBatch) -> np.ndarray:
+    """Content hash of each row of a CATALOG_SCHEMA batch over HASHED_FIELDS"""
+    columns = []
+    for field in HASHED_FIELDS:
+        column = batch.column(field)
+        column = price_text(column) if field == "price" else pc.cast(column, pa.string())
+        columns.append(pc.fill_null(column, ""))
+    return hash_strings(pc.binary_join_element_wise(*columns, _SEPARATOR).to_pylist())
+
+
+def read_manifest(path: str) -> pa.Table:
+    """The manifest at path, or an empty one if there is none yet"""
+    if not os.path.exists(path):
+        return MANIFEST_SCHEMA.empty_table()
+    with pa_ipc.open_file(path) as reader:
+        return reader.read_all()
+
+
+def remove_manifest(path: str) -> None:
+    """Forget what was loaded, e.g. after dropping the collection; the next sync loads everything"""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+class CatalogSync:
+    """
+    One sync of a catalog against the manifest at manifest_path: consume
+    changed_batches(), apply deleted_ids(), then commit()
+    """
+
+    def __init__(self, manifest_path: str):
+        self.manifest_path = manifest_path
+        previous = read_manifest(manifest_path)
+        self._previous_ids = previous.column("product_id")
+        self._previous_keys = previous.column("key").to_numpy()
+        self._previous_hashes = previous.column("row_hash").to_numpy()
+        self._seen = np.zeros(previous.num_rows, dtype=bool)
+        self._current: List[pa.RecordBatch] = []
+        self._consumed = False
+        self._counts = {"rows": 0, "new": 0, "changed": 0, "unchanged": 0, "deleted": 0}
+
+    def changed_batches(self, source: CatalogSource, batch_size: int = DEFAULT_BATCH_SIZE) -> Iterator[pa.RecordBatch]:
+        """The new and changed rows of source, re-batched to batch_size rows"""
+        return rebatch(self._changed_rows(source, batch_size), batch_size)
+
+    def _changed_rows(self, source: CatalogSource, batch_size: int) -> Iterator[pa.RecordBatch]:
+        for batch in read_catalog_batches(source, batch_size):
+            keys = hash_strings(batch.column("product_id").to_pylist())
+            hashes = row_hashes(batch)
+            self._current.append(pa.RecordBatch.from_arrays(
+                [batch.column("product_id"), pa.array(keys), pa.array(hashes)], schema=MANIFEST_SCHEMA))
+
+            found = np.zeros(len(keys), dtype=bool)
+            unchanged = found.copy()
+            if len(self._previous_keys):
+                positions = np.minimum(np.searchsorted(self._previous_keys, keys), len(self._previous_keys) - 1)
+                found = self._previous_keys[positions] == keys
+                unchanged = found & (self._previous_hashes[positions] == hashes)
+                self._seen[positions[found]] = True
+            n_unchanged, n_found = int(unchanged.sum()), int(found.sum())
+            self._count(rows=len(keys), new=len(keys) - n_found, changed=n_found - n_unchanged, unchanged=n_unchanged)
+            if n_unchanged < len(keys):
+                yield batch.filter(pa.array(~unchanged))
+        self._consumed = True
+
+    def deleted_ids(self) -> List[str]:
+        """Products in the manifest that the catalog no longer has; call once changed_batches() is consumed"""
+        if not self._consumed:
+            raise RuntimeError("deleted_ids() needs changed_batches() to be consumed first")
+        deleted = pc.filter(self._previous_ids, pa.array(~self._seen)).to_pylist()
+        self._counts["deleted"] = len(deleted)
+        return deleted
+
+    def commit(self) -> None:
+        """Replace the manifest with the synced catalog; call after its changes and deletes are written"""
+        if not self._consumed:
+            raise RuntimeError("commit() needs changed_batches() to be consumed first")
+        table = pa.Table.from_batches(self._current, schema=MANIFEST_SCHEMA).combine_chunks()
+        keys = table.column("key").to_numpy()
+        order = np.argsort(keys, kind="stable")
+        # A product listed twice keeps its last row, as the upserts did
+        sorted_keys = keys[order]
+        last = np.ones(len(sorted_keys), dtype=bool)
+        last[:-1] = sorted_keys[1:] != sorted_keys[:-1]
+        table = table.take(pa.array(order[last]))
+        tmp_path = f"{self.manifest_path}.tmp"
+        with pa_ipc.new_file(tmp_path, MANIFEST_SCHEMA) as writer:
+            writer.write_table(table)
+        os.replace(tmp_path, self.manifest_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Rows read, new, changed, unchanged and deleted (after deleted_ids())"""
+        return dict(self._counts)
+
+    def _count(self, **increments) -> None:
+        for field, value in increments.items():
+            self._counts[field] += value
@@ -0,0 +1,45 @@
+"""
+Partial product updates shared by the vectordb examples.
+
+Every example's update_product takes the same optional changes
+(new_description, new_price, in_stock). plan_update() compares them with
+the stored product and returns the fields whose value actually changes,
+and whether any of those feeds the embedded text. Only then does a backend
+embed and write a vector; otherwise it writes the changed metadata alone
+(Chroma metadata update, Milvus partial upsert, Qdrant set_payload,
+Pinecone set_metadata, Weaviate property patch, FAISS row copy reusing the
+stored vector), so price and stock feeds make no embedding calls and send
+no vectors.
+"""
+from typing import Any, Dict, Iterable, Mapping, NamedTuple
+
+
+class UpdatePlan(NamedTuple):
+    """The fields an update changes, and whether the product must be re-embedded"""
+    changes: Dict[str, Any]
+    reembed: bool
+
+    @property
+    def noop(self) -> bool:
+        return not self.changes
+
+
+def product_changes(new_description: str = None, new_price: float = None, in_stock: bool = None) -> Dict[str, Any]:
+    """
+    The update_product arguments as catalog fields; None means unchanged, and
+    so does an empty new_description, which would only blank the embedded text
+    """
+    changes = {"description": new_description or None, "price": new_price, "in_stock": in_stock}
+    return {field: value for field, value in changes.items() if value is not None}
+
+
+def plan_update(current: Mapping[str, Any], changes: Mapping[str, Any], embedded_fields: Iterable[str]) -> UpdatePlan:
+    """
+    Compare changes with the current product; fields set to None or to
+    their current value are dropped, and reembed is True only if a changed
+    field is one of embedded_fields
+    """
+    changed = {field: value for field, value in changes.items()
+               if value is not None and (field not in current or current[field] != value)}
+    embedded = set(embedded_fields)
+    return UpdatePlan(changed, any(field in embedded for field in changed))
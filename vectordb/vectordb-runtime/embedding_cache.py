@@ -0,0 +1,316 @@
+"""
+Persistent, content-addressed embedding cache shared by the vectordb and RAG examples.
+
+Vectors are keyed by sha256 of (model, dimensions, text), so a text that
+was embedded once, by any example, run or process using the same cache
+file, is never sent to the API again. The store is one append-only file:
+
+    header  b"EMBCACHE" | uint32 format version | uint32 reserved
+    record  32-byte key | uint32 dim | uint32 reserved | uint64 last used (ns) | float32[dim]
+
+On open the record headers are scanned into an in-memory index and the
+file is memory-mapped, so a hit is a dictionary lookup and a copy out of
+the page cache. New vectors are appended under an exclusive file lock;
+other processes pick them up on their next lookup. Once the file grows
+past max_bytes the least recently used records are dropped by rewriting
+it to EVICT_TO of max_bytes and atomically replacing it.
+
+EmbeddingClient(cache=...) and CachedEmbeddings (for LangChain vector
+stores) consult the cache before sending any request.
+"""
+import asyncio
+import hashlib
+import mmap
+import os
+import struct
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows: no cross-process locking, one process per cache file
+    fcntl = None
+
+MAGIC = b"EMBCACHE"
+FORMAT_VERSION = 1
+FILE_HEADER = struct.Struct("<8sII")
+RECORD_HEADER = struct.Struct("<32sIIQ")
+# Offset of the last-used timestamp in a record header
+LAST_USED_OFFSET = 40
+DEFAULT_MAX_BYTES = 1 << 30
+# Eviction shrinks the file to this fraction of max_bytes, so it doesn't run on every append
+EVICT_TO = 0.8
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".cache", "gen-ai-examples", "embeddings.cache")
+
+Embed = Callable[[List[str]], List[List[float]]]
+
+
+def cache_key(model: str, dimensions: Optional[int], text: str) -> bytes:
+    """sha256 of the model, the requested dimensions (0 for the model's default) and the text"""
+    digest = hashlib.sha256(f"{model}\0{dimensions or 0}\0".encode())
+    digest.update(text.encode())
+    return digest.digest()
+
+
+class EmbeddingCache:
+    """
+    Single-file embedding store with memory-mapped vectors and LRU eviction by size.
+
+    Thread-safe; several processes may share one file (POSIX only).
+    """
+
+    def __init__(self, path: str = DEFAULT_PATH, max_bytes: int = DEFAULT_MAX_BYTES):
+        if max_bytes < FILE_HEADER.size:
+            raise ValueError(f"max_bytes must be at least {FILE_HEADER.size}")
+        self.path = os.fspath(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.RLock()
+        self._stats = {"hits": 0, "misses": 0, "writes": 0, "evictions": 0}
+        os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+        self._file = None
+        self._mmap = None
+        self._open()
+
+    def get_many(self, model: str, dimensions: Optional[int], texts: Sequence[str]) -> List[Optional[List[float]]]:
+        """Cached vectors for texts, None for misses"""
+        with self._lock:
+            self._refresh()
+            now = time.time_ns()
+            vectors = []
+            for text in texts:
+                location = self._index.get(cache_key(model, dimensions, text))
+                if location is None:
+                    vectors.append(None)
+                    continue
+                offset, dim = location
+                vectors.append(np.frombuffer(self._mmap, dtype="<f4", count=dim,
+                                             offset=offset + RECORD_HEADER.size).tolist())
+                struct.pack_into("<Q", self._mmap, offset + LAST_USED_OFFSET, now)
+            hits = sum(vector is not None for vector in vectors)
+            self._stats["hits"] += hits
+            self._stats["misses"] += len(vectors) - hits
+            return vectors
+
+    def get(self, model: str, dimensions: Optional[int], text: str) -> Optional[List[float]]:
+        return self.get_many(model, dimensions, [text])[0]
+
+    def put_many(self, model: str, dimensions: Optional[int], texts: Sequence[str],
+                 vectors: Sequence[Sequence[float]]) -> None:
+        """Store vectors for texts; texts already cached are skipped"""
+        if len(texts) != len(vectors):
+            raise ValueError(f"{len(texts)} texts but {len(vectors)} vectors")
+        with self._lock, self._file_lock():
+            self._refresh()
+            now = time.time_ns()
+            records, keys = [], {}
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model, dimensions, text)
+                if key in self._index or key in keys:
+                    continue
+                vector = np.asarray(vector, dtype="<f4")
+                if vector.ndim != 1 or not len(vector):
+                    raise ValueError("Each vector must be a non-empty 1-d sequence of floats")
+                keys[key] = (self._end + sum(len(record) for record in records), len(vector))
+                records.append(RECORD_HEADER.pack(key, len(vector), 0, now) + vector.tobytes())
+            if not records:
+                return
+            # Drop any partial record left by a writer that crashed mid-append
+            self._file.truncate(self._end)
+            self._file.seek(self._end)
+            self._file.write(b"".join(records))
+            self._file.flush()
+            self._index.update(keys)
+            self._stats["writes"] += len(records)
+            self._remap()
+            if self._end > self.max_bytes:
+                self._evict()
+
+    def put(self, model: str, dimensions: Optional[int], text: str, vector: Sequence[float]) -> None:
+        self.put_many(model, dimensions, [text], [vector])
+
+    def get_or_embed(self, model: str, dimensions: Optional[int], texts: Sequence[str],
+                     embed: Embed) -> List[List[float]]:
+        """Vectors for texts in input order; only distinct uncached texts are passed to embed, in one call"""
+        texts = list(texts)
+        vectors = self.get_many(model, dimensions, texts)
+        missing = list(dict.fromkeys(text for text, vector in zip(texts, vectors) if vector is None))
+        if missing:
+            embedded = embed(missing)
+            self.put_many(model, dimensions, missing, embedded)
+            by_text = dict(zip(missing, embedded))
+            vectors = [by_text[text] if vector is None else vector for text, vector in zip(texts, vectors)]
+        return vectors
+
+    def stats(self) -> Dict[str, float]:
+        """Hits, misses, hit rate, writes, evicted records, and the records and bytes on disk"""
+        with self._lock:
+            lookups = self._stats["hits"] + self._stats["misses"]
+            return {**self._stats, "hit_rate": self._stats["hits"] / lookups if lookups else 0.0,
+                    "entries": len(self._index), "bytes": self._end}
+
+    def close(self) -> None:
+        with self._lock:
+            if self._mmap is not None:
+                self._mmap.close()
+                self._mmap = None
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def __enter__(self) -> "EmbeddingCache":
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _open(self) -> None:
+        """(Re)open the file at path, writing the header if it is new, and index it"""
+        self.close()
+        self._file = open(os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644), "r+b")
+        self._inode = os.fstat(self._file.fileno()).st_ino
+        with self._file_lock(reopen=False):
+            if os.fstat(self._file.fileno()).st_size == 0:
+                self._file.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+                self._file.flush()
+        self._mmap = mmap.mmap(self._file.fileno(), 0)
+        magic, version, _ = FILE_HEADER.unpack_from(self._mmap, 0) if len(self._mmap) >= FILE_HEADER.size \
+            else (None, None, None)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self.close()
+            raise ValueError(f"{self.path} is not an embedding cache (format {FORMAT_VERSION})")
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._end = FILE_HEADER.size
+        self._scan()
+
+    def _scan(self) -> None:
+        """Index the complete records between the indexed end and the mapped size"""
+        size = len(self._mmap)
+        offset = self._end
+        while offset + RECORD_HEADER.size <= size:
+            key, dim, _, _ = RECORD_HEADER.unpack_from(self._mmap, offset)
+            end = offset + RECORD_HEADER.size + 4 * dim
+            if dim == 0 or end > size:
+                break
+            self._index[key] = (offset, dim)
+            offset = end
+        self._end = offset
+
+    def _remap(self) -> None:
+        size = os.fstat(self._file.fileno()).st_size
+        if size != len(self._mmap):
+            self._mmap.close()
+            self._mmap = mmap.mmap(self._file.fileno(), 0)
+            self._scan()
+
+    def _refresh(self) -> None:
+        """Pick up records appended, or a file rewritten by eviction, in another process"""
+        try:
+            stat = os.stat(self.path)
+        except FileNotFoundError:
+            stat = None
+        if stat is None or stat.st_ino != self._inode:
+            self._open()
+        elif stat.st_size != len(self._mmap):
+            self._remap()
+
+    @contextmanager
+    def _file_lock(self, reopen: bool = True):
+        """Exclusive lock on the cache file, reopening it first if eviction replaced it"""
+        if fcntl is None:
+            yield
+            return
+        while True:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+            if not reopen or os.stat(self.path).st_ino == self._inode:
+                break
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._open()
+        try:
+            yield
+        finally:
+            if self._file is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+
+    def _evict(self) -> None:
+        """Rewrite the file with the most recently used records that fit in EVICT_TO of max_bytes"""
+        records = sorted(((struct.unpack_from("<Q", self._mmap, offset + LAST_USED_OFFSET)[0], offset, dim)
+                          for offset, dim in self._index.values()), reverse=True)
+        budget = int(self.max_bytes * EVICT_TO) - FILE_HEADER.size
+        kept = []
+        for _, offset, dim in records:
+            size = RECORD_HEADER.size + 4 * dim
+            if size > budget:
+                break
+            budget -= size
+            kept.append((offset, size))
+        kept.sort()
+        tmp_path = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp_path, "wb") as out:
+            out.write(FILE_HEADER.pack(MAGIC, FORMAT_VERSION, 0))
+            for offset, size in kept:
+                out.write(self._mmap[offset:offset + size])
+        os.replace(tmp_path, self.path)
+        self._stats["evictions"] += len(records) - len(kept)
+        # Our lock is on the replaced file; the new one is complete, so reopening it is safe
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+        self._open()
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+
+
+def cache_from_env() -> Optional[EmbeddingCache]:
+    """
+    The cache at EMBEDDING_CACHE_PATH (default ~/.cache/gen-ai-examples/embeddings.cache),
+    capped at EMBEDDING_CACHE_MAX_MB (default 1024); None if EMBEDDING_CACHE_PATH is set empty
+    """
+    path = os.getenv("EMBEDDING_CACHE_PATH", DEFAULT_PATH)
+    if not path:
+        return None
+    return EmbeddingCache(path, max_bytes=int(float(os.getenv("EMBEDDING_CACHE_MAX_MB", "1024")) * (1 << 20)))
+
+
+class CachedEmbeddings:
+    """
+    LangChain Embeddings that consults an EmbeddingCache before the wrapped embeddings.
+
+    model and dimensions default to the wrapped object's attributes
+    (OpenAIEmbeddings has both); with cache=None every call goes through.
+    The async methods run the sync ones in a thread, so async retrievers and
+    vector stores hit the same cache.
+    """
+
+    def __init__(self, embeddings, cache: Optional[EmbeddingCache], model: str = None, dimensions: int = None):
+        self.embeddings = embeddings
+        self.cache = cache
+        self.model = model or getattr(embeddings, "model", None)
+        self.dimensions = dimensions or getattr(embeddings, "dimensions", None)
+        if cache is not None and not self.model:
+            raise ValueError("model is required to key the embedding cache")
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        if self.cache is None:
+            return self.embeddings.embed_documents(texts)
+        return self.cache.get_or_embed(self.model, self.dimensions, texts, self.embeddings.embed_documents)
+
+    def embed_query(self, text: str) -> List[float]:
+        if self.cache is None:
+            return self.embeddings.embed_query(text)
+        return self.cache.get_or_embed(self.model, self.dimensions, [text],
+                                       lambda texts: [self.embeddings.embed_query(texts[0])])[0]
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        """embed_documents in the default executor, as LangChain's Embeddings does"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_documents, texts)
+
+    async def aembed_query(self, text: str) -> List[float]:
+        """embed_query in the default executor, as LangChain's Embeddings does"""
+        return await asyncio.get_running_loop().run_in_executor(None, self.embed_query, text)
+
+    def stats(self) -> Dict[str, float]:
+        """The cache's stats, empty without a cache"""
+        return self.cache.stats() if self.cache is not None else {}
@@ -0,0 +1,236 @@
+"""
+Batched, concurrent embedding client shared by the vectordb examples.
+
+EmbeddingClient.embed(texts) packs the texts into as few requests as the
+API limits allow (inputs and estimated tokens per request), keeps up to
+max_concurrency of them in flight on a thread pool, waits on a
+requests/tokens-per-minute budget before each request and retries
+throttled or failed requests with exponential backoff. Vectors come back
+in input order.
+
+The client is transport-agnostic: embed_batch maps a list of texts to
+their vectors in one request. openai_embed_batch wraps an OpenAI SDK
+client; http_embed_batch talks to any OpenAI-compatible /embeddings
+endpoint with the standard library only, e.g. the local stand-in server
+in embedding_server.
+
+With cache=EmbeddingCache(...) (see embedding_cache), embed() looks every
+text up in the persistent cache first and only requests the distinct
+texts it has never seen, then stores their vectors.
+"""
+import json
+import math
+import random
+import threading
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, List, Sequence
+
+# OpenAI's per-request limits for the embeddings endpoint
+MAX_BATCH_SIZE = 2048
+MAX_BATCH_TOKENS = 300_000
+# Smallest request worth splitting a call into to keep several requests in flight
+MIN_BATCH_SIZE = 64
+RETRYABLE_STATUS = (408, 409, 429, 500, 502, 503, 504)
+
+EmbedBatch = Callable[[List[str]], List[List[float]]]
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count (~4 characters per token), enough for request and rate budgets"""
+    return len(text) // 4 + 1
+
+
+class RateLimiter:
+    """
+    Requests- and tokens-per-minute budget shared by every request thread.
+
+    Both budgets refill continuously; acquire() blocks until one request of
+    n_tokens fits in both. None disables a budget.
+    """
+
+    def __init__(self, requests_per_minute: float = None, tokens_per_minute: float = None):
+        self.limits = {"requests": requests_per_minute, "tokens": tokens_per_minute}
+        # Start with a full minute of budget, like the API's own windows
+        self.available = {name: limit for name, limit in self.limits.items() if limit}
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self, n_tokens: int = 0) -> float:
+        """Wait until the request fits; returns the seconds spent waiting"""
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill()
+                needed = {"requests": 1, "tokens": n_tokens}
+                # A request larger than a whole minute's budget goes through once the budget is full
+                shortfall = max((min(needed[name], self.limits[name]) - available) / self.limits[name] * 60
+                                for name, available in self.available.items()) if self.available else 0
+                if shortfall <= 0:
+                    for name in self.available:
+                        self.available[name] -= needed[name]
+                    return waited
+            time.sleep(shortfall)
+            waited += shortfall
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        elapsed, self.updated = now - self.updated, now
+        for name in self.available:
+            limit = self.limits[name]
+            self.available[name] = min(limit, self.available[name] + elapsed * limit / 60)
+
+
+class EmbeddingClient:
+    """
+    Embed many texts with batched, concurrent, rate-limited requests.
+
+    Each embed() call is split into requests of at most max_batch_size
+    texts and max_batch_tokens estimated tokens; a call smaller than
+    max_concurrency full requests is split evenly (down to MIN_BATCH_SIZE
+    texts) so that several requests still run at once.
+
+    model and dimensions key the cache; they default to the attributes
+    openai_embed_batch and http_embed_batch set on their embed_batch.
+    """
+
+    def __init__(self, embed_batch: EmbedBatch, max_batch_size: int = MAX_BATCH_SIZE,
+                 max_batch_tokens: int = MAX_BATCH_TOKENS, max_concurrency: int = 4,
+                 requests_per_minute: float = None, tokens_per_minute: float = None,
+                 max_retries: int = 6, backoff_seconds: float = 0.5, cache=None,
+                 model: str = None, dimensions: int = None):
+        if max_batch_size < 1 or max_concurrency < 1:
+            raise ValueError("max_batch_size and max_concurrency must be at least 1")
+        self.embed_batch = embed_batch
+        self.cache = cache
+        self.model = model or getattr(embed_batch, "model", None)
+        self.dimensions = dimensions or getattr(embed_batch, "dimensions", None)
+        if cache is not None and not self.model:
+            raise ValueError("model is required to key the embedding cache")
+        self.max_batch_size = max_batch_size
+        self.max_batch_tokens = max_batch_tokens
+        self.max_concurrency = max_concurrency
+        self.max_retries = max_retries
+        self.backoff_seconds = backoff_seconds
+        self.rate_limiter = RateLimiter(requests_per_minute, tokens_per_minute)
+        self._pool = ThreadPoolExecutor(max_workers=max_concurrency, thread_name_prefix="embedding")
+        self._stats_lock = threading.Lock()
+        self._stats = {"texts": 0, "requests": 0, "retries": 0, "rate_limited_seconds": 0.0}
+
+    def embed(self, texts: Sequence[str]) -> List[List[float]]:
+        """Vectors for texts, in input order"""
+        texts = list(texts)
+        if self.cache is not None:
+            return self.cache.get_or_embed(self.model, self.dimensions, texts, self._embed)
+        return self._embed(texts)
+
+    def _embed(self, texts: List[str]) -> List[List[float]]:
+        if not texts:
+            return []
+        batches = self._batches(texts)
+        vectors: List[List[float]] = [None] * len(texts)
+        futures = [(start, self._pool.submit(self._request, texts[start:end])) for start, end in batches]
+        for start, future in futures:
+            batch_vectors = future.result()
+            vectors[start:start + len(batch_vectors)] = batch_vectors
+        with self._stats_lock:
+            self._stats["texts"] += len(texts)
+        return vectors
+
+    def embed_one(self, text: str) -> List[float]:
+        return self.embed([text])[0]
+
+    def stats(self) -> Dict[str, float]:
+        """
+        Texts embedded, requests sent, retries and seconds spent waiting on the
+        rate limit, plus the cache's stats prefixed with cache_ when there is one
+        """
+        with self._stats_lock:
+            stats = dict(self._stats)
+        if self.cache is not None:
+            stats.update({f"cache_{name}": value for name, value in self.cache.stats().items()})
+        return stats
+
+    def close(self, close_cache: bool = False) -> None:
+        """Stop the request threads; the cache is left open unless close_cache, as it may be shared"""
+        self._pool.shutdown(wait=True)
+        if close_cache and self.cache is not None:
+            self.cache.close()
+
+    def _batches(self, texts: List[str]) -> List[tuple]:
+        """(start, end) spans of texts, one per request"""
+        target = self.max_batch_size
+        if len(texts) < self.max_batch_size * self.max_concurrency:
+            per_request = math.ceil(len(texts) / self.max_concurrency)
+            target = min(self.max_batch_size, max(per_request, MIN_BATCH_SIZE))
+        spans, start, tokens = [], 0, 0
+        for i, text in enumerate(texts):
+            n_tokens = estimate_tokens(text)
+            if i > start and (i - start >= target or tokens + n_tokens > self.max_batch_tokens):
+                spans.append((start, i))
+                start, tokens = i, 0
+            tokens += n_tokens
+        spans.append((start, len(texts)))
+        return spans
+
+    def _request(self, batch: List[str]) -> List[List[float]]:
+        n_tokens = sum(estimate_tokens(text) for text in batch)
+        for attempt in range(self.max_retries + 1):
+            waited = self.rate_limiter.acquire(n_tokens)
+            with self._stats_lock:
+                self._stats["requests"] += 1
+                self._stats["rate_limited_seconds"] += waited
+            try:
+                vectors = self.embed_batch(batch)
+            except Exception as e:
+                if attempt == self.max_retries or not is_retryable(e):
+                    raise
+                with self._stats_lock:
+                    self._stats["retries"] += 1
+                # Exponential backoff with jitter, so throttled threads don't retry in lockstep
+                time.sleep(self.backoff_seconds * 2 ** attempt * (0.5 + random.random()))
+                continue
+            if len(vectors) != len(batch):
+                raise ValueError(f"Embedding request for {len(batch)} texts returned {len(vectors)} vectors")
+            return vectors
+
+
+def is_retryable(error: Exception) -> bool:
+    """Throttling, server errors and connection failures are retried; bad requests are not"""
+    status = getattr(error, "status_code", None) or getattr(error, "code", None)
+    if isinstance(status, int):
+        return status in RETRYABLE_STATUS
+    return isinstance(error, (ConnectionError, TimeoutError, urllib.error.URLError)) or \
+        type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+
+
+def openai_embed_batch(client, model: str, dimensions: int = None) -> EmbedBatch:
+    """embed_batch for an openai.OpenAI client"""
+    def embed_batch(texts: List[str]) -> List[List[float]]:
+        kwargs = {"dimensions": dimensions} if dimensions else {}
+        response = client.embeddings.create(model=model, input=texts, **kwargs)
+        return [item.embedding for item in sorted(response.data, key=lambda item: item.index)]
+    embed_batch.model, embed_batch.dimensions = model, dimensions
+    return embed_batch
+
+
+def http_embed_batch(base_url: str, model: str, api_key: str = None, dimensions: int = None,
+                     timeout: float = 60.0) -> EmbedBatch:
+    """embed_batch for an OpenAI-compatible HTTP endpoint, POSTing to {base_url}/embeddings"""
+    url = base_url.rstrip("/") + "/embeddings"
+    headers = {"Content-Type": "application/json"}
+    if api_key:
+        headers["Authorization"] = f"Bearer {api_key}"
+
+    def embed_batch(texts: List[str]) -> List[List[float]]:
+        body = {"model": model, "input": texts}
+        if dimensions:
+            body["dimensions"] = dimensions
+        request = urllib.request.Request(url, data=json.dumps(body).encode(), headers=headers, method="POST")
+        with urllib.request.urlopen(request, timeout=timeout) as response:
+            data = json.load(response)["data"]
+        return [item["embedding"] for item in sorted(data, key=lambda item: item["index"])]
+    embed_batch.model, embed_batch.dimensions = model, dimensions
+    return embed_batch
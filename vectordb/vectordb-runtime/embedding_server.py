@@ -0,0 +1,172 @@
+"""
+Local stand-in for an OpenAI-compatible embeddings endpoint.
+
+StandInEmbeddingServer answers POST /embeddings (and /v1/embeddings) on
+localhost with deterministic hashing embeddings after a simulated network
+and model latency, so ingestion code and EmbeddingClient can be tested and
+benchmarked offline. It records requests, batch sizes and the peak number
+of requests in flight, can reject oversized batches like the real API, and
+can throttle the first requests with HTTP 429.
+
+Throughput of one request per text vs. EmbeddingClient:
+
+    python embedding_server.py --texts 5000 --latency-ms 50
+"""
+import argparse
+import json
+import re
+import threading
+import time
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, List
+
+import numpy as np
+
+from embedding_client import MAX_BATCH_SIZE, EmbeddingClient, http_embed_batch
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def hash_embedding(text: str, dim: int) -> List[float]:
+    """Signed crc32 feature hashing of the lowercased tokens, L2-normalized"""
+    vector = np.zeros(dim, dtype="float32")
+    for token in _TOKEN.findall(text.lower()):
+        h = zlib.crc32(token.encode())
+        vector[h % dim] += 1.0 if (h >> 31) & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class StandInEmbeddingServer:
+    """
+    Embeddings server on 127.0.0.1 and a free port, as a context manager.
+
+    Each request takes latency + per_text_latency * len(input) seconds.
+    Requests with more than max_batch_size inputs get HTTP 400, and the
+    first throttle_first requests get HTTP 429. Results are returned in
+    reverse order, with their index, as clients must not rely on order.
+    """
+
+    def __init__(self, dim: int = 64, latency: float = 0.05, per_text_latency: float = 0.0,
+                 max_batch_size: int = MAX_BATCH_SIZE, throttle_first: int = 0):
+        self.dim = dim
+        self.latency = latency
+        self.per_text_latency = per_text_latency
+        self.max_batch_size = max_batch_size
+        self.throttle_first = throttle_first
+        self.batch_sizes: List[int] = []
+        self.throttled = 0
+        self.max_in_flight = 0
+        self._in_flight = 0
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), self._handler())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address
+        return f"http://{host}:{port}/v1"
+
+    def start(self) -> "StandInEmbeddingServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self) -> "StandInEmbeddingServer":
+        return self.start()
+
+    def __exit__(self, *exc_info) -> None:
+        self.stop()
+
+    def _respond(self, body: Dict) -> tuple:
+        """(status, response body) for one request body"""
+        texts = body.get("input")
+        texts = [texts] if isinstance(texts, str) else texts
+        if not texts or len(texts) > self.max_batch_size:
+            return 400, {"error": {"message": f"input must hold 1 to {self.max_batch_size} texts"}}
+        with self._lock:
+            if self.throttled < self.throttle_first:
+                self.throttled += 1
+                return 429, {"error": {"message": "Rate limit reached"}}
+            self._in_flight += 1
+            self.max_in_flight = max(self.max_in_flight, self._in_flight)
+        try:
+            time.sleep(self.latency + self.per_text_latency * len(texts))
+            dim = body.get("dimensions") or self.dim
+            data = [{"object": "embedding", "index": i, "embedding": hash_embedding(text, dim)}
+                    for i, text in enumerate(texts)]
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.batch_sizes.append(len(texts))
+        return 200, {"object": "list", "data": data[::-1], "model": body.get("model"),
+                     "usage": {"prompt_tokens": 0, "total_tokens": 0}}
+
+    def _handler(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                if self.path.rstrip("/") not in ("/embeddings", "/v1/embeddings"):
+                    self.send_error(404)
+                    return
+                body = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+                status, response = server._respond(body)
+                payload = json.dumps(response).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+
+def benchmark(n_texts: int, latency: float, per_text_latency: float, max_batch_size: int,
+              concurrency: int, serial_sample: int = 200) -> Dict[str, float]:
+    """Texts per second of one request per text (on a sample) vs. EmbeddingClient on all texts"""
+    texts = [f"Product {i}: a durable item number {i % 97} for everyday use" for i in range(n_texts)]
+    with StandInEmbeddingServer(latency=latency, per_text_latency=per_text_latency) as server:
+        embed_batch = http_embed_batch(server.url, "stand-in")
+        sample = texts[:min(serial_sample, n_texts)]
+        start = time.perf_counter()
+        for text in sample:
+            embed_batch([text])
+        serial = len(sample) / (time.perf_counter() - start)
+
+        client = EmbeddingClient(embed_batch, max_batch_size=max_batch_size, max_concurrency=concurrency)
+        start = time.perf_counter()
+        client.embed(texts)
+        batched = n_texts / (time.perf_counter() - start)
+        requests = client.stats()["requests"]
+        client.close()
+
+    print(f"{n_texts} texts, {latency * 1000:.0f} ms + {per_text_latency * 1000:.2f} ms/text per request")
+    print(f"one request per text: {serial:10.1f} texts/s")
+    print(f"EmbeddingClient:      {batched:10.1f} texts/s ({requests} requests, "
+          f"max {max_batch_size} texts, {concurrency} in flight), {batched / serial:.0f}x")
+    return {"serial_texts_per_second": serial, "batched_texts_per_second": batched, "requests": requests}
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Embedding throughput against a local stand-in server")
+    parser.add_argument("--texts", type=int, default=5000)
+    parser.add_argument("--latency-ms", type=float, default=50.0, help="fixed latency per request")
+    parser.add_argument("--per-text-ms", type=float, default=0.05, help="added latency per text in a request")
+    parser.add_argument("--batch-size", type=int, default=MAX_BATCH_SIZE)
+    parser.add_argument("--concurrency", type=int, default=4)
+    args = parser.parse_args(argv)
+    benchmark(args.texts, args.latency_ms / 1000, args.per_text_ms / 1000, args.batch_size, args.concurrency)
+
+
+if __name__ == "__main__":
+    main()
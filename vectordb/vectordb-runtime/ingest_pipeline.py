@@ -0,0 +1,160 @@
+"""
+Staged, streaming ingestion pipeline shared by the vectordb examples' loaders.
+
+run_pipeline(source, stages) runs read -> embed -> upsert (or any chain of
+stages) on their own threads, connected by bounded queues: while one batch
+is being upserted the next one is being embedded and the one after that is
+being read. At most queue_size batches wait between two stages, so memory
+is bounded by the batch size and not by the size of the dataset. A stage
+may run several workers, e.g. for concurrent upsert requests; batches then
+reach the next stage out of order.
+
+Every stage counts batches, rows, busy seconds (inside the stage) and
+seconds spent blocked on an empty input or a full output queue. The stage
+with the most busy seconds per worker is the bottleneck: the others wait on it.
+"""
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Sequence
+
+DEFAULT_QUEUE_SIZE = 2
+# How often blocked threads check whether another stage failed
+_POLL_SECONDS = 0.1
+_DONE = object()
+
+
+class Stage(NamedTuple):
+    """One step of the pipeline: fn maps a batch to the next stage's batch (the last stage's result is dropped)"""
+    name: str
+    fn: Callable[[Any], Any]
+    workers: int = 1
+
+
+def run_pipeline(source: Iterable, stages: Sequence[Stage], queue_size: int = DEFAULT_QUEUE_SIZE,
+                 source_name: str = "read", rows: Callable[[Any], int] = len) -> Dict[str, Any]:
+    """
+    Stream the batches of source through stages; returns the counters.
+
+    rows(batch) counts the rows of a source batch (len by default). The first
+    error raised by the source or a stage stops every stage and is re-raised.
+    """
+    stages = [Stage(*stage) for stage in stages]
+    if not stages or any(stage.workers < 1 for stage in stages) or queue_size < 1:
+        raise ValueError("run_pipeline needs at least one stage, and workers and queue_size of at least 1")
+    # inputs[i] feeds stages[i]; items are (rows, batch)
+    inputs = [queue.Queue(maxsize=queue_size) for _ in stages]
+    counters = {name: {"workers": workers, "batches": 0, "rows": 0, "busy_seconds": 0.0, "waiting_seconds": 0.0}
+                for name, workers in [(source_name, 1)] + [(stage.name, stage.workers) for stage in stages]}
+    running = [stage.workers for stage in stages]
+    stop = threading.Event()
+    errors: List[BaseException] = []
+    lock = threading.Lock()
+
+    def count(name: str, **increments) -> None:
+        with lock:
+            for field, value in increments.items():
+                counters[name][field] += value
+
+    def put(q: queue.Queue, item, name: str) -> None:
+        start = time.perf_counter()
+        while not stop.is_set():
+            try:
+                q.put(item, timeout=_POLL_SECONDS)
+                break
+            except queue.Full:
+                continue
+        count(name, waiting_seconds=time.perf_counter() - start)
+
+    def get(q: queue.Queue, name: str):
+        start = time.perf_counter()
+        item = _DONE
+        while not stop.is_set():
+            try:
+                item = q.get(timeout=_POLL_SECONDS)
+                break
+            except queue.Empty:
+                continue
+        count(name, waiting_seconds=time.perf_counter() - start)
+        return item
+
+    def fail(error: BaseException) -> None:
+        with lock:
+            errors.append(error)
+        stop.set()
+
+    def finish(i: int) -> None:
+        """Tell every worker of stage i that no more batches are coming"""
+        for _ in range(stages[i].workers):
+            put(inputs[i], _DONE, stages[i].name)
+
+    def read() -> None:
+        try:
+            batches = iter(source)
+            while not stop.is_set():
+                start = time.perf_counter()
+                try:
+                    batch = next(batches)
+                except StopIteration:
+                    break
+                n_rows = rows(batch)
+                count(source_name, batches=1, rows=n_rows, busy_seconds=time.perf_counter() - start)
+                put(inputs[0], (n_rows, batch), source_name)
+        except BaseException as e:
+            fail(e)
+        finally:
+            finish(0)
+
+    def work(i: int) -> None:
+        stage, last = stages[i], i == len(stages) - 1
+        try:
+            while True:
+                item = get(inputs[i], stage.name)
+                if item is _DONE:
+                    break
+                n_rows, batch = item
+                start = time.perf_counter()
+                result = stage.fn(batch)
+                count(stage.name, batches=1, rows=n_rows, busy_seconds=time.perf_counter() - start)
+                if not last:
+                    put(inputs[i + 1], (n_rows, result), stage.name)
+        except BaseException as e:
+            fail(e)
+        finally:
+            with lock:
+                running[i] -= 1
+                last_worker = running[i] == 0
+            if last_worker and not last:
+                finish(i + 1)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=read, name=f"pipeline-{source_name}", daemon=True)]
+    threads += [threading.Thread(target=work, args=(i,), name=f"pipeline-{stage.name}-{n}", daemon=True)
+                for i, stage in enumerate(stages) for n in range(stage.workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    if errors:
+        raise errors[0]
+
+    seconds = time.perf_counter() - start
+    for stage in counters.values():
+        # What the stage could sustain on its own: rows per busy second of each worker, times the workers
+        stage["rows_per_second"] = stage["rows"] * stage["workers"] / stage["busy_seconds"] \
+            if stage["busy_seconds"] else 0.0
+    n_rows = counters[stages[-1].name]["rows"]
+    return {"rows": n_rows, "seconds": seconds, "rows_per_second": n_rows / seconds if seconds else 0.0,
+            "bottleneck": max(counters, key=lambda name: counters[name]["busy_seconds"] / counters[name]["workers"]),
+            "stages": counters}
+
+
+def format_pipeline_stats(stats: Dict[str, Any]) -> str:
+    """One summary line plus one line per stage"""
+    lines = [f"{stats['rows']} rows in {stats['seconds']:.2f} s ({stats['rows_per_second']:.0f} rows/s), "
+             f"bottleneck: {stats['bottleneck']}"]
+    for name, stage in stats["stages"].items():
+        lines.append(f"  {name:<8} {stage['batches']:6d} batches {stage['rows']:9d} rows  "
+                     f"busy {stage['busy_seconds']:7.2f} s  waiting {stage['waiting_seconds']:7.2f} s  "
+                     f"{stage['rows_per_second']:9.0f} rows/s x {stage['workers']} worker(s)")
+    return "\n".join(lines)
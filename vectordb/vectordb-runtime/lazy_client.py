@@ -0,0 +1,72 @@
+"""
+Lazily created, reusable clients shared by the vectordb examples.
+
+Importing an example module must not open connections, list or create
+indexes or start threads: workers and tests import it just to reach a
+function or a constant. LazyClient(factory) holds the factory instead of the
+client. connect() calls it on first use, once even if several threads race
+for it, and returns the same client afterwards; close() releases the client,
+and the next use connects again.
+
+Attributes are forwarded to the connected client, so a module-level
+`milvus_client = LazyClient(...)` is used exactly like the client it
+replaces, and the first call through it connects.
+"""
+import threading
+from typing import Any, Callable, Generic, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+def close_client(client: Any) -> None:
+    """Default closer: the client's close() method, if it has one"""
+    close = getattr(client, "close", None)
+    if callable(close):
+        close()
+
+
+class LazyClient(Generic[T]):
+    """A client created by factory() on first use and released by close(); see the module docstring"""
+
+    def __init__(self, factory: Callable[[], T], close: Callable[[T], None] = close_client, name: str = None):
+        self._factory = factory
+        self._close = close
+        self._name = name or getattr(factory, "__name__", "client")
+        self._client: Optional[T] = None
+        self._lock = threading.Lock()
+
+    @property
+    def connected(self) -> bool:
+        return self._client is not None
+
+    def connect(self) -> T:
+        """The client, created by the factory if there is none yet"""
+        client = self._client
+        if client is None:
+            with self._lock:
+                if self._client is None:
+                    self._client = self._factory()
+                client = self._client
+        return client
+
+    def close(self) -> None:
+        """Release the client, if one was created; the next use connects again"""
+        with self._lock:
+            client, self._client = self._client, None
+        if client is not None:
+            self._close(client)
+
+    def __getattr__(self, name: str) -> Any:
+        # Only reached for names LazyClient itself doesn't define
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return getattr(self.connect(), name)
+
+    def __enter__(self) -> T:
+        return self.connect()
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def __repr__(self) -> str:
+        return f"LazyClient({self._name}, {'connected' if self.connected else 'not connected'})"
@@ -0,0 +1,85 @@
+import threading
+import time
+import unittest
+
+import pyarrow as pa
+
+from batch_server import StandInBatchServer, http_write_batch
+from batch_writer import BatchWriter, FailedObject, format_batch_stats
+from catalog_generator import generate_block
+
+
+def products(n_rows):
+    return pa.table(generate_block(seed=1, block_no=0, n_rows=n_rows)).to_pylist()
+
+
+class TestBatchWriter(unittest.TestCase):
+    """Tests for the dynamically sized batch writer, against the local stand-in server"""
+
+    def test_1_every_object_is_written_with_bounded_concurrency(self):
+        catalog = products(2000)
+        with StandInBatchServer(latency=0.01, per_object_latency=0.0001, workers=4) as server:
+            writer = BatchWriter(http_write_batch(server.url, "Product"), max_concurrency=3)
+            stats = writer.write(catalog)
+        self.assertEqual(sorted(server.objects), sorted(product["product_id"] for product in catalog))
+        self.assertEqual(server.objects[catalog[0]["product_id"]], catalog[0])
+        self.assertEqual((stats["objects"], stats["failed"], writer.failed), (2000, 0, []))
+        self.assertEqual(stats["batches"], len(server.batch_sizes))
+        self.assertLessEqual(server.max_in_flight, 3)
+        self.assertIn("2000 objects", format_batch_stats(stats))
+
+    def test_2_batch_size_follows_server_latency(self):
+        """Batches grow to ~target_latency worth of objects, and shrink when the server slows down"""
+        per_object = [0.0005]
+        sizes = []
+
+        def write_batch(objects):
+            sizes.append(len(objects))
+            time.sleep(per_object[0] * len(objects))
+            return {}
+
+        writer = BatchWriter(write_batch, max_concurrency=1, target_latency=0.05, batch_size=10, max_batch_size=500)
+        writer.write(range(3000))
+        # 0.05 s / 0.5 ms per object = ~100 objects, reached by doubling from 10; the second batch is
+        # filled while the first is in flight
+        self.assertEqual(sizes[:4], [10, 10, 20, 40])
+        self.assertTrue(60 <= writer.batch_size <= 110, writer.batch_size)
+
+        per_object[0] = 0.005
+        writer.write(range(300))
+        self.assertTrue(10 <= writer.batch_size <= 20, writer.batch_size)
+
+    def test_3_failed_objects_are_collected_for_retry(self):
+        catalog = products(500)
+        with StandInBatchServer(latency=0.0, per_object_latency=0.0, fail_every=50) as server:
+            writer = BatchWriter(http_write_batch(server.url, "Product"), max_concurrency=2)
+            stats = writer.write(catalog)
+            self.assertEqual(stats["failed"], 10)
+            self.assertEqual(len(writer.failed), 10)
+            self.assertEqual(writer.failed[0].error, "vectorizer timed out")
+            self.assertEqual(len(server.objects), 490)
+
+            # The stand-in rejects an object only once, so one retry stores them all
+            stats = writer.retry_failed()
+            self.assertEqual((stats["objects"], stats["failed"], writer.failed), (10, 0, []))
+        self.assertEqual(len(server.objects), 500)
+
+    def test_4_a_failed_request_fails_its_whole_batch(self):
+        lock, calls = threading.Lock(), []
+
+        def write_batch(objects):
+            with lock:
+                calls.append(objects)
+            if objects[0] == 0:
+                raise ConnectionError("connection reset")
+            return {}
+
+        writer = BatchWriter(write_batch, batch_size=10, min_batch_size=10, max_batch_size=10)
+        stats = writer.write(range(30))
+        self.assertEqual((stats["objects"], stats["failed"]), (30, 10))
+        self.assertEqual(writer.failed[0], FailedObject(0, "ConnectionError: connection reset"))
+        self.assertEqual([failure.object for failure in writer.failed], list(range(10)))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,105 @@
+import importlib.util
+import unittest
+
+import numpy as np
+
+from catalog_filters import (Comparison, Logical, parse_filter, to_chroma_where, to_milvus_expr,
+                             to_numpy_predicate, to_pinecone_filter, to_qdrant_filter, to_weaviate_filter)
+
+LAPTOPS_UNDER_1000 = {"category": "Laptop", "price": {"$lte": 1000.0}}
+NESTED = {"$or": [{"category": {"$in": ["Book", "Watch"]}},
+                  {"$and": [{"in_stock": True}, {"price": {"$gt": 10, "$lt": 20.5}}]}]}
+
+
+class ArrayColumns:
+    """Plain NumPy columns with the column()/encode_value() interface the predicates read"""
+
+    def __init__(self, **columns):
+        self.columns = {name: np.asarray(values) for name, values in columns.items()}
+
+    def column(self, field):
+        return self.columns[field]
+
+    def encode_value(self, field, value):
+        return value
+
+
+class TestCatalogFilters(unittest.TestCase):
+    """Tests for the filter language shared by the vectordb examples"""
+
+    def test_1_parse_normalizes_shorthand(self):
+        """Bare values are $eq and several keys in one dict are AND-ed"""
+        self.assertEqual(parse_filter(LAPTOPS_UNDER_1000),
+                         Logical("$and", [Comparison("category", "$eq", "Laptop"),
+                                          Comparison("price", "$lte", 1000.0)]))
+        self.assertEqual(parse_filter({"$and": [{"in_stock": False}]}), Comparison("in_stock", "$eq", False))
+
+    def test_2_parse_rejects_invalid_filters(self):
+        for filters in ({}, [], {"$not": [{"price": 1}]}, {"$and": []}, {"price": {"$like": 1}},
+                        {"price": {"$in": 5}}, {"price": {"$in": []}}, {"category": {"$gt": "Book"}},
+                        {"price": {"$eq": [1, 2]}}, {"price or 1": 1}, {"price": {}}):
+            with self.subTest(filters=filters):
+                with self.assertRaises(ValueError):
+                    parse_filter(filters)
+
+    def test_3_chroma_and_pinecone_dicts(self):
+        """One operator per dict, logical operators explicit"""
+        expected = {"$and": [{"category": {"$eq": "Laptop"}}, {"price": {"$lte": 1000.0}}]}
+        self.assertEqual(to_chroma_where(LAPTOPS_UNDER_1000), expected)
+        self.assertEqual(to_pinecone_filter(LAPTOPS_UNDER_1000), expected)
+        self.assertEqual(to_chroma_where(NESTED), {"$or": [
+            {"category": {"$in": ["Book", "Watch"]}},
+            {"$and": [{"in_stock": {"$eq": True}}, {"price": {"$gt": 10}}, {"price": {"$lt": 20.5}}]}]})
+
+    @unittest.skipUnless(importlib.util.find_spec("chromadb"), "chromadb is not installed")
+    def test_4_chroma_accepts_compiled_where(self):
+        from chromadb.api.types import validate_where
+
+        for filters in (LAPTOPS_UNDER_1000, NESTED, {"price": {"$nin": [1.0, 2.0]}}):
+            with self.subTest(filters=filters):
+                validate_where(to_chroma_where(filters))
+
+    def test_5_milvus_expression(self):
+        self.assertEqual(to_milvus_expr(LAPTOPS_UNDER_1000), '(category == "Laptop") and (price <= 1000.0)')
+        self.assertEqual(to_milvus_expr(NESTED),
+                         '(category in ["Book", "Watch"]) or '
+                         '((in_stock == true) and (price > 10) and (price < 20.5))')
+        self.assertEqual(to_milvus_expr({"name": {"$ne": 'Say "hi"'}}), r'name != "Say \"hi\""')
+        self.assertEqual(to_milvus_expr({"category": {"$nin": ["Book"]}}), 'category not in ["Book"]')
+
+    def test_6_numpy_predicate_matches_python(self):
+        """The vectorized predicate selects the rows a per-row Python check does"""
+        rng = np.random.default_rng(0)
+        rows = {"category": rng.choice(["Book", "Watch", "Laptop"], 500),
+                "price": rng.uniform(0, 40, 500).round(1), "in_stock": rng.random(500) < 0.5}
+        mask = to_numpy_predicate(NESTED)(ArrayColumns(**rows))
+
+        expected = [c in ("Book", "Watch") or (s and 10 < p < 20.5)
+                    for c, p, s in zip(rows["category"], rows["price"], rows["in_stock"])]
+        np.testing.assert_array_equal(mask, expected)
+        not_books = to_numpy_predicate({"category": {"$nin": ["Book"]}, "price": {"$gte": 20.0}})
+        np.testing.assert_array_equal(not_books(ArrayColumns(**rows)),
+                                      (rows["category"] != "Book") & (rows["price"] >= 20.0))
+
+    @unittest.skipUnless(importlib.util.find_spec("qdrant_client"), "qdrant-client is not installed")
+    def test_7_qdrant_filter(self):
+        from qdrant_client.http import models
+
+        qdrant_filter = to_qdrant_filter(LAPTOPS_UNDER_1000)
+        self.assertEqual(qdrant_filter, models.Filter(must=[
+            models.FieldCondition(key="category", match=models.MatchValue(value="Laptop")),
+            models.FieldCondition(key="price", range=models.Range(lte=1000.0))]))
+        self.assertIsInstance(to_qdrant_filter(NESTED), models.Filter)
+
+    @unittest.skipUnless(importlib.util.find_spec("weaviate"), "weaviate-client is not installed")
+    def test_8_weaviate_filter(self):
+        from weaviate.classes.query import Filter
+
+        self.assertEqual(repr(to_weaviate_filter(LAPTOPS_UNDER_1000)),
+                         repr(Filter.all_of([Filter.by_property("category").equal("Laptop"),
+                                             Filter.by_property("price").less_or_equal(1000.0)])))
+        to_weaviate_filter(NESTED)
+
+
+if __name__ == "__main__":
+    unittest.main()
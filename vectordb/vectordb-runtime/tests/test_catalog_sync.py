@@ -0,0 +1,108 @@
+import os
+import tempfile
+import unittest
+
+import pyarrow as pa
+
+from catalog_generator import generate_block
+from catalog_reader import CATALOG_SCHEMA, read_catalog
+from catalog_sync import CatalogSync, read_manifest, remove_manifest
+
+
+def sync(manifest_path, catalog, batch_size=100):
+    """Run one sync; returns (synced rows, deleted ids, stats)"""
+    catalog_sync = CatalogSync(manifest_path)
+    batches = list(catalog_sync.changed_batches(catalog, batch_size=batch_size))
+    deleted = catalog_sync.deleted_ids()
+    catalog_sync.commit()
+    rows = pa.Table.from_batches(batches, schema=CATALOG_SCHEMA).to_pylist()
+    return rows, deleted, catalog_sync.stats()
+
+
+class TestCatalogSync(unittest.TestCase):
+    """Tests for the row-hash manifest diff behind the loaders' incremental sync"""
+
+    def setUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.manifest = os.path.join(self.dir.name, "manifest.arrow")
+        self.catalog = pa.table(generate_block(seed=1, block_no=0, n_rows=1000))
+
+    def tearDown(self):
+        self.dir.cleanup()
+
+    def test_1_first_sync_loads_everything_and_a_rerun_nothing(self):
+        rows, deleted, stats = sync(self.manifest, self.catalog)
+        self.assertEqual(rows, read_catalog(self.catalog).to_pylist())
+        self.assertEqual((deleted, stats["new"]), ([], 1000))
+        self.assertEqual(read_manifest(self.manifest).num_rows, 1000)
+
+        rows, deleted, stats = sync(self.manifest, self.catalog)
+        self.assertEqual((rows, deleted), ([], []))
+        self.assertEqual(stats, {"rows": 1000, "new": 0, "changed": 0, "unchanged": 1000, "deleted": 0})
+
+    def test_2_only_changed_new_and_removed_rows_are_synced(self):
+        sync(self.manifest, self.catalog)
+        prices = self.catalog.column("price").to_pylist()
+        prices[10] += 1
+        stock = self.catalog.column("in_stock").to_pylist()
+        stock[20] = not stock[20]
+        updated = self.catalog.set_column(4, "price", pa.array(prices)).set_column(5, "in_stock", pa.array(stock))
+        # Drop the last two products, add one
+        updated = pa.concat_tables([updated.slice(0, 998), pa.table(generate_block(seed=2, block_no=0, n_rows=1))
+                                    .set_column(0, "product_id", pa.array(["prod_new"]))])
+
+        rows, deleted, stats = sync(self.manifest, updated)
+        ids = self.catalog.column("product_id").to_pylist()
+        self.assertEqual([row["product_id"] for row in rows], [ids[10], ids[20], "prod_new"])
+        self.assertEqual(rows[0]["price"], prices[10])
+        self.assertEqual(sorted(deleted), sorted(ids[998:]))
+        self.assertEqual(stats, {"rows": 999, "new": 1, "changed": 2, "unchanged": 996, "deleted": 2})
+        self.assertEqual(sorted(read_manifest(self.manifest).column("product_id").to_pylist()),
+                         sorted(ids[:998] + ["prod_new"]))
+
+    def test_3_changed_rows_are_rebatched(self):
+        """Sparse changes across many read batches reach the loader in full batches"""
+        sync(self.manifest, self.catalog, batch_size=10)
+        descriptions = self.catalog.column("description").to_pylist()
+        for i in range(0, 1000, 20):
+            descriptions[i] += " (refurbished)"
+        rows_changed = self.catalog.set_column(2, "description", pa.array(descriptions))
+
+        catalog_sync = CatalogSync(self.manifest)
+        sizes = [batch.num_rows for batch in catalog_sync.changed_batches(rows_changed, batch_size=10)]
+        self.assertEqual(sizes, [10] * 5)
+
+    def test_4_manifest_is_kept_until_commit(self):
+        """A failed load leaves the old manifest, so the next run retries the same changes"""
+        sync(self.manifest, self.catalog)
+        catalog_sync = CatalogSync(self.manifest)
+        with self.assertRaises(RuntimeError):
+            catalog_sync.deleted_ids()
+        list(catalog_sync.changed_batches(self.catalog.slice(0, 10)))
+        self.assertEqual(len(catalog_sync.deleted_ids()), 990)
+        self.assertEqual(read_manifest(self.manifest).num_rows, 1000)
+
+        remove_manifest(self.manifest)
+        rows, _, _ = sync(self.manifest, self.catalog.slice(0, 10))
+        self.assertEqual(len(rows), 10)
+        self.assertEqual(read_manifest(self.manifest).num_rows, 10)
+
+    def test_5_empty_catalog_deletes_everything(self):
+        """An empty feed deletes every product and leaves an empty manifest, so a re-sync is a no-op"""
+        sync(self.manifest, self.catalog)
+        empty = self.catalog.slice(0, 0)
+        rows, deleted, stats = sync(self.manifest, empty)
+        self.assertEqual(rows, [])
+        self.assertEqual(sorted(deleted), sorted(self.catalog.column("product_id").to_pylist()))
+        self.assertEqual(read_manifest(self.manifest).num_rows, 0)
+
+        rows, deleted, stats = sync(self.manifest, empty)
+        self.assertEqual((rows, deleted), ([], []))
+        self.assertEqual(stats, {"rows": 0, "new": 0, "changed": 0, "unchanged": 0, "deleted": 0})
+
+        rows, _, stats = sync(self.manifest, self.catalog)
+        self.assertEqual(stats["new"], 1000)
+
+
+if __name__ == "__main__":
+    unittest.main()
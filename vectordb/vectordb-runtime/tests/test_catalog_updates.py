@@ -0,0 +1,39 @@
+import unittest
+
+from catalog_updates import UpdatePlan, plan_update, product_changes
+
+PRODUCT = {"product_id": "prod_001", "name": "Apple Laptop", "description": "A silver laptop",
+           "category": "Laptop", "price": 999.0, "in_stock": True}
+EMBEDDED = ("name", "description")
+
+
+class TestCatalogUpdates(unittest.TestCase):
+    """Tests for the partial-update planner shared by the vectordb examples"""
+
+    def test_1_metadata_only_changes_skip_embedding(self):
+        plan = plan_update(PRODUCT, product_changes(new_price=899.0, in_stock=False), EMBEDDED)
+        self.assertEqual(plan, UpdatePlan({"price": 899.0, "in_stock": False}, reembed=False))
+
+    def test_2_text_changes_need_embedding(self):
+        plan = plan_update(PRODUCT, product_changes(new_description="A gold laptop", new_price=899.0), EMBEDDED)
+        self.assertTrue(plan.reembed)
+        self.assertEqual(plan.changes, {"description": "A gold laptop", "price": 899.0})
+
+    def test_3_unchanged_values_are_dropped(self):
+        """Feeds resend current values; those are no-ops, not writes"""
+        plan = plan_update(PRODUCT, product_changes(new_description="A silver laptop", new_price=999.0,
+                                                    in_stock=True), EMBEDDED)
+        self.assertTrue(plan.noop)
+        self.assertFalse(plan.reembed)
+        self.assertEqual(product_changes(), {})
+        # False is a change, not a missing value
+        self.assertEqual(product_changes(in_stock=False), {"in_stock": False})
+
+    def test_4_empty_description_means_unchanged(self):
+        self.assertEqual(product_changes(new_description=""), {})
+        plan = plan_update(PRODUCT, product_changes(new_description="", new_price=899.0), EMBEDDED)
+        self.assertEqual(plan, UpdatePlan({"price": 899.0}, reembed=False))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,175 @@
+import asyncio
+import importlib.util
+import os
+import tempfile
+import unittest
+
+from embedding_cache import FILE_HEADER, RECORD_HEADER, CachedEmbeddings, EmbeddingCache
+from embedding_client import EmbeddingClient, http_embed_batch
+from embedding_server import StandInEmbeddingServer, hash_embedding
+
+TEXTS = [f"Product {i}: {'durable' if i % 2 else 'wireless'} item {i % 13} for everyday use" for i in range(300)]
+
+
+class CountingEmbeddings:
+    """LangChain-style embeddings that record the texts they are asked for"""
+
+    model = "counting"
+    dimensions = 8
+
+    def __init__(self):
+        self.requested = []
+
+    def embed_documents(self, texts):
+        self.requested.extend(texts)
+        return [hash_embedding(text, self.dimensions) for text in texts]
+
+    def embed_query(self, text):
+        return self.embed_documents([text])[0]
+
+
+class TestEmbeddingCache(unittest.TestCase):
+    """Tests for the persistent, content-addressed embedding cache"""
+
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.path = os.path.join(tmp.name, "embeddings.cache")
+
+    def _cache(self, **kwargs) -> EmbeddingCache:
+        cache = EmbeddingCache(self.path, **kwargs)
+        self.addCleanup(cache.close)
+        return cache
+
+    def test_1_vectors_persist_keyed_by_model_dimensions_and_text(self):
+        with EmbeddingCache(self.path) as cache:
+            cache.put_many("model-a", None, TEXTS[:2], [[1.0, 2.0], [3.0, 4.0]])
+            cache.put("model-a", 256, TEXTS[0], [5.0])
+
+        cache = self._cache()
+        self.assertEqual(cache.get_many("model-a", None, TEXTS[:3]), [[1.0, 2.0], [3.0, 4.0], None])
+        self.assertEqual(cache.get("model-a", 256, TEXTS[0]), [5.0])
+        self.assertIsNone(cache.get("model-b", None, TEXTS[0]))
+        stats = cache.stats()
+        self.assertEqual((stats["hits"], stats["misses"], stats["entries"]), (3, 2, 3))
+        self.assertAlmostEqual(stats["hit_rate"], 0.6)
+
+    def test_2_only_distinct_misses_are_embedded(self):
+        cache = self._cache()
+        requested = []
+
+        def embed(texts):
+            requested.append(texts)
+            return [hash_embedding(text, 4) for text in texts]
+
+        texts = TEXTS[:5] + TEXTS[:5]
+        self.assertEqual(cache.get_or_embed("m", None, texts, embed), [hash_embedding(t, 4) for t in texts])
+        self.assertEqual(requested, [TEXTS[:5]])
+        cache.get_or_embed("m", None, TEXTS[3:8], embed)
+        self.assertEqual(requested[1], TEXTS[5:8])
+
+    def test_3_client_skips_requests_for_cached_texts(self):
+        """A second ingestion of an unchanged catalog sends no requests"""
+        with StandInEmbeddingServer(dim=16, latency=0.01) as server:
+            client = EmbeddingClient(http_embed_batch(server.url, "stand-in", dimensions=16), cache=self._cache())
+            self.addCleanup(client.close)
+            first = client.embed(TEXTS)
+            requests = client.stats()["requests"]
+            second = client.embed(TEXTS[:100] + ["A brand new product"])
+
+        self.assertEqual(first, [hash_embedding(text, 16) for text in TEXTS])
+        self.assertEqual(second[:100], first[:100])
+        stats = client.stats()
+        self.assertEqual(stats["requests"], requests + 1)
+        self.assertEqual(server.batch_sizes[-1], 1)
+        self.assertEqual((stats["cache_hits"], stats["cache_misses"]), (100, 301))
+
+    def test_4_eviction_keeps_recently_used_vectors(self):
+        record_size = RECORD_HEADER.size + 4 * 8
+        cache = self._cache(max_bytes=FILE_HEADER.size + 20 * record_size)
+        vectors = [hash_embedding(text, 8) for text in TEXTS]
+        cache.put_many("m", None, TEXTS[:15], vectors[:15])
+        cache.get_many("m", None, TEXTS[:5])
+        cache.put_many("m", None, TEXTS[15:25], vectors[15:25])
+
+        # 25 records overflow 20; eviction keeps the 15 most recently used that fit in 80%
+        self.assertEqual(cache.stats()["entries"], 15)
+        self.assertEqual(cache.stats()["evictions"], 10)
+        self.assertLessEqual(os.path.getsize(self.path), cache.max_bytes)
+        self.assertNotIn(None, cache.get_many("m", None, TEXTS[:5] + TEXTS[15:25]))
+        self.assertEqual(cache.get_many("m", None, TEXTS[5:15]), [None] * 10)
+
+    def test_5_instances_sharing_a_file_see_each_others_writes(self):
+        """Two handles on one file, as two processes would have"""
+        record_size = RECORD_HEADER.size + 4 * 4
+        writer = self._cache(max_bytes=FILE_HEADER.size + 50 * record_size)
+        reader = self._cache(max_bytes=FILE_HEADER.size + 50 * record_size)
+        writer.put_many("m", None, TEXTS[:10], [hash_embedding(t, 4) for t in TEXTS[:10]])
+        self.assertEqual(reader.get_many("m", None, TEXTS[:10]), [hash_embedding(t, 4) for t in TEXTS[:10]])
+
+        # Eviction by the reader replaces the file; the writer follows it
+        reader.put_many("m", None, TEXTS[10:60], [hash_embedding(t, 4) for t in TEXTS[10:60]])
+        writer.put("m", None, "after eviction", [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(reader.get("m", None, "after eviction"), [1.0, 2.0, 3.0, 4.0])
+        self.assertEqual(reader.stats()["entries"], writer.stats()["entries"])
+
+    def test_6_partial_records_are_ignored_and_overwritten(self):
+        """A writer that crashed mid-append leaves a truncated record behind"""
+        with EmbeddingCache(self.path) as cache:
+            cache.put_many("m", None, TEXTS[:3], [[1.0] * 8] * 3)
+        with open(self.path, "ab") as f:
+            f.write(b"\x01" * (RECORD_HEADER.size + 5))
+
+        cache = self._cache()
+        self.assertEqual(cache.stats()["entries"], 3)
+        cache.put("m", None, TEXTS[3], [2.0] * 8)
+        self.assertEqual(cache.get("m", None, TEXTS[3]), [2.0] * 8)
+        self.assertEqual(self._cache().stats()["entries"], 4)
+
+    def test_7_cached_langchain_embeddings(self):
+        embeddings = CountingEmbeddings()
+        cached = CachedEmbeddings(embeddings, self._cache())
+        vectors = cached.embed_documents(TEXTS[:20])
+        self.assertEqual(cached.embed_documents(TEXTS[:20]), vectors)
+        self.assertEqual(cached.embed_query(TEXTS[0]), vectors[0])
+        self.assertEqual(embeddings.requested, TEXTS[:20])
+
+        # model is part of the key
+        other = CountingEmbeddings()
+        CachedEmbeddings(other, self._cache(), model="other-model").embed_query(TEXTS[0])
+        self.assertEqual(other.requested, TEXTS[:1])
+
+    def test_8_other_files_are_rejected(self):
+        with open(self.path, "wb") as f:
+            f.write(b"not a cache file")
+        with self.assertRaises(ValueError):
+            EmbeddingCache(self.path)
+
+    def test_9_async_methods_share_the_cache(self):
+        embeddings = CountingEmbeddings()
+        cached = CachedEmbeddings(embeddings, self._cache())
+
+        async def embed():
+            return await cached.aembed_documents(TEXTS[:20]), await cached.aembed_query(TEXTS[0])
+
+        vectors, query = asyncio.run(embed())
+        self.assertEqual(vectors, cached.embed_documents(TEXTS[:20]))
+        self.assertEqual(query, vectors[0])
+        self.assertEqual(embeddings.requested, TEXTS[:20])
+
+    @unittest.skipUnless(importlib.util.find_spec("langchain_core"), "needs langchain-core")
+    def test_10_langchain_vector_store_uses_the_cache(self):
+        from langchain_core.vectorstores import InMemoryVectorStore
+
+        embeddings = CountingEmbeddings()
+        store = InMemoryVectorStore(CachedEmbeddings(embeddings, self._cache()))
+        store.add_texts(TEXTS[:20])
+        asyncio.run(store.aadd_texts(TEXTS[:20]))
+        self.assertEqual(store.similarity_search(TEXTS[3], k=1)[0].page_content, TEXTS[3])
+        self.assertEqual(asyncio.run(store.asimilarity_search(TEXTS[5], k=1))[0].page_content, TEXTS[5])
+        # Only the first add_texts reached the wrapped embeddings
+        self.assertEqual(embeddings.requested, TEXTS[:20])
+
+
+if __name__ == "__main__":
+    unittest.main()
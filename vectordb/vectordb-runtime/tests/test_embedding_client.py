@@ -0,0 +1,94 @@
+import time
+import unittest
+
+from embedding_client import EmbeddingClient, RateLimiter, http_embed_batch
+from embedding_server import StandInEmbeddingServer, hash_embedding
+
+TEXTS = [f"Product {i}: {'durable' if i % 2 else 'wireless'} item {i % 13} for everyday use" for i in range(1000)]
+
+
+class TestEmbeddingClient(unittest.TestCase):
+    """Tests for the batched embedding client against the local stand-in server"""
+
+    def _client(self, server, **kwargs) -> EmbeddingClient:
+        client = EmbeddingClient(http_embed_batch(server.url, "stand-in"), **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_1_vectors_come_back_in_input_order(self):
+        """Batches complete out of order and the server reverses each one; output still matches input"""
+        with StandInEmbeddingServer(dim=16, latency=0.01) as server:
+            client = self._client(server, max_batch_size=100, max_concurrency=4)
+            vectors = client.embed(TEXTS)
+
+        self.assertEqual(vectors, [hash_embedding(text, 16) for text in TEXTS])
+        self.assertEqual(sorted(server.batch_sizes), [100] * 10)
+        self.assertGreater(server.max_in_flight, 1)
+        self.assertEqual(client.stats()["requests"], 10)
+
+    def test_2_small_calls_are_split_across_concurrent_requests(self):
+        with StandInEmbeddingServer(latency=0.01) as server:
+            client = self._client(server, max_concurrency=4)
+            client.embed(TEXTS)
+            client.embed(TEXTS[:10])
+
+        # 1000 texts fill four requests instead of one, 10 texts are one request
+        self.assertEqual(server.batch_sizes.count(250), 4)
+        self.assertEqual(server.batch_sizes[-1], 10)
+
+    def test_3_requests_respect_the_token_budget(self):
+        long_texts = ["word " * 400] * 20
+        with StandInEmbeddingServer(latency=0.0) as server:
+            self._client(server, max_batch_tokens=2000).embed(long_texts)
+
+        # ~501 estimated tokens per text, so three texts per request
+        self.assertEqual(sorted(server.batch_sizes), [2] + [3] * 6)
+
+    def test_4_throttled_requests_are_retried(self):
+        with StandInEmbeddingServer(dim=8, latency=0.0, throttle_first=3) as server:
+            client = self._client(server, max_batch_size=500, max_concurrency=1, backoff_seconds=0.01)
+            vectors = client.embed(TEXTS)
+
+        self.assertEqual(vectors, [hash_embedding(text, 8) for text in TEXTS])
+        self.assertEqual(client.stats()["retries"], 3)
+
+    def test_5_batched_concurrent_requests_beat_one_request_per_text(self):
+        """Throughput against a server with 20 ms per request"""
+        texts = TEXTS[:200]
+        with StandInEmbeddingServer(latency=0.02) as server:
+            embed_batch = http_embed_batch(server.url, "stand-in")
+            start = time.perf_counter()
+            for text in texts[:50]:
+                embed_batch([text])
+            serial_per_text = (time.perf_counter() - start) / 50
+
+            client = self._client(server, max_concurrency=4)
+            start = time.perf_counter()
+            client.embed(texts)
+            batched_per_text = (time.perf_counter() - start) / len(texts)
+
+        self.assertLess(batched_per_text * 20, serial_per_text)
+
+    def test_6_rate_limiter_spaces_requests(self):
+        limiter = RateLimiter(requests_per_minute=600)
+        limiter.available["requests"] = 0
+        start = time.perf_counter()
+        for _ in range(3):
+            limiter.acquire()
+        # 600 per minute refill one request every 0.1 s
+        self.assertGreaterEqual(time.perf_counter() - start, 0.25)
+
+        tokens = RateLimiter(tokens_per_minute=60000)
+        tokens.available["tokens"] = 0
+        self.assertGreater(tokens.acquire(100), 0.05)
+
+    def test_7_bad_requests_are_not_retried(self):
+        with StandInEmbeddingServer(latency=0.0, max_batch_size=10) as server:
+            client = self._client(server, max_batch_size=20, backoff_seconds=0.01)
+            with self.assertRaises(Exception):
+                client.embed(TEXTS[:20])
+        self.assertEqual(client.stats()["retries"], 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,108 @@
+import threading
+import time
+import unittest
+
+import pyarrow as pa
+
+from catalog_generator import generate_block
+from catalog_reader import read_catalog_batches
+from ingest_pipeline import Stage, format_pipeline_stats, run_pipeline
+
+
+def sleeper(seconds, fn=lambda batch: batch):
+    def stage(batch):
+        time.sleep(seconds)
+        return fn(batch)
+    return stage
+
+
+class TestIngestPipeline(unittest.TestCase):
+    """Tests for the staged read -> embed -> upsert pipeline"""
+
+    def test_1_every_row_reaches_the_last_stage(self):
+        received, lock = [], threading.Lock()
+
+        def upsert(batch):
+            with lock:
+                received.extend(batch)
+
+        batches = [list(range(start, start + 10)) for start in range(0, 1000, 10)]
+        stats = run_pipeline(batches, [Stage("embed", lambda batch: [-x for x in batch], workers=2),
+                                       Stage("upsert", upsert, workers=3)])
+
+        self.assertEqual(sorted(received), sorted(-x for x in range(1000)))
+        self.assertEqual(stats["rows"], 1000)
+        for name in ("read", "embed", "upsert"):
+            self.assertEqual((stats["stages"][name]["batches"], stats["stages"][name]["rows"]), (100, 1000))
+
+    def test_2_stages_overlap(self):
+        """Three stages of 20 ms per batch take ~20 ms per batch, not ~60 ms"""
+        def source():
+            for i in range(20):
+                time.sleep(0.02)
+                yield [i]
+
+        stats = run_pipeline(source(), [Stage("embed", sleeper(0.02)), Stage("upsert", sleeper(0.02))])
+        self.assertLess(stats["seconds"], 0.7 * 20 * 0.06)
+
+    def test_3_batches_in_flight_stay_bounded(self):
+        """A fast reader in front of a slow upsert doesn't buffer the dataset"""
+        produced, consumed, in_flight = [0], [0], []
+
+        def source():
+            for i in range(200):
+                produced[0] += 1
+                in_flight.append(produced[0] - consumed[0])
+                yield [i]
+
+        def upsert(batch):
+            time.sleep(0.001)
+            consumed[0] += 1
+
+        run_pipeline(source(), [Stage("embed", lambda batch: batch), Stage("upsert", upsert)], queue_size=2)
+        # Two queues of 2, plus one batch held by each of the three threads
+        self.assertLessEqual(max(in_flight), 2 * 2 + 3)
+        self.assertEqual(consumed[0], 200)
+
+    def test_4_counters_name_the_bottleneck(self):
+        stats = run_pipeline([[i] for i in range(10)],
+                             [Stage("embed", sleeper(0.001)), Stage("upsert", sleeper(0.03))])
+        self.assertEqual(stats["bottleneck"], "upsert")
+        self.assertGreater(stats["stages"]["upsert"]["busy_seconds"], 0.25)
+        # The embed stage spends its time waiting for room in the upsert queue
+        self.assertGreater(stats["stages"]["embed"]["waiting_seconds"], 0.15)
+        self.assertIn("bottleneck: upsert", format_pipeline_stats(stats))
+
+        # Four upsert workers share the load
+        stats = run_pipeline([[i] for i in range(10)],
+                             [Stage("embed", sleeper(0.02)), Stage("upsert", sleeper(0.03), workers=4)])
+        self.assertEqual(stats["bottleneck"], "embed")
+
+    def test_5_errors_stop_the_pipeline(self):
+        produced = [0]
+
+        def source():
+            for i in range(10_000):
+                produced[0] += 1
+                yield [i]
+
+        def upsert(batch):
+            if batch[0] == 3:
+                raise RuntimeError("upsert failed")
+
+        with self.assertRaisesRegex(RuntimeError, "upsert failed"):
+            run_pipeline(source(), [Stage("embed", lambda batch: batch), Stage("upsert", upsert)])
+        self.assertLess(produced[0], 100)
+
+    def test_6_streams_catalog_batches(self):
+        table = pa.table(generate_block(seed=1, block_no=0, n_rows=1000))
+        descriptions = []
+        stats = run_pipeline(read_catalog_batches(table, batch_size=128),
+                             [Stage("embed", lambda batch: batch.column("description").to_pylist()),
+                              Stage("upsert", descriptions.extend)])
+        self.assertEqual(stats["stages"]["read"]["batches"], 8)
+        self.assertEqual(sorted(descriptions), sorted(table.column("description").to_pylist()))
+
+
+if __name__ == "__main__":
+    unittest.main()
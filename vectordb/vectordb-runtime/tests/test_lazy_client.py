@@ -0,0 +1,68 @@
+import threading
+import time
+import unittest
+
+from lazy_client import LazyClient
+
+
+class FakeClient:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self):
+        return "pong"
+
+    def close(self):
+        self.closed = True
+
+
+class TestLazyClient(unittest.TestCase):
+    """Tests for the lazily created clients behind the vectordb examples' modules"""
+
+    def test_1_nothing_is_created_until_first_use(self):
+        created = []
+        client = LazyClient(lambda: created.append(FakeClient()) or created[-1], name="fake")
+        self.assertEqual((created, client.connected), ([], False))
+        self.assertIn("not connected", repr(client))
+
+        # Attribute access goes to the client, which is created once and reused
+        self.assertEqual(client.ping(), "pong")
+        self.assertEqual(client.ping(), "pong")
+        self.assertEqual(len(created), 1)
+        self.assertIs(client.connect(), created[0])
+
+    def test_2_close_releases_and_the_next_use_reconnects(self):
+        client = LazyClient(FakeClient)
+        client.close()  # closing a client that was never created is a no-op
+        first = client.connect()
+        client.close()
+        self.assertTrue(first.closed)
+        self.assertFalse(client.connected)
+        self.assertIsNot(client.connect(), first)
+
+        closed = []
+        with LazyClient(FakeClient, close=closed.append) as fake:
+            self.assertEqual(fake.ping(), "pong")
+        self.assertEqual(closed, [fake])
+
+    def test_3_concurrent_first_use_creates_one_client(self):
+        created = []
+
+        def factory():
+            time.sleep(0.05)
+            created.append(FakeClient())
+            return created[-1]
+
+        client = LazyClient(factory)
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(client.connect())) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(created), 1)
+        self.assertTrue(all(result is created[0] for result in results))
+
+
+if __name__ == "__main__":
+    unittest.main()
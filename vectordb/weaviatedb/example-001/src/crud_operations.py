@@ -2,8 +2,14 @@ import os
 from dotenv import load_dotenv
 import weaviate
 import weaviate.classes.config as wvc
+from weaviate.classes.data import DataObject
 from weaviate.classes.init import Auth
-import pandas as pd
+from batch_writer import BatchWriter, FailedObject, format_batch_stats
+from catalog_filters import to_weaviate_filter
+from catalog_reader import read_catalog_batches
+from catalog_updates import plan_update, product_changes
+from typing import List
+from lazy_client import LazyClient
 import uuid
 
 # Load environment variables
@@ -12,18 +18,28 @@ WEAVIATE_URL = os.getenv("WEAVIATE_URL")
 WEAVIATE_API_KEY = os.getenv("WEAVIATE_API_KEY")
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
 COLLECTION_NAME:str = "product_catalog"
+EMBEDDED_FIELDS = ["name", "description", "category"]  # the properties text2vec-openai vectorizes
+INSERT_CONCURRENCY = int(os.getenv("INSERT_CONCURRENCY", "2"))  # batch requests in flight
+INSERT_TARGET_SECONDS = float(os.getenv("INSERT_TARGET_SECONDS", "1.0"))  # batches are sized to take about this long
+INSERT_RETRIES = int(os.getenv("INSERT_RETRIES", "2"))  # rounds of retrying the objects the server rejected
 
 # Connect to Weaviate Cloud
-client = weaviate.connect_to_weaviate_cloud(
-    cluster_url=WEAVIATE_URL,
-    auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
-    skip_init_checks=True,
-    headers={
-        "X-OpenAI-Api-Key": OPENAI_API_KEY
-    }
-)
-print(f"weaviate db connected {client.is_ready()}")
-print(f"db collecions {client.collections.list_all().keys()}")
+def create_client() -> weaviate.WeaviateClient:
+    weaviate_client = weaviate.connect_to_weaviate_cloud(
+        cluster_url=WEAVIATE_URL,
+        auth_credentials=Auth.api_key(WEAVIATE_API_KEY),
+        skip_init_checks=True,
+        headers={
+            "X-OpenAI-Api-Key": OPENAI_API_KEY
+        }
+    )
+    print(f"weaviate db connected {weaviate_client.is_ready()}")
+    print(f"db collecions {weaviate_client.collections.list_all().keys()}")
+    return weaviate_client
+
+# The client connects on first use (or connect()), so importing this module makes no connection;
+# client.close() releases it and the next use connects again
+client = LazyClient(create_client, name="weaviate")
 
 # create collection
 def create_collection():
@@ -32,7 +48,9 @@ def create_collection():
             wvc.Property(name="product_id", data_type=wvc.DataType.TEXT, vectorize_property_name=False),
             wvc.Property(name="name", data_type=wvc.DataType.TEXT, vectorize_property_name=True),
             wvc.Property(name="description", data_type=wvc.DataType.TEXT, vectorize_property_name=True),
-            wvc.Property(name="category", data_type=wvc.DataType.TEXT, vectorize_property_name=True),
+            # Whole-value tokenization, so filters on category match "Coffee Mug" exactly
+            wvc.Property(name="category", data_type=wvc.DataType.TEXT, vectorize_property_name=True,
+                         tokenization=wvc.Tokenization.FIELD),
             wvc.Property(name="price", data_type=wvc.DataType.NUMBER, vectorize_property_name=False),
             wvc.Property(name="in_stock", data_type=wvc.DataType.BOOL, vectorize_property_name=False),
         ]
@@ -56,42 +74,42 @@ def delete_collection():
 
 
 # insert csv data
-def insert_products(csv_path):
-    # Load CSV into pandas DataFrame
-    df = pd.read_csv(csv_path)
-
+def insert_products(csv_path) -> List[FailedObject]:
+    """
+    Insert a CSV, Parquet or Arrow catalog with batch requests (insert_many):
+    batches are sized from the server's latency, at most INSERT_CONCURRENCY
+    are in flight, and rejected products are retried up to INSERT_RETRIES
+    times. Returns the products that still failed, with their errors.
+    """
     collection = client.collections.use(name=COLLECTION_NAME)
 
-    # Convert DataFrame rows into list of dicts
-    products = df.to_dict(orient="records")
-
-    responses = []
-    for product in products:
-        try:
-            response = collection.data.insert(
-                uuid= str(uuid.uuid5(uuid.NAMESPACE_DNS,str(product["product_id"]))),
-                properties={
-                    "product_id": str(product["product_id"]),
-                    "name": str(product["name"]),
-                    "description": str(product["description"]),
-                    "category": str(product["category"]),
-                    "price": float(product["price"]),
-                    "in_stock": bool(product["in_stock"]),
-                }
-            )
-            responses.append(response)
-            print(f"Inserted: {product['name']} (UUID: {response})")
-        except Exception as e:
-            print(f"Failed to insert {product['name']}: {e}")
-
-    print(f"\n Inserted {len(responses)} products successfully out of {len(products)}.")
-    return responses
-
-# search product
-def search(query: str, top_k=3):
+    def insert_batch(products):
+        # Arrow rows already carry str/float/bool values matching the collection properties
+        response = collection.data.insert_many([
+            DataObject(properties=product, uuid=str(uuid.uuid5(uuid.NAMESPACE_DNS, product["product_id"])))
+            for product in products
+        ])
+        return {index: error.message for index, error in response.errors.items()}
+
+    writer = BatchWriter(insert_batch, max_concurrency=INSERT_CONCURRENCY, target_latency=INSERT_TARGET_SECONDS)
+    # Read the catalog as typed Arrow batches and stream its rows into the writer
+    stats = writer.write(product for batch in read_catalog_batches(csv_path) for product in batch.to_pylist())
+    print(format_batch_stats(stats))
+    for _ in range(INSERT_RETRIES):
+        if not writer.failed:
+            break
+        print(f"retrying {len(writer.failed)} failed products")
+        print(format_batch_stats(writer.retry_failed()))
+
+    print(f"\n Inserted {stats['objects'] - len(writer.failed)} products successfully out of {stats['objects']}.")
+    return writer.failed
+
+# search product; filters (shared filter language, see catalog_filters) become a Weaviate Filter applied by the query
+def search(query: str, top_k=3, filters: dict = None):
     print(f"searching query {query}")
     collection = client.collections.use(name=COLLECTION_NAME)
-    products = collection.query.near_text(query=query, limit=top_k)
+    products = collection.query.near_text(query=query, limit=top_k,
+                                          filters=to_weaviate_filter(filters) if filters else None)
     if(products is not None):
         for product in products.objects:
             print(f"\n search result {product.properties}")
@@ -111,33 +129,38 @@ def find_one(product_id: str):
         print(f"product_id not found")
 
 
-def update(product_id: str, new_description: str):
+def update(product_id: str, new_description: str = None, new_price: float = None, in_stock: bool = None):
+    """
+    Partial update: only the changed properties are patched. Weaviate
+    re-vectorizes an object only when a vectorized property (name,
+    description, category) changes, so price and stock updates make no
+    embedding call.
+    """
     print(f"updating product_id {product_id}")
     collection = client.collections.use(name=COLLECTION_NAME)
     old_product = find_one(product_id = product_id)
-    old_product_props = old_product.properties;
-    collection.data.update(
-                           uuid=str(uuid.uuid5(uuid.NAMESPACE_DNS, product_id)), 
-                           properties={
-                                "product_id": str(old_product_props["product_id"]),
-                                "name": str(old_product_props["name"]),
-                                "description": new_description,
-                                "category": str(old_product_props["category"]),
-                                "price": float(old_product_props["price"]),
-                                "in_stock": bool(old_product_props["in_stock"]),
-                           }
-                           )
-    print(f"product_id {product_id} updated")
+    if old_product is None:
+        return
+    plan = plan_update(old_product.properties, product_changes(new_description, new_price, in_stock),
+                       EMBEDDED_FIELDS)
+    if plan.noop:
+        print(f"product_id {product_id} unchanged")
+        return
+    collection.data.update(uuid=str(uuid.uuid5(uuid.NAMESPACE_DNS, product_id)), properties=plan.changes)
+    print(f"product_id {product_id} updated{'' if plan.reembed else ' (properties only)'}")
 
 
 # ----------------- Example Run -----------------
 if __name__ == "__main__":
     try:
+        client.connect()
         create_collection()
         insert_products(csv_path="data/product_catalog.csv")
         search(query="red book", top_k=3)
+        search(query="red book", top_k=3, filters={"category": "Book", "price": {"$lt": 50.0}})
         find_one(product_id="prod_019")
         update(product_id="prod_019", new_description="A high-quality green book by Random House. Perfect for everyday use v3.")
+        update(product_id="prod_019", new_price=12.99, in_stock=False)
         delete_collection()
     except Exception as e:
         client.close()
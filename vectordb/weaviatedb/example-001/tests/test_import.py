@@ -0,0 +1,43 @@
+import importlib
+import importlib.util
+import socket
+import sys
+import unittest
+from unittest import mock
+
+DEPENDENCIES = ("weaviate", "dotenv", "lazy_client")
+
+
+def no_network(*args, **kwargs):
+    raise AssertionError("network access while importing src.crud_operations")
+
+
+@unittest.skipUnless(all(importlib.util.find_spec(name) for name in DEPENDENCIES), "needs the project's dependencies")
+class TestImport(unittest.TestCase):
+    """Importing the CRUD module must cost nothing: no connection, no collection listing"""
+
+    def import_module(self):
+        sys.modules.pop("src.crud_operations", None)
+        with mock.patch.object(socket.socket, "connect", no_network), \
+                mock.patch.object(socket, "getaddrinfo", no_network):
+            module = importlib.import_module("src.crud_operations")
+        self.addCleanup(module.client.close)
+        return module
+
+    def test_1_import_makes_no_connection(self):
+        module = self.import_module()
+        self.assertFalse(module.client.connected)
+
+    def test_2_client_connects_once_and_is_released_by_close(self):
+        module = self.import_module()
+        with mock.patch.object(module.weaviate, "connect_to_weaviate_cloud") as connect_to_weaviate_cloud:
+            module.client.connect()
+            module.client.collections.list_all()
+            self.assertEqual(connect_to_weaviate_cloud.call_count, 1)
+            module.client.close()
+            connect_to_weaviate_cloud.return_value.close.assert_called_once()
+            self.assertFalse(module.client.connected)
+
+
+if __name__ == "__main__":
+    unittest.main()